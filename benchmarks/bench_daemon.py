@@ -0,0 +1,146 @@
+"""Memory and CPU of the headless daemon against the offscreen GUI, both playing.
+
+Each side runs in its own process over the same synthetic library with a
+FakeMixer, so neither pays for audio decoding; what is left is the cost
+of the front end. With ``--pygame`` the daemon plays a real WAV through
+PygameMixer on SDL's dummy driver instead, so its figures include the
+mixer. RSS and CPU time come from /proc (Linux only).
+
+``--check`` fails (status 1) when the daemon is over daemon_budget.json.
+"""
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+from os import path
+
+ROOT = path.dirname(path.dirname(path.abspath(__file__)))
+BUDGET_PATH = path.join(path.dirname(path.abspath(__file__)), "daemon_budget.json")
+
+
+def library_paths(n_tracks):
+    return [f"/music/artist{i % 100}/album{i % 7}/track{i:07d}.mp3" for i in range(n_tracks)]
+
+
+def write_silence(file_path, seconds, rate=8000):
+    with wave.open(file_path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(b"\0\0" * int(seconds * rate))
+
+
+def child(kind, n_tracks, home, real=False):
+    """Runs in the measured process; prints "ready" once playback has started."""
+    from player.mixer_backend import FakeMixer
+    from player.player import Music_player
+    from utils.library_service import LibraryService
+
+    if kind == "gui":
+        from benchmarks.offscreen import app, make_ui
+        ui = make_ui(n_tracks, home)
+        ui.play_song()
+        print("ready", flush=True)
+        app().exec()
+        return
+    from daemon.server import PlayerDaemon
+    if real:
+        LibraryService.instance().publish([path.join(home, "silence.wav")] + library_paths(n_tracks - 1))
+        player = Music_player()
+    else:
+        LibraryService.instance().publish(library_paths(n_tracks))
+        player = Music_player(mixer=FakeMixer(default_duration=3600))
+    daemon = PlayerDaemon(path.join(home, "player.sock"), player=player)
+    # As run_daemon does; otherwise SDL claims SIGTERM when the mixer opens and terminate() is ignored.
+    signal.signal(signal.SIGTERM, daemon.stop)
+    thread = threading.Thread(target=daemon.serve, daemon=True)
+    thread.start()
+    while not path.exists(daemon.path):
+        time.sleep(0.01)
+    daemon.execute("play")
+    print("ready", flush=True)
+    # The parent stops reading once it is ready; later log lines would hit a closed pipe.
+    sys.stdout = open(os.devnull, "w")
+    thread.join()
+
+
+def proc_stats(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    cpu_s = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    memory = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "VmHWM"):
+                memory[key] = int(value.split()[0]) / 1024
+    return cpu_s, memory
+
+
+def measure(kind, n_tracks, seconds, real=False):
+    with tempfile.TemporaryDirectory() as home:
+        env = dict(os.environ, LOCALAPPDATA=home, USERPROFILE=home, PYTHONPATH=ROOT,
+                   QT_QPA_PLATFORM="offscreen", SDL_AUDIODRIVER="dummy")
+        args = [sys.executable, "-m", "benchmarks.bench_daemon", "--child", kind, str(n_tracks), home]
+        if real:
+            # Longer than the measurement, so the track is still playing at the end.
+            write_silence(path.join(home, "silence.wav"), seconds + 30)
+            args.append("--pygame")
+        proc = subprocess.Popen(args, cwd=ROOT, env=env, stdout=subprocess.PIPE, text=True)
+        try:
+            for line in proc.stdout:
+                if line.strip() == "ready":
+                    break
+            else:
+                raise RuntimeError(f"{kind} process did not start")
+            startup_cpu_s, _ = proc_stats(proc.pid)
+            time.sleep(seconds)
+            cpu_s, memory = proc_stats(proc.pid)
+        finally:
+            proc.terminate()
+            proc.wait(10)
+    return {
+        "rss_mb": memory["VmRSS"],
+        "peak_rss_mb": memory["VmHWM"],
+        "startup_cpu_s": startup_cpu_s,
+        "playing_cpu_percent": 100 * (cpu_s - startup_cpu_s) / seconds,
+    }
+
+
+def run(n_tracks=100000, seconds=10, gui=True, real=False):
+    result = {"tracks": n_tracks, "seconds": seconds, "daemon_mixer": "pygame" if real else "fake",
+              "daemon": measure("daemon", n_tracks, seconds, real)}
+    if gui:
+        result["gui"] = measure("gui", n_tracks, seconds)
+    return result
+
+
+def check(budget_path=BUDGET_PATH):
+    with open(budget_path) as f:
+        budget = json.load(f)
+    daemon = measure("daemon", budget["tracks"], budget["seconds"])
+    failures = []
+    if daemon["peak_rss_mb"] > budget["max_rss_mb"]:
+        failures.append(f"peak RSS {daemon['peak_rss_mb']:.1f} MB, budget {budget['max_rss_mb']} MB")
+    if daemon["playing_cpu_percent"] > budget["max_cpu_percent"]:
+        failures.append(f"CPU {daemon['playing_cpu_percent']:.2f}% while playing, budget {budget['max_cpu_percent']}%")
+    return {"daemon": daemon, "failures": failures}
+
+
+if __name__ == "__main__":
+    if "--child" in sys.argv:
+        kind, n, home = sys.argv[sys.argv.index("--child") + 1:][:3]
+        child(kind, int(n), home, "--pygame" in sys.argv)
+    elif "--check" in sys.argv:
+        result = check()
+        print(json.dumps(result, indent=2))
+        sys.exit(1 if result["failures"] else 0)
+    else:
+        sizes = [int(arg) for arg in sys.argv[1:] if arg.isdigit()]
+        print(json.dumps(run(sizes[0] if sizes else 100000, gui="--no-gui" not in sys.argv,
+                             real="--pygame" in sys.argv), indent=2))
@@ -0,0 +1,62 @@
+"""file_manager.search() over a generated music folder: cold, unchanged, and with one new file.
+
+USERPROFILE points at the temporary tree so search() finds it through
+music_folder() exactly as the player does.
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+from os import path
+
+from benchmarks.synthetic import make_tree
+from utils.file_manager import file_manager
+from utils.library_index import LibraryIndex
+
+
+def timed(fn):
+    start = time.perf_counter()
+    value = fn()
+    return time.perf_counter() - start, value
+
+
+def measure(n_files):
+    with tempfile.TemporaryDirectory() as home:
+        previous = os.environ.get("USERPROFILE")
+        os.environ["USERPROFILE"] = home
+        try:
+            root = path.join(home, "Music")
+            make_tree(root, n_files)
+            manager = file_manager(LibraryIndex(path.join(home, "library.db")))
+
+            cold_s, cold = timed(manager.search)
+            warm_s, _ = timed(manager.search)
+            dirs_skipped = manager.last_scan.dirs_skipped
+            with open(path.join(root, "d0", "d0", "new.mp3"), "wb"):
+                pass
+            changed_s, changed = timed(manager.search)
+            manager.index.close()
+        finally:
+            if previous is None:
+                del os.environ["USERPROFILE"]
+            else:
+                os.environ["USERPROFILE"] = previous
+    return {
+        "files": n_files,
+        "cold_search_s": cold_s,
+        "warm_search_s": warm_s,
+        "one_file_added_s": changed_s,
+        "tracks": len(cold),
+        "tracks_after_change": len(changed),
+        "warm_dirs_skipped": dirs_skipped,
+    }
+
+
+def run(sizes=(1000, 100000, 1000000)):
+    return [measure(n) for n in sizes]
+
+
+if __name__ == "__main__":
+    sizes = [int(n) for n in sys.argv[1:]] or (1000, 100000, 1000000)
+    print(json.dumps(run(sizes), indent=2))
@@ -0,0 +1,87 @@
+"""Track-boundary gaps with and without gapless mode.
+
+By default this drives pygame with SDL's dummy audio driver on generated
+WAV files; ``--fake`` uses FakeMixer instead.
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import wave
+from os import path
+
+from player.mixer_backend import FakeMixer, PygameMixer
+from player.player import Music_player
+
+
+def write_wav(file_path, seconds, rate=22050):
+    with wave.open(file_path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(b"\0\0" * int(seconds * rate))
+
+
+class RecordingMixer:
+    """Wraps a mixer and timestamps every play() and position reset."""
+
+    def __init__(self, mixer):
+        self.mixer = mixer
+        self.starts = []
+        self.last_pos = 0.0
+
+    def __getattr__(self, name):
+        return getattr(self.mixer, name)
+
+    def play(self):
+        self.mixer.play()
+        self.starts.append(time.monotonic())
+        self.last_pos = 0.0
+
+    def get_pos(self):
+        pos = self.mixer.get_pos()
+        if pos is not None:
+            if pos < self.last_pos:
+                self.starts.append(time.monotonic() - pos)
+            self.last_pos = pos
+        return pos
+
+
+def measure(tracks, seconds, gapless, fake):
+    mixer = FakeMixer(default_duration=seconds) if fake else PygameMixer()
+    recorder = RecordingMixer(mixer)
+    player = Music_player(mixer=recorder)
+    player.gapless = gapless
+    player.set_queue(tracks)
+    player.start()
+    deadline = time.monotonic() + len(tracks) * seconds * 3 + 2
+    while player.audio_controls.song_pointer < len(tracks) - 1 and time.monotonic() < deadline:
+        time.sleep(seconds / 4)
+    player.scheduler.close()
+    gaps = [b - a - seconds for a, b in zip(recorder.starts, recorder.starts[1:])]
+    return {
+        "tracks_started": len(recorder.starts),
+        "gap_mean_s": sum(gaps) / len(gaps) if gaps else None,
+        "gap_max_s": max(gaps) if gaps else None,
+        "transitions": player.scheduler.transitions.summary(),
+    }
+
+
+def run(n_tracks=10, seconds=0.3, fake=False):
+    if not fake:
+        os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    with tempfile.TemporaryDirectory() as tmp:
+        tracks = []
+        for i in range(n_tracks):
+            file_path = path.join(tmp, f"t{i}.wav")
+            write_wav(file_path, seconds)
+            tracks.append(file_path)
+        return {
+            "gapless": measure(tracks, seconds, True, fake),
+            "load_and_play": measure(tracks, seconds, False, fake),
+        }
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(fake="--fake" in sys.argv), indent=2))
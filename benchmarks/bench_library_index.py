@@ -0,0 +1,55 @@
+import json
+import os
+import sys
+import tempfile
+import time
+from os import path
+
+from benchmarks.synthetic import make_tree
+from utils.library_index import LibraryIndex, is_audio_file
+
+
+def walk(root):
+    return [path.join(r, f) for r, _, files in os.walk(root) for f in files if is_audio_file(f)]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    value = fn()
+    return time.perf_counter() - start, value
+
+
+def run(n_files=20000):
+    with tempfile.TemporaryDirectory() as tmp:
+        root = path.join(tmp, 'Music')
+        make_tree(root, n_files)
+        index = LibraryIndex(path.join(tmp, 'library.db'))
+
+        walk_time, _ = timed(lambda: walk(root))
+        cold_time, cold = timed(lambda: index.scan(root))
+        warm_time, warm = timed(lambda: index.scan(root))
+
+        touched = path.join(root, 'd0', 'd0')
+        with open(path.join(touched, 'new.mp3'), 'wb'):
+            pass
+        delta_time, delta = timed(lambda: index.scan(root))
+        tracks_time, tracks = timed(lambda: index.tracks(root))
+        index.close()
+
+    return {
+        'files': n_files,
+        'os_walk_s': walk_time,
+        'cold_scan_s': cold_time,
+        'warm_scan_s': warm_time,
+        'one_dir_changed_s': delta_time,
+        'tracks_query_s': tracks_time,
+        'cold_added': len(cold.added),
+        'warm_dirs_skipped': warm.dirs_skipped,
+        'delta_added': len(delta.added),
+        'tracks': len(tracks),
+    }
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print(json.dumps(run(n), indent=2))
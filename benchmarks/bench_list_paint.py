@@ -0,0 +1,80 @@
+"""Paint time of the song list for large libraries, on Qt's offscreen platform.
+
+``legacy`` redraws rows the way draw_list used to: basename and a text
+layout for every visible row on every frame.
+"""
+import json
+import os
+import random
+import sys
+import time
+
+from PyQt6.QtCore import QRectF, Qt
+from PyQt6.QtGui import QFont, QImage, QPainter
+
+from benchmarks.offscreen import make_ui
+
+LIST_RECT = (30, 340, 310)
+
+
+def legacy_draw_list(ui, painter, x, y, width, height):
+    painter.save()
+    painter.setClipRect(x, y, width, height)
+    items = ui.get_current_list()
+    lh = 30
+    painter.setFont(QFont("Arial", 14))
+    start = int(ui.scroll_animated.value())
+    end = min(start + height // lh, len(items))
+    for i in range(start, end):
+        r = QRectF(x, y + (i - start) * lh, width, lh)
+        painter.setPen(ui.theme["fg"])
+        painter.drawText(r, Qt.AlignmentFlag.AlignVCenter, os.path.basename(items[i]))
+    painter.restore()
+
+
+def paint_frames(ui, draw, offsets):
+    image = QImage(ui.width(), ui.height(), QImage.Format.Format_ARGB32_Premultiplied)
+    x, y, height = LIST_RECT
+    samples = []
+    for offset in offsets:
+        ui.scroll_animated._value = ui.scroll_animated.target = offset
+        start = time.perf_counter()
+        painter = QPainter(image)
+        draw(painter, x, y, ui.width() - 240, height)
+        painter.end()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {
+        "mean_ms": 1000 * sum(samples) / len(samples),
+        "p95_ms": 1000 * samples[int(len(samples) * 0.95)],
+    }
+
+
+def measure(n_tracks, frames=300):
+    ui = make_ui(n_tracks)
+    rng = random.Random(0)
+    jumps = [rng.randrange(0, n_tracks - 10) for _ in range(frames)]
+    still = [jumps[0]] * frames
+    scroll = [min(n_tracks - 10, jumps[0] + i // 4) for i in range(frames)]
+    result = {
+        "rows": n_tracks,
+        "cached_still": paint_frames(ui, ui.draw_list, still),
+        "cached_scroll": paint_frames(ui, ui.draw_list, scroll),
+        "cached_random_jumps": paint_frames(ui, ui.draw_list, jumps),
+        "legacy_still": paint_frames(ui, lambda *a: legacy_draw_list(ui, *a), still),
+        "legacy_scroll": paint_frames(ui, lambda *a: legacy_draw_list(ui, *a), scroll),
+        "static_text_hits": ui.row_texts.hits,
+        "static_text_misses": ui.row_texts.misses,
+    }
+    ui.backend.scheduler.close()
+    ui.close()
+    return result
+
+
+def run(sizes=(10000, 1000000)):
+    return [measure(n) for n in sizes]
+
+
+if __name__ == "__main__":
+    sizes = [int(n) for n in sys.argv[1:]] or (10000, 1000000)
+    print(json.dumps(run(sizes), indent=2))
@@ -0,0 +1,102 @@
+"""Loudness analysis throughput, accuracy, and what normalization adds to a track change.
+
+Tracks are generated stereo 16-bit WAVs of white noise with peaks at levels spread
+over 30 dB. ``audio_hours_per_cpu_minute`` counts the workers' CPU time
+only; ``wall_s`` includes spawning the pool. ``sine_error_db`` is how far a
+full-scale 997 Hz sine reads from the -3.01 LUFS BS.1770 gives for it.
+"""
+import contextlib
+import io
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+import wave
+from os import path
+
+from metadata.loudness import LoudnessAnalyzer, LoudnessCache, measure
+from player.mixer_backend import FakeMixer
+from player.player import Music_player
+
+
+def write_wav(file_path, seconds, level_db, rate=44100, seed=0):
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    noise = rng.standard_normal((int(seconds * rate), 2))
+    noise *= 10 ** (level_db / 20) / np.abs(noise).max()
+    with wave.open(file_path, "wb") as w:
+        w.setnchannels(2)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes((noise * 32767).astype("<i2").tobytes())
+
+
+def sine_error(rate=48000):
+    import numpy as np
+
+    t = np.arange(rate * 5) / rate
+    sine = np.sin(2 * np.pi * 997 * t)[:, None]
+    loudness, _ = measure(sine, rate)
+    return abs(loudness - (-3.01))
+
+
+def analyze(tracks, tmp, workers, name):
+    analyzer = LoudnessAnalyzer(LoudnessCache(path.join(tmp, f"{name}.db")), workers=workers)
+    start = time.perf_counter()
+    analyzer.analyze(tracks)
+    wall = time.perf_counter() - start
+    start = time.perf_counter()
+    analyzer.analyze(tracks)
+    warm = time.perf_counter() - start
+    result = dict(analyzer.stats(), wall_s=wall, warm_s=warm)
+    gains = analyzer.cache.gains()
+    analyzer.cache.close()
+    return result, gains
+
+
+def track_change(tracks, gains, changes):
+    """Mean cost of Music_player.start() on the next track, with an empty and a full gain table."""
+    player = Music_player(mixer=FakeMixer())
+    player.set_queue(tracks)
+    timings = {}
+    # Music_player logs every start; keep that out of the timings.
+    with contextlib.redirect_stdout(io.StringIO()):
+        for label, table in (("without_gains_s", {}), ("with_gains_s", gains)):
+            player.set_gains(table)
+            start = time.perf_counter()
+            for i in range(changes):
+                player.audio_controls.song_pointer = i % len(tracks)
+                player.start()
+            timings[label] = (time.perf_counter() - start) / changes
+    player.scheduler.close()
+    return timings
+
+
+def run(n_tracks=16, seconds=30.0, workers=None, changes=2000):
+    workers = workers or os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as tmp:
+        tracks = []
+        for i in range(n_tracks):
+            file_path = path.join(tmp, f"t{i}.wav")
+            write_wav(file_path, seconds, -30.0 * i / max(1, n_tracks - 1), seed=i)
+            tracks.append(file_path)
+        single, _ = analyze(tracks, tmp, 1, "single")
+        pool, gains = analyze(tracks, tmp, workers, "pool")
+        spread = [20 * math.log10(g) for g in gains.values()]
+        return {
+            "tracks": n_tracks,
+            "audio_hours": n_tracks * seconds / 3600,
+            "single_worker": single,
+            "pool": dict(pool, workers=workers),
+            "gain_range_db": [min(spread), max(spread)],
+            "sine_error_db": sine_error(),
+            "track_change": track_change(tracks, gains, changes),
+        }
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    print(json.dumps(run(n), indent=2))
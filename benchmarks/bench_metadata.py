@@ -0,0 +1,40 @@
+import json
+import sys
+import tempfile
+import time
+from os import path
+
+from benchmarks.synthetic import make_tagged_library
+from metadata.cache import MetadataCache
+from metadata.extractor import MetadataExtractor
+
+
+def run(n_files=5000, workers=None):
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = make_tagged_library(path.join(tmp, 'Music'), n_files)
+        extractor = MetadataExtractor(MetadataCache(path.join(tmp, 'metadata.db')), workers=workers)
+
+        start = time.perf_counter()
+        cold = extractor.extract(paths)
+        cold_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        warm = extractor.extract(paths)
+        warm_time = time.perf_counter() - start
+        extractor.cache.close()
+
+    return {
+        'files': n_files,
+        'workers': extractor.workers,
+        'cold_s': cold_time,
+        'cold_tracks_per_s': n_files / cold_time,
+        'warm_s': warm_time,
+        'warm_tracks_per_s': n_files / warm_time,
+        'with_title': sum(1 for info in cold.values() if info.title),
+        'with_duration': sum(1 for info in warm.values() if info.duration),
+    }
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    print(json.dumps(run(n), indent=2))
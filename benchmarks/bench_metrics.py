@@ -0,0 +1,50 @@
+"""What the instrumentation costs per call, disabled and enabled, and what an export costs.
+
+``bare_s`` is the empty loop body the other numbers include.
+"""
+import json
+import sys
+import tempfile
+import time
+from os import path
+
+from utils import metrics
+
+
+def per_call(fn, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls
+
+
+def timed_block():
+    started = metrics.start()
+    metrics.stop("bench_seconds", started)
+
+
+def run(calls=1000000, timers=20):
+    result = {"bare_s": per_call(lambda: None, calls)}
+    result["disabled_timer_s"] = per_call(timed_block, calls)
+    result["disabled_count_s"] = per_call(lambda: metrics.count("bench"), calls)
+    with tempfile.TemporaryDirectory() as tmp:
+        file_path = metrics.enable("prom", path.join(tmp, "metrics.prom"), interval=3600)
+        try:
+            result["enabled_timer_s"] = per_call(timed_block, calls // 10)
+            result["enabled_count_s"] = per_call(lambda: metrics.count("bench"), calls // 10)
+            for i in range(timers):
+                for _ in range(1024):
+                    metrics.observe(f"timer{i}_seconds", 0.001)
+            result["prometheus_export_s"] = per_call(metrics.exporter.dump, 20)
+            result["prometheus_bytes"] = path.getsize(file_path)
+            metrics.exporter.render = metrics.to_json
+            result["json_export_s"] = per_call(metrics.exporter.dump, 20)
+        finally:
+            metrics.disable()
+            metrics.registry.clear()
+    return result
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    print(json.dumps(run(n), indent=2))
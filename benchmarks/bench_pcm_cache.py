@@ -0,0 +1,56 @@
+import json
+import os
+import sys
+import tempfile
+import time
+
+from player.pcm_cache import PCMCache
+
+
+def fake_decoder(decode_seconds, pcm_bytes):
+    def decode(file_path):
+        time.sleep(decode_seconds)
+        return bytes(pcm_bytes)
+    return decode
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def run(n_tracks=20, pcm_mb=8, budget_tracks=4, decode_seconds=0.05):
+    pcm_bytes = pcm_mb * 1024 * 1024
+    with tempfile.TemporaryDirectory() as root:
+        tracks = []
+        for i in range(n_tracks):
+            track = os.path.join(root, f"track{i}.mp3")
+            open(track, "wb").close()
+            tracks.append(track)
+        cache = PCMCache(budget_bytes=budget_tracks * pcm_bytes, spill_dir=os.path.join(root, "spill"),
+                         decoder=fake_decoder(decode_seconds, pcm_bytes))
+
+        cold = [timed(cache.load, track) for track in tracks]
+        hot = [timed(cache.load, track) for track in tracks[-budget_tracks:]]
+        spilled = [timed(cache.load, track) for track in tracks[:budget_tracks]]
+        cache.warm(tracks[budget_tracks:2 * budget_tracks]).join()
+        warmed = [timed(cache.load, track) for track in tracks[budget_tracks:2 * budget_tracks]]
+
+        def mean(samples):
+            return sum(samples) / len(samples)
+
+        return {
+            "n_tracks": n_tracks,
+            "pcm_mb": pcm_mb,
+            "cold_decode_mean_s": mean(cold),
+            "memory_hit_mean_s": mean(hot),
+            "spill_hit_mean_s": mean(spilled),
+            "after_warm_mean_s": mean(warmed),
+            "stats": cache.stats(),
+        }
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    print(json.dumps(run(n), indent=2))
@@ -0,0 +1,73 @@
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from os import path
+
+from benchmarks.synthetic import make_tree
+from playlist.formats import PathResolver, read_playlist, resolve_entries, write_playlist
+from playlist.playlists import Playlist
+from playlist.playlists_manager import PlaylistManager
+from playlist.store import PlaylistStore
+from utils.library_index import LibraryIndex
+
+
+def parse_peak(file_path, resolver):
+    """Peak bytes allocated while streaming and resolving every entry (without storing them)."""
+    unresolved = []
+    tracemalloc.start()
+    count = sum(1 for _ in resolve_entries(read_playlist(file_path), resolver, unresolved))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return count, peak
+
+
+def run(sizes=(5000, 50000), missing_every=100):
+    results = []
+    with tempfile.TemporaryDirectory() as root:
+        music = path.join(root, "Music")
+        make_tree(music, max(sizes))
+        index = LibraryIndex(path.join(root, "library.db"))
+        index.scan(music)
+        tracks = index.tracks(music)
+        for n in sizes:
+            songs = [t if i % missing_every else t + ".gone" for i, t in enumerate(tracks[:n])]
+            playlist_file = path.join(music, f"mix{n}.m3u8")
+            write_playlist(playlist_file, songs, relative=True)
+            resolver = PathResolver(music, index, (music,))
+            _, peak = parse_peak(playlist_file, resolver)
+
+            manager = PlaylistManager(Playlist(PlaylistStore(path.join(root, f"playlists{n}.db")),
+                                               legacy_path=path.join(root, "none.json")))
+            start = time.perf_counter()
+            result = manager.import_playlist(playlist_file, index=index, roots=(music,))
+            import_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            manager.export_playlist(result.name, path.join(root, f"out{n}.pls"))
+            export_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            removed = manager.remove_many(result.name, songs[::2])
+            remove_s = time.perf_counter() - start
+            manager.playlist_obj.store.close()
+            results.append({
+                "entries": result.entries,
+                "added": result.added,
+                "unresolved": len(result.unresolved),
+                "file_bytes": os.path.getsize(playlist_file),
+                "parse_peak_bytes": peak,
+                "import_s": import_s,
+                "export_pls_s": export_s,
+                "remove_many": removed,
+                "remove_many_s": remove_s,
+            })
+        index.close()
+    return results
+
+
+if __name__ == "__main__":
+    sizes = [int(n) for n in sys.argv[1:]] or (5000, 50000)
+    print(json.dumps(run(sizes), indent=2))
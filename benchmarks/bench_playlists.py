@@ -0,0 +1,109 @@
+import json
+import os
+import sys
+import tempfile
+import time
+from os import path
+
+from playlist.playlists import Playlist
+from playlist.playlists_manager import PlaylistManager
+from playlist.store import PlaylistStore
+
+
+def json_rewrite(json_path, playlists):
+    # What every mutation used to cost: dump the whole dict again.
+    with open(json_path, "w") as f:
+        json.dump(playlists, f, indent=4)
+
+
+def measure(root, total_songs, n_playlists=50, mutations=200):
+    per_playlist = total_songs // n_playlists
+    playlists = {f"list{p}": [f"/music/d{p}/track{i}.mp3" for i in range(per_playlist)]
+                 for p in range(n_playlists)}
+    db_path = path.join(root, f"store{total_songs}.db")
+    store = PlaylistStore(db_path)
+    start = time.perf_counter()
+    with store.batch():
+        for name, songs in playlists.items():
+            store.replace(name, songs)
+    save_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(mutations):
+        store.add_songs("list0", [f"/music/new{i}.mp3"])
+        store.remove_song("list0", f"/music/new{i}.mp3")
+    store_s = (time.perf_counter() - start) / (2 * mutations)
+
+    start = time.perf_counter()
+    with store.batch():
+        for i in range(mutations):
+            store.add_songs("list0", [f"/music/batch{i}.mp3"])
+    batch_s = (time.perf_counter() - start) / mutations
+    store.close()
+
+    # What startup pays: open the store and read every playlist into memory.
+    start = time.perf_counter()
+    loaded = Playlist(PlaylistStore(db_path), legacy_path=path.join(root, "none.json"))
+    load_s = time.perf_counter() - start
+    loaded.store.close()
+
+    json_path = path.join(root, f"playlists{total_songs}.json")
+    runs = max(3, mutations // 20)
+    start = time.perf_counter()
+    for _ in range(runs):
+        json_rewrite(json_path, playlists)
+    json_s = (time.perf_counter() - start) / runs
+    start = time.perf_counter()
+    with open(json_path) as f:
+        json.load(f)
+    json_load_s = time.perf_counter() - start
+    return {
+        "total_songs": total_songs,
+        "json_bytes": os.path.getsize(json_path),
+        "json_rewrite_per_mutation_s": json_s,
+        "json_load_s": json_load_s,
+        "store_save_s": save_s,
+        "store_load_s": load_s,
+        "store_per_mutation_s": store_s,
+        "store_batched_per_mutation_s": batch_s,
+    }
+
+
+def membership(root, n_playlists=2000, per_playlist=100, queries=2000):
+    store = PlaylistStore(path.join(root, "membership.db"))
+    with store.batch():
+        for p in range(n_playlists):
+            store.replace(f"list{p}", [f"/music/track{(p * 7 + i) % 50000}.mp3" for i in range(per_playlist)])
+    manager = PlaylistManager(Playlist(store, legacy_path=path.join(root, "none.json")))
+    probes = [f"/music/track{i * 13 % 50000}.mp3" for i in range(queries)]
+
+    start = time.perf_counter()
+    for song in probes:
+        manager.playlists_containing(song)
+    indexed_s = (time.perf_counter() - start) / queries
+
+    scans = max(1, queries // 100)
+    start = time.perf_counter()
+    for song in probes[:scans]:
+        [name for name in manager.get_all_playlists() if song in manager.get_songs(name)]
+    scan_s = (time.perf_counter() - start) / scans
+    store.close()
+    return {
+        "playlists": n_playlists,
+        "entries": n_playlists * per_playlist,
+        "containing_indexed_s": indexed_s,
+        "containing_scan_s": scan_s,
+    }
+
+
+def run(sizes=(1000, 10000, 100000)):
+    with tempfile.TemporaryDirectory() as root:
+        return {
+            "mutations": [measure(root, n) for n in sizes],
+            "membership": membership(root),
+        }
+
+
+if __name__ == "__main__":
+    sizes = [int(n) for n in sys.argv[1:]] or (1000, 10000, 100000)
+    print(json.dumps(run(sizes), indent=2))
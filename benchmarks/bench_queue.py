@@ -0,0 +1,116 @@
+import contextlib
+import io
+import json
+import sys
+import time
+
+from player.mixer_backend import FakeMixer
+from player.play_queue import PlayQueue
+from player.player import Music_player
+from utils.library_service import LibraryService
+
+
+def per_op(fn, repeat):
+    start = time.perf_counter()
+    for i in range(repeat):
+        fn(i)
+    return (time.perf_counter() - start) / repeat
+
+
+def list_ops(n, repeat):
+    queue = [f"/music/track{i}.mp3" for i in range(n)]
+    pointer = n // 2
+    state = {"queue": queue}
+
+    def playnext(i):
+        q = state["queue"]
+        song = f"/music/new{i}.mp3"
+        if song in q:
+            return
+        state["queue"] = q[:pointer + 1] + [song] + q[pointer + 1:]
+
+    def remove(i):
+        state["queue"].remove(f"/music/new{i}.mp3")
+
+    def contains(i):
+        return f"/music/track{n - 1 - i}.mp3" in state["queue"]
+
+    return {
+        "playnext_s": per_op(playnext, repeat),
+        "remove_s": per_op(remove, repeat),
+        "contains_s": per_op(contains, repeat),
+    }
+
+
+def queue_ops(n, repeat):
+    queue = PlayQueue([f"/music/track{i}.mp3" for i in range(n)])
+    build_start = time.perf_counter()
+    queue.entry_at(0)
+    build = time.perf_counter() - build_start
+    pointer = n // 2
+    ids = []
+
+    def playnext(i):
+        ids.append(queue.insert_after(pointer, f"/music/new{i}.mp3"))
+
+    def remove(i):
+        queue.remove_entry(ids[i])
+
+    def contains(i):
+        return f"/music/track{n - 1 - i}.mp3" in queue
+
+    def move(i):
+        queue.move(queue.entry_at(i).entry_id, n - 1 - i)
+
+    def lookup(i):
+        return queue[(i * 7919) % n]
+
+    return {
+        "materialize_s": build,
+        "playnext_s": per_op(playnext, repeat),
+        "remove_s": per_op(remove, repeat),
+        "contains_s": per_op(contains, repeat),
+        "move_s": per_op(move, repeat),
+        "getitem_s": per_op(lookup, repeat),
+    }
+
+
+def player_ops(n, repeat):
+    """The same edits through Music_player, with its queue events and prepare_next."""
+    tracks = [f"/music/track{i}.mp3" for i in range(n)]
+    LibraryService.instance().publish(tracks)
+    player = Music_player(mixer=FakeMixer(default_duration=3600))
+    player.set_queue(tracks, n // 2)
+    events = []
+    player.subscribe_queue(lambda kind, first, count, tracks: events.append(kind))
+
+    def playnext(i):
+        player.playnext(f"/music/new{i}.mp3", player.audio_controls.song_pointer)
+
+    def remove(i):
+        player.remove_from_queue(f"/music/new{i}.mp3")
+
+    def toggle_repeat(i):
+        # repeat all -> repeat one -> shuffle (which starts playback) -> repeat all
+        player.toggle_repeat()
+
+    # Music_player logs every call; keep that out of the timings.
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = {
+            "playnext_s": per_op(playnext, repeat),
+            "remove_from_queue_s": per_op(remove, repeat),
+            "toggle_repeat_s": per_op(toggle_repeat, max(3, repeat // 10 * 3)),
+        }
+    player.scheduler.close()
+    result["queue_events"] = len(events)
+    return result
+
+
+def run(sizes=(1000, 100000, 1000000), repeat=50):
+    return {str(n): {"list": list_ops(n, repeat), "play_queue": queue_ops(n, repeat), "player": player_ops(n, repeat)}
+            for n in sizes}
+
+
+if __name__ == "__main__":
+    sizes = tuple(int(arg) for arg in sys.argv[1:]) or (1000, 100000, 1000000)
+    print(json.dumps(run(sizes), indent=2))
@@ -0,0 +1,76 @@
+"""Cost of keeping the queue panel current, on Qt's offscreen platform.
+
+``text_rebuild_s`` is what the old QTextEdit panel paid on every refresh:
+one string over the whole queue.
+"""
+import json
+import os
+import sys
+import time
+
+from benchmarks.offscreen import make_ui, pump
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def text_rebuild(queue, current_index):
+    formatted = ""
+    for i, song in enumerate(queue):
+        marker = "🎧 " if i == current_index else "   "
+        formatted += f"{marker}{os.path.basename(song)}\n--------------------\n"
+    return formatted
+
+
+def run(n_tracks=100000, edits=1000):
+    ui = make_ui(n_tracks)
+    backend = ui.backend
+    ui.handle_top_button("toggle_queue")
+    pump(20)
+
+    set_queue_s = timed(lambda: (backend.set_queue(ui.songs_path, 0), pump(0)))
+    paint_s = timed(lambda: ui.queue_display.viewport().grab())
+
+    def insert_many():
+        for i in range(edits):
+            backend.playnext(f"/music/extra/track{i}.mp3", backend.audio_controls.song_pointer)
+        pump(0)
+
+    insert_s = timed(insert_many)
+
+    def advance():
+        for _ in range(100):
+            backend.audio_controls.song_pointer += 1
+            backend.notify_queue("current", backend.audio_controls.song_pointer)
+        pump(0)
+
+    current_s = timed(advance)
+
+    def redisplay():
+        for _ in range(100):
+            ui.update_queue_display()
+        pump(0)
+
+    display_s = timed(redisplay)
+    controls = backend.audio_controls
+    text_s = timed(lambda: text_rebuild(controls.queue, controls.song_pointer))
+    backend.scheduler.close()
+    ui.close()
+    return {
+        "queue_length": len(controls.queue),
+        "model_rows": ui.queue_model.rows,
+        "set_queue_s": set_queue_s,
+        "visible_paint_s": paint_s,
+        "insert_per_edit_s": insert_s / edits,
+        "current_change_s": current_s / 100,
+        "update_queue_display_s": display_s / 100,
+        "text_rebuild_s": text_s,
+    }
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print(json.dumps(run(n), indent=2))
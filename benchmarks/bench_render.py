@@ -0,0 +1,92 @@
+"""Repaints and CPU use of MusicPlayerUI on Qt's offscreen platform.
+
+``legacy`` re-creates the old behaviour (a full-window update every 16 ms)
+for comparison.
+"""
+import json
+import os
+import sys
+import time
+
+from PyQt6.QtCore import QTimer
+
+from benchmarks.offscreen import make_ui, pump
+
+
+def phase(ui, seconds, setup=None, teardown=None):
+    render = ui.render
+    render.frame_times.clear()
+    before = render.stats()
+    if setup is not None:
+        setup()
+    cpu = time.process_time()
+    pump(seconds * 1000)
+    cpu = time.process_time() - cpu
+    if teardown is not None:
+        teardown()
+    after = render.stats()
+    return {
+        "ticks": after["ticks"] - before["ticks"],
+        "repaints": after["repaints"] - before["repaints"],
+        "cpu_per_wall_s": cpu / seconds,
+        **{k: v for k, v in after.items() if k.startswith("frame_")},
+    }
+
+
+def full_paints(ui, frames=100):
+    """Synchronous repaint() of the whole window: one paintEvent with nothing clipped away."""
+    samples = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        ui.repaint()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {
+        "paint_event_mean_ms": 1000 * sum(samples) / len(samples),
+        "paint_event_p95_ms": 1000 * samples[int(len(samples) * 0.95)],
+    }
+
+
+def run(seconds=2.0, n_tracks=10000):
+    ui = make_ui(n_tracks)
+    results = {"idle": phase(ui, seconds), "full_paint": full_paints(ui)}
+
+    # Thirty seconds of full-scale noise stand in for every track's samples, so the spectrum has work to do.
+    noise = os.urandom(44100 * 4 * 30)
+    ui.backend.mixer.pcm_source = lambda song: (noise, (44100, -16, 2))
+
+    def play():
+        ui.backend.set_queue(list(ui.songs_path[:10]))
+        ui.backend.start()
+        ui.is_playing = True
+
+    def stop():
+        ui.is_playing = False
+
+    results["playing"] = phase(ui, seconds, play, stop)
+
+    def scroll():
+        for offset in range(0, 200, 20):
+            ui.scroll_to(offset)
+
+    results["scrolling"] = phase(ui, seconds, scroll)
+
+    legacy = QTimer()
+    legacy.timeout.connect(ui.update)
+
+    def legacy_start():
+        ui.is_playing = True
+        legacy.start(16)
+
+    def legacy_stop():
+        legacy.stop()
+        ui.is_playing = False
+
+    results["legacy_full_repaint"] = phase(ui, seconds, legacy_start, legacy_stop)
+    ui.close()
+    return results
+
+
+if __name__ == "__main__":
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    print(json.dumps(run(seconds), indent=2))
@@ -0,0 +1,40 @@
+import json
+import sys
+import tempfile
+import time
+from os import path
+
+from benchmarks.synthetic import make_tree
+from utils.scanner import Scanner
+
+SHAPES = {
+    'wide': {'width': 60, 'depth': 2},
+    'deep': {'width': 2, 'depth': 9},
+}
+
+
+def measure(root, workers):
+    scanner = Scanner(workers=workers)
+    start = time.perf_counter()
+    first = None
+    total = 0
+    for batch in scanner.scan(root):
+        if first is None:
+            first = time.perf_counter() - start
+        total += len(batch)
+    return {'first_batch_s': first, 'total_s': time.perf_counter() - start, 'tracks': total}
+
+
+def run(n_files=20000, worker_counts=(1, 4, 8)):
+    results = {}
+    for shape, params in SHAPES.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            root = path.join(tmp, 'Music')
+            make_tree(root, n_files, **params)
+            results[shape] = {f'workers_{w}': measure(root, w) for w in worker_counts}
+    return results
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print(json.dumps(run(n), indent=2))
@@ -0,0 +1,125 @@
+import json
+import random
+import sys
+import threading
+import time
+import tracemalloc
+
+from utils.search_index import SearchIndex, SearchWorker
+
+WORDS = ("love", "night", "dream", "fire", "heart", "rain", "summer", "blue", "road", "river",
+         "electric", "shadow", "golden", "midnight", "ocean", "city", "light", "dance", "wild", "home")
+
+
+def library(n_tracks, seed=1):
+    rng = random.Random(seed)
+    tracks = []
+    for i in range(n_tracks):
+        artist = f"artist{rng.randrange(max(1, n_tracks // 20))}"
+        title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4)))
+        tracks.append(f"/music/{artist}/{artist} - {title} {i}.mp3")
+    return tracks
+
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def keystrokes(index, query, repeat=3):
+    """Latency of each prefix of ``query``, as if typed one character at a time.
+
+    Returns the first run of each keystroke and the best of ``repeat`` runs;
+    on a busy machine a single run often includes being preempted.
+    """
+    first = []
+    best = []
+    for end in range(1, len(query) + 1):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            index.search(query[:end])
+            times.append(time.perf_counter() - start)
+        first.append(times[0])
+        best.append(min(times))
+    return first, best
+
+
+def worker_latency(index, queries):
+    """Time from the last keystroke to its result, with every earlier keystroke superseded."""
+    worker = SearchWorker(index)
+    done = threading.Event()
+    latest = {}
+
+    def on_result(generation, query, results):
+        if generation == latest["generation"]:
+            done.set()
+
+    times = []
+    for query in queries:
+        done.clear()
+        start = time.perf_counter()
+        for end in range(1, len(query) + 1):
+            latest["generation"] = worker.submit(query[:end], on_result)
+        done.wait()
+        times.append(time.perf_counter() - start)
+    worker.close()
+    return times
+
+
+def measure(n_tracks):
+    tracks = library(n_tracks)
+    start = time.perf_counter()
+    index = SearchIndex()
+    index.rebuild(tracks)
+    build_s = time.perf_counter() - start
+    # Built a second time under tracemalloc, which would skew the timing above.
+    tracemalloc.start()
+    measured = SearchIndex()
+    measured.rebuild(tracks)
+    index_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    first = []
+    typed = []
+    for query in ("midnight ocean", "artist1 love", "electric dre", "golden"):
+        runs = keystrokes(index, query)
+        first.extend(runs[0])
+        typed.extend(runs[1])
+    first.sort()
+    typed.sort()
+
+    fuzzy = []
+    for query in ("midnigt", "electirc", "shadw", "rivr blue"):
+        start = time.perf_counter()
+        index.search(query)
+        fuzzy.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for track in tracks[:1000]:
+        index.remove(track)
+    for track in tracks[:1000]:
+        index.add(track)
+    update_s = (time.perf_counter() - start) / 2000
+
+    burst = sorted(worker_latency(index, ["midnight ocean", "golden heart", "summer rain"]))
+    return {
+        "tracks": n_tracks,
+        "words": len(index.postings),
+        "build_s": build_s,
+        "index_bytes": index_bytes,
+        "keystroke_p50_ms": 1000 * percentile(typed, 0.5),
+        "keystroke_p95_ms": 1000 * percentile(typed, 0.95),
+        "keystroke_first_p95_ms": 1000 * percentile(first, 0.95),
+        "fuzzy_max_ms": 1000 * max(fuzzy),
+        "update_per_track_us": 1e6 * update_s,
+        "typed_burst_max_ms": 1000 * burst[-1],
+    }
+
+
+def run(sizes=(1000, 100000, 1000000)):
+    return [measure(n) for n in sizes]
+
+
+if __name__ == "__main__":
+    sizes = [int(n) for n in sys.argv[1:]] or (1000, 100000, 1000000)
+    print(json.dumps(run(sizes), indent=2))
@@ -0,0 +1,54 @@
+"""Per-frame paint cost with and without the sprite cache, on Qt's offscreen platform."""
+import json
+import sys
+import time
+
+from benchmarks.offscreen import make_ui
+
+
+def frame_cost(ui, frames, region=None):
+    samples = []
+    for i in range(frames):
+        ui.progress = (i % 100) / 100
+        start = time.perf_counter()
+        if region is None:
+            ui.grab()
+        else:
+            ui.grab(region)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {
+        "mean_ms": 1000 * sum(samples) / len(samples),
+        "p95_ms": 1000 * samples[int(len(samples) * 0.95)],
+    }
+
+
+def run(frames=300):
+    ui = make_ui(1000)
+    ui._is_playing = True
+    ui.bars = [(i % 7) / 7 for i in range(32)]
+    ui.waveform = [(-(i % 13) / 13, (i % 11) / 11) for i in range(400)]
+    visualizer = ui.region_rect("visualizer").toAlignedRect()
+    results = {}
+    for enabled in (False, True):
+        ui.sprites.enabled = enabled
+        ui.sprites.invalidate()
+        label = "sprites" if enabled else "direct"
+        results[label] = {
+            "full_frame": frame_cost(ui, frames),
+            "visualizer_only": frame_cost(ui, frames, visualizer),
+        }
+    ui.toggle_theme()
+    start = time.perf_counter()
+    ui.grab()
+    results["first_frame_after_theme_change_ms"] = 1000 * (time.perf_counter() - start)
+    results["sprite_hits"] = ui.sprites.hits
+    results["sprite_misses"] = ui.sprites.misses
+    ui.backend.scheduler.close()
+    ui.close()
+    return results
+
+
+if __name__ == "__main__":
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    print(json.dumps(run(frames), indent=2))
@@ -0,0 +1,165 @@
+"""Cold-start cost: import time, time to first paint and time to the first playable track.
+
+Each start runs in a fresh interpreter against a synthetic music folder
+and its own data directory. "first_run" has no saved library snapshot and
+scans the folder; "next_run" starts from the snapshot the previous run
+saved on close. The .wav tracks hold a little real audio, and the first one
+listed is played through the app's own PygameMixer on SDL's dummy driver,
+so first_playable_s includes opening the mixer and decoding the track.
+
+``--check`` compares ``-X importtime`` for the UI entry point with
+startup_budget.json and exits with status 1 when it is over budget or
+imports a module listed there as lazy, such as pygame.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from os import path
+
+ROOT = path.dirname(path.dirname(path.abspath(__file__)))
+BUDGET_PATH = path.join(path.dirname(path.abspath(__file__)), "startup_budget.json")
+
+
+def child_env(home):
+    return dict(os.environ, LOCALAPPDATA=home, USERPROFILE=home, QT_QPA_PLATFORM="offscreen",
+                SDL_AUDIODRIVER="dummy", PYTHONPATH=ROOT)
+
+
+def importtime(module="ui.ui_manager", runs=3):
+    """Cumulative import time of ``module`` in ms (best of ``runs``) and every module it pulled in."""
+    best = None
+    modules = set()
+    with tempfile.TemporaryDirectory() as home:
+        for _ in range(runs):
+            out = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                 cwd=ROOT, env=child_env(home), capture_output=True, text=True, check=True)
+            for line in out.stderr.splitlines():
+                if not line.startswith("import time:") or "|" not in line:
+                    continue
+                _, cumulative, name = line[len("import time:"):].split("|")
+                if not cumulative.strip().isdigit():
+                    continue
+                modules.add(name.strip())
+                if name.strip() == module:
+                    ms = int(cumulative) / 1000
+                    best = ms if best is None else min(best, ms)
+    return best, modules
+
+
+def check(budget_path=BUDGET_PATH):
+    with open(budget_path) as f:
+        budget = json.load(f)
+    ms, modules = importtime(budget["module"])
+    failures = []
+    if ms > budget["max_import_ms"]:
+        failures.append(f"importing {budget['module']} took {ms:.0f} ms, budget {budget['max_import_ms']} ms")
+    for name in budget["lazy"]:
+        loaded = sorted(m for m in modules if m == name or m.startswith(name + "."))
+        if loaded:
+            failures.append(f"{name} is imported at startup ({', '.join(loaded[:3])})")
+    return {"module": budget["module"], "import_ms": ms, "failures": failures}
+
+
+def probe():
+    """Runs in the child: start the UI, then play the first track as soon as there is one."""
+    started = float(os.environ["STARTUP_T0"])
+    from PyQt6.QtWidgets import QApplication
+
+    app = QApplication([])
+    from playlist.playlists_manager import PlaylistManager
+    from ui.ui import MusicPlayerUI
+
+    marks = {}
+
+    def mark(name):
+        marks.setdefault(name, time.time() - started)
+
+    class Probe(MusicPlayerUI):
+        def paintEvent(self, event):
+            super().paintEvent(event)
+            mark("first_paint_s")
+            if self.songs_path:
+                mark("first_rows_s")
+
+    ui = Probe(PlaylistManager())
+    ui.backend.subscribe_queue(lambda kind, first, count, tracks: kind == "current" and mark("first_playable_s"))
+    mark("constructed_s")
+    ui.show()
+    deadline = time.time() + 60
+    while "first_playable_s" not in marks and time.time() < deadline:
+        app.processEvents()
+        if "first_rows_s" in marks and "play_clicked_s" not in marks:
+            # Only the .wav tracks decode; every fourth synthetic track is one.
+            playable = next((i for i, track in enumerate(ui.songs_path) if track.endswith(".wav")), None)
+            if playable is not None:
+                mark("play_clicked_s")
+                ui.selected_index = playable
+                ui.play_song()
+        time.sleep(0.001)
+    ui.backend.scheduler.close()
+    ui.close()
+    print(json.dumps(marks))
+
+
+def fill_wavs(root, seconds=0.05, rate=8000):
+    """Give every .wav track under ``root`` ``seconds`` of silence, so the real mixer can play it."""
+    frames = b"\0\0" * int(seconds * rate)
+    for dir_path, _, names in os.walk(root):
+        for name in names:
+            if name.endswith(".wav"):
+                with wave.open(path.join(dir_path, name), "wb") as w:
+                    w.setnchannels(1)
+                    w.setsampwidth(2)
+                    w.setframerate(rate)
+                    w.writeframes(frames)
+
+
+def start_once(home):
+    env = child_env(home)
+    env["STARTUP_T0"] = repr(time.time())
+    out = subprocess.run([sys.executable, "-m", "benchmarks.bench_startup", "--probe"],
+                         cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    # A lane thread can still print after the marks, so take the line that holds them.
+    return json.loads(next(line for line in reversed(out.stdout.splitlines()) if line.startswith("{")))
+
+
+def summarize(samples):
+    keys = [key for key in samples[0] if key.endswith("_s")]
+    summary = {key: statistics.median(sample[key] for sample in samples if key in sample) for key in keys}
+    return summary
+
+
+def run(n_tracks=20000, runs=3):
+    from benchmarks.synthetic import make_tree
+
+    first, following = [], []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as home:
+            make_tree(path.join(home, "Music"), n_tracks)
+            fill_wavs(path.join(home, "Music"))
+            first.append(start_once(home))
+            following.append(start_once(home))
+    ms, _ = importtime()
+    return {
+        "tracks": n_tracks,
+        "import_ms": ms,
+        "first_run": summarize(first),
+        "next_run": summarize(following),
+    }
+
+
+if __name__ == "__main__":
+    if "--probe" in sys.argv:
+        probe()
+    elif "--check" in sys.argv:
+        result = check()
+        print(json.dumps(result, indent=2))
+        sys.exit(1 if result["failures"] else 0)
+    else:
+        n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+        print(json.dumps(run(n), indent=2))
@@ -0,0 +1,65 @@
+"""GUI-thread cost of player and playlist actions with a slow mixer, on Qt's offscreen platform.
+
+``SlowMixer.load`` stands in for pygame opening and decoding a file from a
+cold disk. ``direct_*`` is what the click handler used to pay by calling the
+backend inline; ``click_*`` is the same click through the task layer.
+"""
+import json
+import sys
+import time
+
+from benchmarks.offscreen import make_ui, pump
+from player.mixer_backend import FakeMixer
+from player.player import Music_player
+
+
+class SlowMixer(FakeMixer):
+    def __init__(self, load_delay):
+        super().__init__(default_duration=3600)
+        self.load_delay = load_delay
+
+    def load(self, path):
+        time.sleep(self.load_delay)
+        super().load(path)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def run(n_tracks=10000, clicks=20, load_delay=0.1):
+    ui = make_ui(n_tracks)
+    ui.backend.scheduler.close()
+    ui.backend = backend = Music_player(mixer=SlowMixer(load_delay))
+    backend.set_queue(ui.songs_path, 0)
+
+    direct = [timed(backend.next_song) for _ in range(3)]
+    detector = ui.stall_detector
+    stalls_before = detector.stalls
+
+    clicks_s = [timed(lambda: ui.handle_bottom_button("next")) for _ in range(clicks)]
+    start = time.perf_counter()
+    while backend.audio_controls.song_pointer < 3 + clicks and time.perf_counter() - start < 30:
+        pump(10)
+    settled_s = time.perf_counter() - start
+
+    favorites_s = [timed(lambda: ui.add_to_favorites()) for _ in range(clicks)]
+    pump(50)
+    backend.scheduler.close()
+    ui.close()
+    return {
+        "mixer_load_s": load_delay,
+        "direct_next_s": max(direct),
+        "click_next_max_s": max(clicks_s),
+        "clicks_settled_s": settled_s,
+        "final_pointer": backend.audio_controls.song_pointer,
+        "click_favorite_max_s": max(favorites_s),
+        "gui_stalls": detector.stalls - stalls_before,
+    }
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    print(json.dumps(run(n), indent=2))
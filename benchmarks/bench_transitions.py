@@ -0,0 +1,43 @@
+import json
+import sys
+import time
+
+from player.mixer_backend import FakeMixer
+from player.player import Music_player
+
+
+def boundary_gaps(mixer):
+    """Seconds between each track's natural end and the next play() on the fake clock."""
+    plays = [(at, path) for at, action, path in mixer.log if action == "play"]
+    return [nxt[0] - (at + mixer.length(path)) for (at, path), nxt in zip(plays, plays[1:])]
+
+
+def measure(n_tracks, track_seconds, report_duration):
+    tracks = [f"/music/track{i}.mp3" for i in range(n_tracks)]
+    mixer = FakeMixer(default_duration=track_seconds, report_duration=report_duration)
+    player = Music_player(mixer=mixer)
+    player.set_queue(tracks)
+    player.start()
+    deadline = time.monotonic() + n_tracks * track_seconds * 3 + 1
+    while player.audio_controls.song_pointer < n_tracks - 1 and time.monotonic() < deadline:
+        time.sleep(track_seconds)
+    time.sleep(track_seconds * 1.5)
+    player.scheduler.close()
+    gaps = sorted(boundary_gaps(mixer))
+    return {
+        "transitions": player.scheduler.transitions.summary(),
+        "boundary_gap_mean_s": sum(gaps) / len(gaps) if gaps else None,
+        "boundary_gap_max_s": gaps[-1] if gaps else None,
+    }
+
+
+def run(n_tracks=40, track_seconds=0.05):
+    return {
+        "known_duration": measure(n_tracks, track_seconds, True),
+        "unknown_duration": measure(n_tracks, track_seconds, False),
+    }
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    print(json.dumps(run(n), indent=2))
@@ -0,0 +1,105 @@
+"""Cost of the visualizations: waveform overviews in bulk, and spectrum frames at every quality level.
+
+``overview`` is the min/max decimation alone (the loudness pass supplies
+the decoded samples). ``spectrum`` times one frame per FFT size on random
+16-bit stereo noise. ``constrained`` runs the worker for real with a budget
+no frame can meet, to show it stepping down to its cheapest level instead
+of falling behind.
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from os import path
+
+from metadata.waveform import WaveformCache, overview
+from player.mixer_backend import FakeMixer
+from player.player import Music_player
+from player.spectrum import LEVELS, SpectrumWorker
+
+RATE = 44100
+
+
+def overview_cost(n_tracks, seconds):
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    samples = rng.integers(-32768, 32767, (int(seconds * RATE), 2), dtype=np.int16)
+    start = time.process_time()
+    for _ in range(n_tracks):
+        data = overview(samples, 1 / 32768)
+    cpu = time.process_time() - start
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = WaveformCache(path.join(tmp, "waveforms.db"))
+        cache.put_many([(f"/music/{i}.mp3", 1, 1, data) for i in range(n_tracks)])
+        start = time.perf_counter()
+        for i in range(n_tracks):
+            cache.get(f"/music/{i}.mp3", 1, 1)
+        lookup = (time.perf_counter() - start) / n_tracks
+        cache.close()
+        db_bytes = path.getsize(path.join(tmp, "waveforms.db"))
+    return {
+        "overview_s": cpu / n_tracks,
+        "audio_hours_per_cpu_minute": (n_tracks * seconds / 3600) / (cpu / 60),
+        "overview_bytes": len(data),
+        "cache_get_s": lookup,
+        "cache_bytes_per_track": db_bytes / n_tracks,
+    }
+
+
+def playing(seconds):
+    """A Music_player on a FakeMixer that serves ``seconds`` of noise as every track's samples."""
+    noise = os.urandom(RATE * 4 * int(seconds))
+    mixer = FakeMixer(default_duration=seconds)
+    mixer.pcm_source = lambda song: (noise, (RATE, -16, 2))
+    player = Music_player(mixer=mixer)
+    player.set_queue(["/music/noise.mp3"])
+    with contextlib.redirect_stdout(io.StringIO()):
+        player.start()
+    return player
+
+
+def spectrum_cost(player, frames):
+    import numpy as np
+
+    worker = SpectrumWorker(player, lambda: None)
+    worker.heights = np.zeros(worker.bands, np.float32)
+    worker.load(player.current_song())
+    result = {}
+    for size, interval in sorted(set(LEVELS)):
+        start = time.perf_counter()
+        for _ in range(frames):
+            worker.compute(np, size, interval, True)
+        result[f"fft_{size}_{round(1 / interval)}fps_frame_us"] = 1e6 * (time.perf_counter() - start) / frames
+    worker.close()
+    return result
+
+
+def constrained(player, seconds):
+    frames = []
+    worker = SpectrumWorker(player, lambda: frames.append(worker.take()), budget=1e-7)
+    worker.set_active(True)
+    time.sleep(seconds)
+    worker.set_active(False)
+    stats = worker.stats()
+    worker.close()
+    return dict(stats, frames_delivered=len(frames), cheapest=stats["level"] == len(LEVELS) - 1)
+
+
+def run(n_tracks=50, seconds=240.0, frames=500, live_s=1.0):
+    player = playing(30)
+    result = {
+        "overview": overview_cost(n_tracks, seconds),
+        "spectrum": spectrum_cost(player, frames),
+        "constrained": constrained(player, live_s),
+    }
+    player.scheduler.close()
+    return result
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    print(json.dumps(run(n), indent=2))
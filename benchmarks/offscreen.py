@@ -0,0 +1,51 @@
+"""Headless MusicPlayerUI for benchmarks: Qt's offscreen platform and a FakeMixer backend."""
+import os
+import tempfile
+from os import path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import QEventLoop, QTimer
+from PyQt6.QtWidgets import QApplication
+
+from player.mixer_backend import FakeMixer
+from player.player import Music_player
+from playlist.playlists import Playlist
+from playlist.playlists_manager import PlaylistManager
+from playlist.store import PlaylistStore
+from utils.library_service import LibraryService
+
+
+_app = None
+
+
+def app():
+    global _app
+    # Keep a reference: an unreferenced QApplication is collected straight away.
+    _app = QApplication.instance() or QApplication([])
+    return _app
+
+
+def pump(ms):
+    """Run the Qt event loop for ``ms`` milliseconds."""
+    loop = QEventLoop()
+    QTimer.singleShot(int(ms), loop.quit)
+    loop.exec()
+
+
+def make_ui(n_tracks=10000, tmp_dir=None):
+    """A shown MusicPlayerUI over ``n_tracks`` synthetic library paths."""
+    from ui.ui import MusicPlayerUI
+
+    app()
+    tmp_dir = tmp_dir or tempfile.mkdtemp()
+    library = LibraryService.instance()
+    # Publishing first marks the library loaded, so the UI does not scan the real music folder.
+    library.publish([f"/music/artist{i % 100}/album{i % 7}/track{i:07d}.mp3" for i in range(n_tracks)])
+    manager = PlaylistManager(Playlist(PlaylistStore(path.join(tmp_dir, "playlists.db")),
+                                       legacy_path=path.join(tmp_dir, "playlists.json")))
+    ui = MusicPlayerUI(manager, backend=Music_player(mixer=FakeMixer(default_duration=3600)))
+    ui.songs_path = library.snapshot()
+    ui.show()
+    pump(50)
+    return ui
@@ -0,0 +1,297 @@
+"""Runs the benchmarks as one suite and compares results against a baseline.
+
+    python -m benchmarks.suite run [--profile quick|full] [--only a,b] [--repeat N] [--out results.json]
+    python -m benchmarks.suite compare baseline.json results.json [--threshold 0.25] [--floor 1e-6]
+
+Every benchmark runs in its own interpreter with Qt's offscreen platform,
+SDL's dummy audio driver and a throwaway data and music directory, so one
+cannot warm caches for the next and nothing touches the real library.
+A benchmark whose optional dependency (PyQt6, pygame) is missing is
+recorded as skipped rather than failing the run.
+
+``compare`` looks at timings (keys ending in _s, _ms or _us) and sizes
+(_bytes, _mb), where lower is better. A metric is a regression when it
+grew by more than ``threshold`` of the baseline; timings under ``floor``
+seconds on both sides are too noisy to count. Single timings of a few
+milliseconds jitter by more than 25% between runs, so baselines meant to
+gate CI are best recorded with ``--repeat 3`` (per-metric best of three).
+Exits with status 1 on any regression.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from os import path
+
+ROOT = path.dirname(path.dirname(path.abspath(__file__)))
+
+OPTIONAL = ("PyQt6", "pygame", "numpy")
+
+# name: (module, {profile: keyword arguments for run()})
+SUITE = {
+    "file_manager": ("benchmarks.bench_file_manager", {
+        "quick": {"sizes": [1000, 10000]},
+        "full": {"sizes": [1000, 100000, 1000000]},
+    }),
+    "queue": ("benchmarks.bench_queue", {
+        "quick": {"sizes": [1000, 100000], "repeat": 20},
+        "full": {"sizes": [1000, 100000, 1000000], "repeat": 50},
+    }),
+    "playlists": ("benchmarks.bench_playlists", {
+        "quick": {"sizes": [1000, 10000]},
+        "full": {"sizes": [1000, 10000, 100000, 1000000]},
+    }),
+    "search": ("benchmarks.bench_search", {
+        "quick": {"sizes": [1000, 100000]},
+        "full": {"sizes": [1000, 100000, 1000000]},
+    }),
+    "render": ("benchmarks.bench_render", {
+        "quick": {"seconds": 0.5, "n_tracks": 10000},
+        "full": {"seconds": 2.0, "n_tracks": 100000},
+    }),
+    "list_paint": ("benchmarks.bench_list_paint", {
+        "quick": {"sizes": [10000]},
+        "full": {"sizes": [10000, 1000000]},
+    }),
+    "queue_panel": ("benchmarks.bench_queue_panel", {
+        "quick": {"n_tracks": 10000, "edits": 200},
+        "full": {"n_tracks": 100000, "edits": 1000},
+    }),
+    "transitions": ("benchmarks.bench_transitions", {
+        "quick": {"n_tracks": 10},
+        "full": {"n_tracks": 40},
+    }),
+    "metrics": ("benchmarks.bench_metrics", {
+        "quick": {"calls": 200000},
+        "full": {"calls": 1000000},
+    }),
+    "loudness": ("benchmarks.bench_loudness", {
+        "quick": {"n_tracks": 8, "seconds": 20.0},
+        "full": {"n_tracks": 32, "seconds": 60.0},
+    }),
+    "visualizer": ("benchmarks.bench_visualizer", {
+        "quick": {"n_tracks": 10, "frames": 200, "live_s": 0.5},
+        "full": {"n_tracks": 50, "frames": 1000, "live_s": 2.0},
+    }),
+    "gapless": ("benchmarks.bench_gapless", {
+        "quick": {"n_tracks": 4},
+        "full": {"n_tracks": 10},
+    }),
+}
+
+SIZE_KEYS = ("files", "tracks", "total_songs", "entries", "rows")
+LOWER_IS_BETTER = ("_s", "_ms", "_us", "_bytes", "_mb")
+TIME_SCALE = {"_s": 1.0, "_ms": 1e-3, "_us": 1e-6}
+NOISE_FLOOR_S = 1e-6
+
+
+def child(module, kwargs_json, out_path):
+    """Runs in the benchmark's interpreter and writes its result to ``out_path``."""
+    import importlib
+
+    start = time.perf_counter()
+    try:
+        result = importlib.import_module(module).run(**json.loads(kwargs_json))
+    except ModuleNotFoundError as e:
+        if e.name is None or e.name.split(".")[0] not in OPTIONAL:
+            raise
+        result = {"skipped": f"{e.name} is not installed"}
+    else:
+        result = {"elapsed_s": time.perf_counter() - start, "result": result}
+    with open(out_path, "w") as f:
+        json.dump(result, f)
+
+
+def run_one(name, profile):
+    module, profiles = SUITE[name]
+    with tempfile.TemporaryDirectory() as home:
+        out_path = path.join(home, "result.json")
+        env = dict(os.environ, LOCALAPPDATA=home, USERPROFILE=home, PYTHONPATH=ROOT,
+                   QT_QPA_PLATFORM="offscreen", SDL_AUDIODRIVER="dummy")
+        proc = subprocess.run([sys.executable, "-m", "benchmarks.suite", "--child", module,
+                               json.dumps(profiles[profile]), out_path],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if proc.returncode != 0 or not path.exists(out_path):
+            return {"failed": proc.stderr.strip().splitlines()[-1:] or [f"exit status {proc.returncode}"]}
+        with open(out_path) as f:
+            return json.load(f)
+
+
+def best_of(a, b):
+    """Per-metric minimum of two results with the same shape."""
+    if isinstance(a, dict) and isinstance(b, dict):
+        return {key: best_of(value, b[key]) if key in b else value for key, value in a.items()}
+    if isinstance(a, list) and isinstance(b, list) and len(a) == len(b):
+        return [best_of(x, y) for x, y in zip(a, b)]
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return min(a, b)
+    return a
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+
+def run(profile="quick", only=None, repeat=1):
+    results = {}
+    for name in only or SUITE:
+        print(f"{name} ...", end=" ", file=sys.stderr, flush=True)
+        result = run_one(name, profile)
+        for _ in range(repeat - 1):
+            if "result" not in result:
+                break
+            again = run_one(name, profile)
+            if "result" in again:
+                result["result"] = best_of(result["result"], again["result"])
+                result["elapsed_s"] += again["elapsed_s"]
+        results[name] = result
+        status = ("skipped: " + result["skipped"]) if "skipped" in result else \
+                 ("failed" if "failed" in result else f"{result['elapsed_s']:.1f} s")
+        print(status, file=sys.stderr, flush=True)
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": git_commit(),
+            "profile": profile,
+            "repeat": repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+
+def flatten(value, prefix=""):
+    """Dotted metric names to numbers; list items are named by their size field when they have one."""
+    if isinstance(value, dict):
+        items = value.items()
+    elif isinstance(value, list):
+        items = []
+        for i, item in enumerate(value):
+            label = str(i)
+            if isinstance(item, dict):
+                label = next((f"{key}={item[key]}" for key in SIZE_KEYS if key in item), label)
+            items.append((label, item))
+    else:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return {prefix: value}
+        return {}
+    flat = {}
+    for key, item in items:
+        flat.update(flatten(item, f"{prefix}.{key}" if prefix else str(key)))
+    return flat
+
+
+def compared(name):
+    return name.rsplit(".", 1)[-1].endswith(LOWER_IS_BETTER)
+
+
+def seconds(name, value):
+    for suffix, scale in TIME_SCALE.items():
+        if name.endswith(suffix):
+            return value * scale
+    return None
+
+
+def compare(baseline, current, threshold=0.25, floor=NOISE_FLOOR_S):
+    """Regressions and improvements of ``current`` against ``baseline`` as (name, old, new, change) tuples."""
+    regressions, improvements, notes = [], [], []
+    for bench, base_result in baseline["results"].items():
+        result = current["results"].get(bench)
+        if result is None:
+            notes.append(f"{bench}: not in current results")
+            continue
+        if "result" not in base_result or "result" not in result:
+            notes.append(f"{bench}: skipped or failed in one of the runs")
+            continue
+        old, new = flatten(base_result["result"], bench), flatten(result["result"], bench)
+        for name in sorted(old):
+            if not compared(name) or name not in new:
+                continue
+            before, after = old[name], new[name]
+            old_s, new_s = seconds(name, before), seconds(name, after)
+            if old_s is not None and old_s < floor and new_s < floor:
+                continue
+            if before <= 0:
+                continue
+            change = (after - before) / before
+            if change > threshold:
+                regressions.append((name, before, after, change))
+            elif change < -threshold:
+                improvements.append((name, before, after, change))
+    return regressions, improvements, notes
+
+
+def report(regressions, improvements, notes):
+    for title, rows in (("Regressions", regressions), ("Improvements", improvements)):
+        if rows:
+            print(f"{title}:")
+            for name, before, after, change in sorted(rows, key=lambda row: -abs(row[3])):
+                print(f"  {name}: {before:.4g} -> {after:.4g} ({change:+.0%})")
+    for note in notes:
+        print(f"note: {note}")
+    if not regressions:
+        print("No regressions.")
+
+
+def option(args, flag, default=None):
+    if flag in args:
+        i = args.index(flag)
+        value = args[i + 1]
+        del args[i:i + 2]
+        return value
+    return default
+
+
+def main(args):
+    if args[:1] == ["--child"]:
+        child(*args[1:4])
+        return 0
+    command, args = (args[0], args[1:]) if args else ("run", [])
+    if command == "run":
+        profile = option(args, "--profile", "quick")
+        only = option(args, "--only")
+        out = option(args, "--out")
+        repeat = int(option(args, "--repeat", "1"))
+        if profile not in ("quick", "full"):
+            print(f"unknown profile {profile!r}", file=sys.stderr)
+            return 2
+        names = only.split(",") if only else None
+        unknown = [name for name in names or () if name not in SUITE]
+        if unknown:
+            print(f"unknown benchmarks: {', '.join(unknown)} (have {', '.join(SUITE)})", file=sys.stderr)
+            return 2
+        results = run(profile, names, repeat)
+        text = json.dumps(results, indent=2)
+        if out:
+            with open(out, "w") as f:
+                f.write(text + "\n")
+        else:
+            print(text)
+        return 1 if any("failed" in r for r in results["results"].values()) else 0
+    if command == "compare":
+        threshold = float(option(args, "--threshold", "0.25"))
+        floor = float(option(args, "--floor", str(NOISE_FLOOR_S)))
+        if len(args) != 2:
+            print(__doc__, file=sys.stderr)
+            return 2
+        with open(args[0]) as f:
+            baseline = json.load(f)
+        with open(args[1]) as f:
+            current = json.load(f)
+        regressions, improvements, notes = compare(baseline, current, threshold, floor)
+        report(regressions, improvements, notes)
+        return 1 if regressions else 0
+    print(__doc__, file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
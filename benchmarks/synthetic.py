@@ -0,0 +1,92 @@
+import os
+import struct
+import wave
+from os import path
+
+EXTENSIONS = ('.mp3', '.flac', '.ogg', '.wav')
+
+
+def make_tree(root, n_files, width=10, depth=3, files_per_dir=None):
+    """Create ``n_files`` empty tracks spread over a ``width``-ary tree of ``depth`` levels."""
+    dirs = [root]
+    level = [root]
+    for _ in range(depth):
+        level = [path.join(parent, f"d{i}") for parent in level for i in range(width)]
+        dirs.extend(level)
+    if files_per_dir is None:
+        files_per_dir = max(1, -(-n_files // len(dirs)))
+    created = 0
+    for dir_path in dirs:
+        if created >= n_files:
+            break
+        os.makedirs(dir_path, exist_ok=True)
+        for i in range(min(files_per_dir, n_files - created)):
+            name = f"track{i:05d}{EXTENSIONS[i % len(EXTENSIONS)]}"
+            with open(path.join(dir_path, name), 'wb'):
+                pass
+            created += 1
+    return created
+
+
+def id3v2(title, artist, album):
+    frames = b""
+    for frame_id, text in ((b"TIT2", title), (b"TPE1", artist), (b"TALB", album)):
+        body = b"\x03" + text.encode("utf-8")
+        frames += frame_id + struct.pack(">I", len(body)) + b"\0\0" + body
+    size = len(frames)
+    syncsafe = bytes([(size >> 21) & 0x7F, (size >> 14) & 0x7F, (size >> 7) & 0x7F, size & 0x7F])
+    return b"ID3\x03\0\0" + syncsafe + frames
+
+
+def vorbis_comment(title, artist, album):
+    comments = [f"TITLE={title}", f"ARTIST={artist}", f"ALBUM={album}"]
+    data = struct.pack("<I", 4) + b"test" + struct.pack("<I", len(comments))
+    for comment in comments:
+        raw = comment.encode("utf-8")
+        data += struct.pack("<I", len(raw)) + raw
+    return data
+
+
+def ogg_page(packet, granule):
+    lacing = [255] * (len(packet) // 255) + [len(packet) % 255]
+    return b"OggS\0\0" + struct.pack("<qIII", granule, 1, 0, 0) + bytes([len(lacing)]) + bytes(lacing) + packet
+
+
+def write_tagged_track(file_path, i, seconds=180):
+    """Write a small file with real headers and tags (the audio payload is silence/garbage)."""
+    title, artist, album = f"Title {i}", f"Artist {i % 97}", f"Album {i % 311}"
+    ext = path.splitext(file_path)[1]
+    if ext == ".mp3":
+        frame = b"\xff\xfb\x90\x64" + b"\0" * 413
+        data = id3v2(title, artist, album) + frame * 20
+    elif ext == ".flac":
+        packed = (44100 << 44) | (1 << 41) | (15 << 36) | (44100 * seconds)
+        streaminfo = b"\0" * 10 + packed.to_bytes(8, "big") + b"\0" * 16
+        comment = vorbis_comment(title, artist, album)
+        data = (b"fLaC" + bytes([0]) + len(streaminfo).to_bytes(3, "big") + streaminfo
+                + bytes([0x84]) + len(comment).to_bytes(3, "big") + comment)
+    elif ext == ".ogg":
+        head = b"\x01vorbis" + struct.pack("<IBI", 0, 2, 44100) + b"\0" * 16
+        data = ogg_page(head, 0) + ogg_page(b"\x03vorbis" + vorbis_comment(title, artist, album), 0)
+        data += ogg_page(b"\0" * 64, 44100 * seconds)
+    else:
+        with wave.open(file_path, "wb") as w:
+            w.setnchannels(2)
+            w.setsampwidth(2)
+            w.setframerate(8000)
+            w.writeframes(b"\0" * 4 * 800)
+        return
+    with open(file_path, "wb") as f:
+        f.write(data)
+
+
+def make_tagged_library(root, n_files, files_per_dir=100):
+    paths = []
+    for i in range(n_files):
+        dir_path = path.join(root, f"a{i // files_per_dir:04d}")
+        if i % files_per_dir == 0:
+            os.makedirs(dir_path, exist_ok=True)
+        file_path = path.join(dir_path, f"t{i:06d}{EXTENSIONS[i % len(EXTENSIONS)]}")
+        write_tagged_track(file_path, i)
+        paths.append(file_path)
+    return paths
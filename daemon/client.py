@@ -0,0 +1,40 @@
+import json
+import socket
+import sys
+
+from utils.paths import socket_path
+
+
+class PlayerClient:
+    """One connection to a PlayerDaemon; ``send`` returns the decoded reply."""
+
+    def __init__(self, path=None, timeout=5.0):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(path or socket_path())
+        self.reader = self.sock.makefile("rb")
+
+    def send(self, command):
+        self.sock.sendall(command.encode("utf-8", "surrogateescape") + b"\n")
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("player closed the connection")
+        return json.loads(line)
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+
+def main(argv):
+    client = PlayerClient()
+    try:
+        reply = client.send(" ".join(argv) or "status")
+    finally:
+        client.close()
+    print(json.dumps(reply, indent=2))
+    return 0 if reply.get("ok") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
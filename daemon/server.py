@@ -0,0 +1,287 @@
+import json
+import os
+import queue
+import selectors
+import signal
+import socket
+import threading
+
+from metadata.loudness import LoudnessAnalyzer, normalize_library
+from player.player import Music_player
+from playlist.playlists_manager import PlaylistManager
+from utils import metrics
+from utils.library_service import LibraryService
+from utils.paths import music_folder, socket_path
+from utils.watcher import LibraryWatcher
+
+MAX_LINE = 64 * 1024
+
+
+class PlayerDaemon:
+    """Music_player, its queue and the playlists behind a Unix socket, without Qt.
+
+    Clients send one command per line and get one JSON object per line back:
+
+        play [index] | pause | next | prev | enqueue <path> | playlist <name>
+        volume <0-100> | status | metrics | profile [seconds]
+
+    Any number of clients can stay connected. Commands run one at a time,
+    in arrival order, on the thread that called ``serve``; every reply that
+    changes playback carries the resulting status. Nothing runs between
+    commands but the playback scheduler, so an idle daemon sleeps in select().
+    """
+
+    def __init__(self, path=None, player=None, playlists=None, library=None):
+        self.path = path or socket_path()
+        self.library = library or LibraryService.instance()
+        self.player = player or Music_player()
+        self.playlists = playlists or PlaylistManager()
+        self.selector = selectors.DefaultSelector()
+        self.server = None
+        self.buffers = {}
+        self.stopping = False
+        self.wake_r, self.wake_w = os.pipe()
+        self.commands = {
+            "play": self.play,
+            "pause": self.pause,
+            "next": self.next,
+            "prev": self.prev,
+            "enqueue": self.enqueue,
+            "playlist": self.playlist,
+            "volume": self.volume,
+            "status": self.status,
+            "metrics": self.metrics,
+            "profile": self.profile,
+        }
+
+    # -- commands -------------------------------------------------------
+
+    def play(self, arg):
+        if arg:
+            index = int(arg)
+            if not 0 <= index < len(self.player.audio_controls.queue):
+                raise ValueError(f"no track at {index}")
+            self.player.audio_controls.song_pointer = index
+            self.player.audio_controls.is_paused = False
+        self.player.start()
+        return self.status()
+
+    def pause(self, arg):
+        self.player.pause()
+        return self.status()
+
+    def next(self, arg):
+        self.player.next_song()
+        return self.status()
+
+    def prev(self, arg):
+        self.player.prev_song()
+        return self.status()
+
+    def enqueue(self, arg):
+        if not arg:
+            raise ValueError("enqueue needs a path")
+        self.player.enqueue(arg)
+        return self.status()
+
+    def playlist(self, arg):
+        if arg not in self.playlists.get_all_playlists():
+            raise ValueError(f"no playlist named {arg!r}")
+        self.player.set_queue(list(self.playlists.get_songs(arg)))
+        self.player.audio_controls.is_paused = False
+        self.player.start()
+        return self.status()
+
+    def volume(self, arg):
+        self.player.set_volume(int(arg) / 100)
+        return self.status()
+
+    def status(self, arg=""):
+        controls = self.player.audio_controls
+        queue = controls.queue
+        pointer = controls.song_pointer
+        if controls.is_paused:
+            state = "paused"
+        elif self.player.scheduler.active:
+            state = "playing"
+        else:
+            state = "stopped"
+        position = self.player.mixer.get_pos() if state != "stopped" else None
+        return {
+            "state": state,
+            "track": queue[pointer] if pointer < len(queue) else None,
+            "position": round(position, 2) if position is not None else None,
+            "index": pointer,
+            "queue_length": len(queue),
+            "volume": round(self.player.current_volume * 100),
+            "repeat": controls.repeat,
+            "library": len(self.library.snapshot(load=False)),
+        }
+
+    def metrics(self, arg):
+        return {"enabled": metrics.enabled, **metrics.registry.snapshot()}
+
+    def profile(self, arg):
+        file_path = metrics.profile_for(float(arg or 30))
+        if file_path is None:
+            raise ValueError("a profile is already running")
+        return {"profile": file_path}
+
+    def execute(self, line):
+        command, _, arg = line.strip().partition(" ")
+        handler = self.commands.get(command.lower())
+        if handler is None:
+            return {"ok": False, "error": f"unknown command {command!r}"}
+        try:
+            # The scheduler and the loudness pass touch the player from their own threads.
+            with self.player.transport:
+                result = handler(arg.strip())
+        except (ValueError, IndexError) as e:
+            return {"ok": False, "error": str(e)}
+        except self.player.mixer.error as e:
+            return {"ok": False, "error": f"mixer: {e}"}
+        except Exception as e:
+            # One bad command must not take the daemon, and every client with it, down.
+            print(f"Command {line.strip()!r} failed: {e!r}")
+            return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        return {"ok": True, **result}
+
+    # -- socket ---------------------------------------------------------
+
+    def listen(self):
+        if os.path.exists(self.path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.path)
+            except OSError:
+                os.unlink(self.path)  # left behind by a daemon that died
+            else:
+                probe.close()
+                raise RuntimeError(f"another player is already listening on {self.path}")
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(self.path)
+        os.chmod(self.path, 0o600)
+        self.server.listen(16)
+        self.server.setblocking(False)
+        self.selector.register(self.server, selectors.EVENT_READ, self.accept)
+        self.selector.register(self.wake_r, selectors.EVENT_READ, self.woken)
+
+    def accept(self, server):
+        conn, _ = server.accept()
+        # Replies are small; a client that stops reading for a second is dropped.
+        conn.settimeout(1.0)
+        self.buffers[conn] = bytearray()
+        self.selector.register(conn, selectors.EVENT_READ, self.read)
+
+    def read(self, conn):
+        try:
+            data = conn.recv(4096)
+        except OSError:
+            data = b""
+        if not data:
+            self.drop(conn)
+            return
+        buffer = self.buffers[conn]
+        buffer.extend(data)
+        while True:
+            end = buffer.find(b"\n")
+            if end < 0:
+                break
+            line = bytes(buffer[:end]).decode("utf-8", "surrogateescape")
+            del buffer[:end + 1]
+            if line.strip() and not self.reply(conn, self.execute(line)):
+                return
+        if len(buffer) > MAX_LINE:
+            self.reply(conn, {"ok": False, "error": "line too long"})
+            self.drop(conn)
+
+    def reply(self, conn, message):
+        try:
+            conn.sendall(json.dumps(message).encode("utf-8", "surrogateescape") + b"\n")
+        except OSError:
+            self.drop(conn)
+            return False
+        return True
+
+    def drop(self, conn):
+        if self.buffers.pop(conn, None) is not None:
+            self.selector.unregister(conn)
+            conn.close()
+
+    def woken(self, fd):
+        os.read(fd, 64)
+
+    def stop(self, *args):
+        """Safe from a signal handler or another thread."""
+        self.stopping = True
+        os.write(self.wake_w, b"x")
+
+    def serve(self):
+        self.listen()
+        try:
+            while not self.stopping:
+                for key, _ in self.selector.select():
+                    key.data(key.fileobj)
+        finally:
+            self.close()
+
+    def close(self):
+        for conn in list(self.buffers):
+            self.drop(conn)
+        if self.server is not None:
+            self.selector.unregister(self.server)
+            self.server.close()
+            self.server = None
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+        self.selector.close()
+        os.close(self.wake_r)
+        os.close(self.wake_w)
+        self.player.scheduler.close()
+
+
+def run_daemon(path=None):
+    library = LibraryService.instance()
+    daemon = PlayerDaemon(path, library=library)
+    watcher = []
+
+    analyzer = LoudnessAnalyzer()
+    # Track lists to analyze, one pass at a time: the library once loaded, then what each change adds.
+    loudness = queue.Queue()
+
+    def analyze_loudness():
+        while True:
+            tracks = loudness.get()
+            try:
+                normalize_library(daemon.player, tracks, analyzer)
+            except Exception as e:
+                print(f"Loudness analysis failed: {e}")
+
+    def start_watcher():
+        print(f"Library loaded: {len(library.snapshot(load=False))} tracks")
+        watcher.append(LibraryWatcher(music_folder(), library.apply_delta, index=library.file_manager_.index))
+        watcher[0].start()
+        loudness.put(list(library.snapshot(load=False)))
+        threading.Thread(target=analyze_loudness, daemon=True, name="loudness").start()
+
+    def on_library_changed(snapshot, previous, delta):
+        if delta and watcher:
+            tracks = delta.new_tracks(snapshot)
+            if tracks:
+                loudness.put(tracks)
+
+    library.subscribe(on_library_changed)
+    library.load_in_background(on_done=start_watcher)
+    signal.signal(signal.SIGTERM, daemon.stop)
+    signal.signal(signal.SIGINT, daemon.stop)
+    print(f"Listening on {daemon.path}")
+    try:
+        daemon.serve()
+    finally:
+        library.cancel()
+        analyzer.cancel()
+        for w in watcher:
+            w.stop()
+        library.save_snapshot()
@@ -1,7 +1,30 @@
-from ui.ui_manager import start_ui
+import sys
+
+
+def option(flag, default=None):
+    """The value after ``flag`` on the command line, ``default`` if it has none, None if the flag is absent."""
+    if flag not in sys.argv:
+        return None
+    args = sys.argv[sys.argv.index(flag) + 1:]
+    return args[0] if args and not args[0].startswith("--") else default
+
 
 def main():
+    metrics_format = option("--metrics", "json")
+    profile_seconds = option("--profile", "30")
+    if metrics_format or profile_seconds:
+        from utils import metrics
+        if metrics_format:
+            print(f"Writing metrics to {metrics.enable(metrics_format)}")
+        if profile_seconds:
+            metrics.profile_for(float(profile_seconds))
+    if "--daemon" in sys.argv:
+        # Headless: no Qt is imported at all.
+        from daemon.server import run_daemon
+        run_daemon(option("--daemon"))
+        return
+    from ui.ui_manager import start_ui
     start_ui()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,67 @@
+import sqlite3
+import threading
+from os import path
+
+from metadata.tags import TrackInfo
+from utils.library_index import storable
+from utils.paths import data_dir
+
+
+class MetadataCache:
+    """Tag cache keyed by (path, size, mtime); a row is stale once either stat value changes."""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or path.join(data_dir(), 'metadata.db')
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS tracks (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime INTEGER NOT NULL,
+                title TEXT,
+                artist TEXT,
+                album TEXT,
+                duration REAL
+            )
+        """)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def load_all(self):
+        with self.lock:
+            rows = self.conn.execute("SELECT path, size, mtime, title, artist, album, duration FROM tracks")
+            return {row[0]: ((row[1], row[2]), TrackInfo(*row[3:])) for row in rows}
+
+    def get(self, file_path, stat=None):
+        if not storable(file_path):
+            return None
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT size, mtime, title, artist, album, duration FROM tracks WHERE path = ?",
+                (file_path,)).fetchone()
+        if row is None or (stat is not None and tuple(row[:2]) != tuple(stat)):
+            return None
+        return TrackInfo(*row[2:])
+
+    def put_many(self, entries):
+        """Store ``(path, size, mtime, TrackInfo)`` tuples in one transaction.
+
+        Paths that are not valid UTF-8 are dropped, as in LoudnessCache.
+        """
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO tracks (path, size, mtime, title, artist, album, duration) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(p, size, mtime, info.title, info.artist, info.album, info.duration)
+                 for p, size, mtime, info in entries if storable(p)])
+            self.conn.commit()
+
+    def remove_many(self, paths):
+        with self.lock:
+            self.conn.executemany("DELETE FROM tracks WHERE path = ?", [(p,) for p in paths if storable(p)])
+            self.conn.commit()
@@ -0,0 +1,92 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+
+from metadata.cache import MetadataCache
+from metadata.tags import read_tags
+
+
+def read_batch(paths):
+    results = []
+    for file_path in paths:
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            continue
+        results.append((file_path, st.st_size, st.st_mtime_ns, read_tags(file_path)))
+    return results
+
+
+class MetadataExtractor:
+    """Reads tags for many tracks, only touching files the cache does not know yet.
+
+    Stale paths are split into batches and parsed on a process pool; each
+    finished batch is written to the cache in a single transaction. Workers
+    are spawned rather than forked, so they never inherit the GUI's or the
+    mixer's state.
+    """
+
+    def __init__(self, cache=None, workers=None, batch_size=256):
+        self.cache = cache or MetadataCache()
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def stale(self, paths, known, stats=None):
+        todo = []
+        for file_path in paths:
+            if stats is not None and file_path in stats:
+                stat = tuple(stats[file_path])
+            else:
+                try:
+                    st = os.stat(file_path)
+                except OSError:
+                    continue
+                stat = (st.st_size, st.st_mtime_ns)
+            cached = known.get(file_path)
+            if cached is None or cached[0] != stat:
+                todo.append(file_path)
+        return todo
+
+    def extract(self, paths, stats=None, on_batch=None):
+        """Return ``{path: TrackInfo}`` for ``paths``.
+
+        ``stats`` may map paths to ``(size, mtime_ns)`` already known (e.g.
+        from LibraryIndex) to skip the stat calls; ``on_batch`` is called with
+        each freshly parsed batch.
+        """
+        self.cancelled.clear()
+        known = self.cache.load_all()
+        todo = self.stale(paths, known, stats)
+        results = {file_path: known[file_path][1] for file_path in paths if file_path in known}
+        if not todo:
+            return results
+
+        batches = [todo[i:i + self.batch_size] for i in range(0, len(todo), self.batch_size)]
+        if self.workers == 1 or len(batches) == 1:
+            finished = map(read_batch, batches)
+            self._collect(finished, results, on_batch)
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(batches)),
+                                     mp_context=get_context("spawn")) as pool:
+                futures = [pool.submit(read_batch, batch) for batch in batches]
+                try:
+                    self._collect((future.result() for future in as_completed(futures)), results, on_batch)
+                finally:
+                    for future in futures:
+                        future.cancel()
+        return results
+
+    def _collect(self, finished, results, on_batch):
+        for entries in finished:
+            if self.cancelled.is_set():
+                break
+            self.cache.put_many(entries)
+            for file_path, _, _, info in entries:
+                results[file_path] = info
+            if on_batch is not None:
+                on_batch(entries)
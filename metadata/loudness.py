@@ -0,0 +1,339 @@
+"""Integrated loudness and peak per track, and the playback gain that evens them out.
+
+Loudness follows ITU-R BS.1770 (the measure behind EBU R128 and
+ReplayGain 2.0): K-weighted mean square over 400 ms blocks with 75%
+overlap, gated at -70 LUFS and again 10 LU below the ungated level.
+K-weighting is applied in the frequency domain: each 100 ms sub-block is
+transformed once with a real FFT, its power spectrum is weighted by the
+K filter's magnitude response, and Parseval turns that into the
+sub-block's mean square; a 400 ms block is the mean of four of them.
+Everything runs over whole arrays of sub-blocks at a time, and long
+tracks are processed in chunks so memory stays bounded.
+
+NumPy is only imported by the functions that need it, so the player can
+read gains from the cache without it.
+"""
+import importlib.util
+import math
+import os
+import sqlite3
+import threading
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from os import path
+
+from metadata.waveform import WaveformCache, overview
+from utils.library_index import storable
+from utils.paths import data_dir
+
+TARGET_LUFS = -18.0     # ReplayGain 2.0 reference level
+ABSOLUTE_GATE = -70.0
+RELATIVE_GATE = -10.0
+SUB_BLOCK_S = 0.1
+CHUNK_SUB_BLOCKS = 600  # one minute of audio per FFT pass
+DECODE_RATE = 44100
+
+
+def biquad_power(b, a, freqs, rate):
+    """|H(f)|^2 of a biquad at ``freqs`` (Hz)."""
+    import numpy as np
+
+    z = np.exp(-2j * np.pi * freqs / rate)
+    numerator = b[0] + b[1] * z + b[2] * z * z
+    denominator = a[0] + a[1] * z + a[2] * z * z
+    return np.abs(numerator / denominator) ** 2
+
+
+def k_weighting(freqs, rate):
+    """Power response of BS.1770's pre-filter (high shelf, +4 dB at 1.5 kHz) and RLB high-pass (38 Hz)."""
+    gain_db, shelf_q, shelf_fc = 4.0, 1 / math.sqrt(2), 1500.0
+    A = 10 ** (gain_db / 40)
+    w0 = 2 * math.pi * shelf_fc / rate
+    alpha = math.sin(w0) / (2 * shelf_q)
+    cos = math.cos(w0)
+    root = 2 * math.sqrt(A) * alpha
+    shelf_b = (A * ((A + 1) + (A - 1) * cos + root), -2 * A * ((A - 1) + (A + 1) * cos),
+               A * ((A + 1) + (A - 1) * cos - root))
+    shelf_a = ((A + 1) - (A - 1) * cos + root, 2 * ((A - 1) - (A + 1) * cos), (A + 1) - (A - 1) * cos - root)
+
+    w0 = 2 * math.pi * 38.0 / rate
+    alpha = math.sin(w0) / (2 * 0.5)
+    cos = math.cos(w0)
+    high_b = ((1 + cos) / 2, -(1 + cos), (1 + cos) / 2)
+    high_a = (1 + alpha, -2 * cos, 1 - alpha)
+    return biquad_power(shelf_b, shelf_a, freqs, rate) * biquad_power(high_b, high_a, freqs, rate)
+
+
+def sub_block_power(samples, rate, scale=1.0):
+    """K-weighted mean square of every 100 ms sub-block, summed over channels.
+
+    ``samples`` is a (frames, channels) array of any numeric dtype; ``scale``
+    maps it to [-1, 1] (1/32768 for 16-bit PCM).
+    """
+    import numpy as np
+
+    step = int(rate * SUB_BLOCK_S)
+    count = samples.shape[0] // step
+    if count == 0:
+        return np.zeros(0)
+    weights = k_weighting(np.fft.rfftfreq(step, 1 / rate), rate)
+    # One-sided spectrum: every bin but DC (and Nyquist for even lengths) stands for two.
+    weights[1:step // 2 + (step % 2)] *= 2
+    weights *= scale * scale / (step * step)
+    power = np.empty(count)
+    for first in range(0, count, CHUNK_SUB_BLOCKS):
+        last = min(count, first + CHUNK_SUB_BLOCKS)
+        chunk = samples[first * step:last * step].reshape(last - first, step, -1)
+        spectrum = np.fft.rfft(chunk.astype(np.float32), axis=1)
+        energy = spectrum.real ** 2 + spectrum.imag ** 2
+        power[first:last] = np.einsum("nbc,b->n", energy, weights)
+    return power
+
+
+def integrated_loudness(power):
+    """Gated loudness in LUFS from per-sub-block power, or None for less than 400 ms of audio."""
+    import numpy as np
+
+    if len(power) < 4:
+        return None
+    blocks = (power[:-3] + power[1:-2] + power[2:-1] + power[3:]) / 4
+    with np.errstate(divide="ignore"):
+        levels = -0.691 + 10 * np.log10(blocks)
+    gated = blocks[levels > ABSOLUTE_GATE]
+    if not gated.size:
+        return ABSOLUTE_GATE
+    threshold = -0.691 + 10 * math.log10(gated.mean()) + RELATIVE_GATE
+    gated = gated[-0.691 + 10 * np.log10(gated) > threshold]
+    return -0.691 + 10 * math.log10(gated.mean())
+
+
+def measure(samples, rate, scale=1.0):
+    """(integrated loudness in LUFS or None, sample peak in [0, 1]) of a (frames, channels) array."""
+    import numpy as np
+
+    peak = float(np.abs(samples).max()) * scale if samples.size else 0.0
+    return integrated_loudness(sub_block_power(samples, rate, scale)), min(peak, 1.0)
+
+
+WAVE_DTYPES = {1: "u1", 2: "<i2", 4: "<i4"}
+
+
+def decode(file_path):
+    """(samples, rate, scale) for a track: WAV directly, anything else through pygame's decoder."""
+    import numpy as np
+
+    if file_path.lower().endswith(".wav"):
+        try:
+            with wave.open(file_path, "rb") as w:
+                width, channels, rate = w.getsampwidth(), w.getnchannels(), w.getframerate()
+                if width in WAVE_DTYPES:
+                    samples = np.frombuffer(w.readframes(w.getnframes()), WAVE_DTYPES[width]).reshape(-1, channels)
+                    if width == 1:
+                        samples = samples.astype(np.int16) - 128
+                    return samples, rate, 1 / (1 << (8 * width - 1))
+        except (wave.Error, EOFError):
+            pass
+    pygame = open_decoder()
+    raw = pygame.mixer.Sound(file_path).get_raw()
+    rate, _, channels = pygame.mixer.get_init()
+    return np.frombuffer(raw, np.int16).reshape(-1, channels), rate, 1 / 32768
+
+
+_pygame = None
+
+
+def open_decoder():
+    """pygame with its mixer set to 16-bit stereo on SDL's dummy driver: decoding only, no device."""
+    global _pygame
+    if _pygame is None:
+        os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+        os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+        import pygame
+        pygame.mixer.init(DECODE_RATE, -16, 2)
+        _pygame = pygame
+    return _pygame
+
+
+def analyze_batch(paths):
+    """Runs in a pool worker: ``[(path, size, mtime, seconds, loudness, peak, waveform)]`` and the CPU time spent."""
+    started = time.process_time()
+    results = []
+    for file_path in paths:
+        try:
+            st = os.stat(file_path)
+            samples, rate, scale = decode(file_path)
+            loudness, peak = measure(samples, rate, scale)
+            waveform = overview(samples, scale)
+        except Exception as e:
+            print(f"Could not analyze {file_path}: {e}")
+            continue
+        results.append((file_path, st.st_size, st.st_mtime_ns, samples.shape[0] / rate, loudness, peak, waveform))
+    return results, time.process_time() - started
+
+
+def track_gain(loudness, peak, target=TARGET_LUFS):
+    """Linear gain that brings a track to ``target``, limited so its peak cannot clip."""
+    if loudness is None:
+        return 1.0
+    gain = 10 ** ((target - loudness) / 20)
+    if peak > 0:
+        gain = min(gain, 1 / peak)
+    return gain
+
+
+class LoudnessCache:
+    """Loudness and peak per track, keyed by (path, size, mtime) like MetadataCache."""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or path.join(data_dir(), 'loudness.db')
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS loudness (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime INTEGER NOT NULL,
+                seconds REAL NOT NULL,
+                loudness REAL,
+                peak REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def load_all(self):
+        """``{path: ((size, mtime), loudness, peak)}``"""
+        with self.lock:
+            rows = self.conn.execute("SELECT path, size, mtime, loudness, peak FROM loudness")
+            return {row[0]: ((row[1], row[2]), row[3], row[4]) for row in rows}
+
+    def gains(self, target=TARGET_LUFS):
+        """``{path: linear gain}`` for every analyzed track, ready for Music_player.set_gains."""
+        with self.lock:
+            rows = self.conn.execute("SELECT path, loudness, peak FROM loudness").fetchall()
+        return {file_path: track_gain(loudness, peak, target) for file_path, loudness, peak in rows}
+
+    def put_many(self, entries):
+        """Store ``(path, size, mtime, seconds, loudness, peak)`` tuples in one transaction.
+
+        Paths that are not valid UTF-8 are dropped; SQLite cannot store them as text.
+        """
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO loudness (path, size, mtime, seconds, loudness, peak) "
+                "VALUES (?, ?, ?, ?, ?, ?)", [entry for entry in entries if storable(entry[0])])
+            self.conn.commit()
+
+
+def lower_priority(increment=10):
+    """Pool initializer: let playback and the GUI win the CPU over analysis workers."""
+    if hasattr(os, "nice"):
+        try:
+            os.nice(increment)
+        except OSError:
+            pass
+
+
+class LoudnessAnalyzer:
+    """Measures every track the caches do not know yet, in batches on a process pool.
+
+    Each track is decoded once for both its loudness and its waveform
+    overview. Workers are spawned rather than forked so they never inherit
+    the player's open audio device. By default they leave one core free and
+    run at a lower priority (where the OS has ``nice``). ``stats`` adds up
+    the audio analyzed and the CPU time the workers spent on it.
+    """
+
+    def __init__(self, cache=None, workers=None, batch_size=4, waveforms=None):
+        self.cache = cache or LoudnessCache()
+        self.waveforms = waveforms or WaveformCache(path.join(path.dirname(self.cache.db_path), 'waveforms.db'))
+        self.workers = workers or max(1, (os.cpu_count() or 1) - 1)
+        self.batch_size = batch_size
+        self.cancelled = threading.Event()
+        self.tracks = 0
+        self.audio_s = 0.0
+        self.cpu_s = 0.0
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def stale(self, paths, known, drawn):
+        todo = []
+        for file_path in paths:
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                continue
+            key = (st.st_size, st.st_mtime_ns)
+            cached = known.get(file_path)
+            if cached is None or cached[0] != key or drawn.get(file_path) != key:
+                todo.append(file_path)
+        return todo
+
+    def analyze(self, paths, on_batch=None):
+        """Analyze what is missing or changed among ``paths``; returns how many tracks were measured."""
+        self.cancelled.clear()
+        todo = self.stale(paths, self.cache.load_all(), self.waveforms.keys())
+        if not todo:
+            return 0
+        batches = [todo[i:i + self.batch_size] for i in range(0, len(todo), self.batch_size)]
+        measured = 0
+        if self.workers == 1 or len(batches) == 1:
+            for batch in batches:
+                if self.cancelled.is_set():
+                    break
+                measured += self._collect(*analyze_batch(batch), on_batch)
+            return measured
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(batches)), mp_context=get_context("spawn"),
+                                 initializer=lower_priority) as pool:
+            futures = [pool.submit(analyze_batch, batch) for batch in batches]
+            try:
+                for future in as_completed(futures):
+                    if self.cancelled.is_set():
+                        break
+                    measured += self._collect(*future.result(), on_batch)
+            finally:
+                for future in futures:
+                    future.cancel()
+        return measured
+
+    def _collect(self, entries, cpu_s, on_batch):
+        self.cache.put_many([entry[:6] for entry in entries])
+        self.waveforms.put_many([(entry[0], entry[1], entry[2], entry[6]) for entry in entries])
+        self.tracks += len(entries)
+        self.audio_s += sum(entry[3] for entry in entries)
+        self.cpu_s += cpu_s
+        if on_batch is not None:
+            on_batch(entries)
+        return len(entries)
+
+    def stats(self):
+        return {
+            "tracks": self.tracks,
+            "audio_hours": self.audio_s / 3600,
+            "cpu_minutes": self.cpu_s / 60,
+            "audio_hours_per_cpu_minute": (self.audio_s / 3600) / (self.cpu_s / 60) if self.cpu_s else None,
+        }
+
+
+def normalize_library(player, tracks, analyzer):
+    """Give ``player`` the cached gains at once, then analyze what is missing and give it those too.
+
+    Blocks until the analysis is done; run it off the GUI thread.
+    """
+    player.set_gains(analyzer.cache.gains())
+    if importlib.util.find_spec("numpy") is None:
+        print("Loudness analysis needs NumPy; only previously analyzed tracks are normalized.")
+        return None
+    if analyzer.analyze(tracks):
+        player.set_gains(analyzer.cache.gains())
+        stats = analyzer.stats()
+        print(f"Analyzed loudness of {stats['tracks']} tracks, "
+              f"{stats['audio_hours_per_cpu_minute'] or 0:.1f} audio-hours per CPU-minute")
+    return analyzer.stats()
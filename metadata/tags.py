@@ -0,0 +1,286 @@
+import os
+import struct
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class TrackInfo:
+    title: Optional[str] = None
+    artist: Optional[str] = None
+    album: Optional[str] = None
+    duration: Optional[float] = None
+
+    def merge(self, other):
+        for key in ("title", "artist", "album", "duration"):
+            if getattr(self, key) is None:
+                setattr(self, key, getattr(other, key))
+        return self
+
+
+ID3_FRAMES = {
+    "TIT2": "title", "TPE1": "artist", "TALB": "album", "TLEN": "length",
+    "TT2": "title", "TP1": "artist", "TAL": "album", "TLE": "length",
+}
+VORBIS_KEYS = {"TITLE": "title", "ARTIST": "artist", "ALBUM": "album"}
+RIFF_INFO_KEYS = {b"INAM": "title", b"IART": "artist", b"IPRD": "album"}
+
+MP3_BITRATES = {
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+MP3_SAMPLE_RATES = {1: [44100, 48000, 32000], 2: [22050, 24000, 16000], 2.5: [11025, 12000, 8000]}
+
+
+def syncsafe(data):
+    return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
+
+
+def decode_text(data):
+    if not data:
+        return None
+    encoding, body = data[0], data[1:]
+    if encoding == 1:
+        text = body.decode("utf-16", "replace")
+    elif encoding == 2:
+        text = body.decode("utf-16-be", "replace")
+    elif encoding == 3:
+        text = body.decode("utf-8", "replace")
+    else:
+        text = body.decode("latin-1", "replace")
+    return text.split("\0", 1)[0].strip() or None
+
+
+def read_id3v2(f):
+    """Parse an ID3v2 tag at the current position; returns (TrackInfo, tag size)."""
+    header = f.read(10)
+    if len(header) < 10 or header[:3] != b"ID3":
+        return TrackInfo(), 0
+    major, flags = header[3], header[5]
+    size = syncsafe(header[6:10])
+    body = f.read(size)
+    total = size + 10 + (10 if flags & 0x10 else 0)
+    pos = 0
+    if flags & 0x40 and major >= 3:
+        ext = struct.unpack(">I", body[:4])[0]
+        pos = syncsafe(body[:4]) if major == 4 else ext + 4
+    id_len, header_len = (3, 6) if major == 2 else (4, 10)
+    fields = {}
+    while pos + header_len <= len(body):
+        frame_id = body[pos:pos + id_len]
+        if not frame_id.strip(b"\0"):
+            break
+        if major == 2:
+            frame_size = int.from_bytes(body[pos + 3:pos + 6], "big")
+        elif major == 4:
+            frame_size = syncsafe(body[pos + 4:pos + 8])
+        else:
+            frame_size = struct.unpack(">I", body[pos + 4:pos + 8])[0]
+        pos += header_len
+        key = ID3_FRAMES.get(frame_id.decode("latin-1"))
+        if key is not None and key not in fields:
+            fields[key] = decode_text(body[pos:pos + frame_size])
+        pos += frame_size
+    info = TrackInfo(fields.get("title"), fields.get("artist"), fields.get("album"))
+    length = fields.get("length")
+    if length and length.isdigit():
+        info.duration = int(length) / 1000.0
+    return info, total
+
+
+def read_id3v1(f, file_size):
+    if file_size < 128:
+        return TrackInfo()
+    f.seek(file_size - 128)
+    tag = f.read(128)
+    if tag[:3] != b"TAG":
+        return TrackInfo()
+
+    def text(raw):
+        return raw.split(b"\0", 1)[0].decode("latin-1").strip() or None
+
+    return TrackInfo(text(tag[3:33]), text(tag[33:63]), text(tag[63:93]))
+
+
+def mp3_duration(f, audio_start, file_size):
+    f.seek(audio_start)
+    data = f.read(4096)
+    i = data.find(b"\xff")
+    while 0 <= i < len(data) - 4:
+        if data[i + 1] & 0xE0 == 0xE0:
+            break
+        i = data.find(b"\xff", i + 1)
+    else:
+        return None
+    b1, b2, b3 = data[i + 1], data[i + 2], data[i + 3]
+    version = {3: 1, 2: 2, 0: 2.5}.get((b1 >> 3) & 3)
+    layer = (b1 >> 1) & 3
+    bitrate_index = b2 >> 4
+    rate_index = (b2 >> 2) & 3
+    if version is None or layer != 1 or rate_index == 3 or bitrate_index in (0, 15):
+        return None
+    sample_rate = MP3_SAMPLE_RATES[version][rate_index]
+    samples_per_frame = 1152 if version == 1 else 576
+    mono = (b3 >> 6) == 3
+    side_info = (17 if mono else 32) if version == 1 else (9 if mono else 17)
+    xing = data[i + 4 + side_info:i + 8 + side_info + 8]
+    if xing[:4] in (b"Xing", b"Info") and struct.unpack(">I", xing[4:8])[0] & 1:
+        frames = struct.unpack(">I", xing[8:12])[0]
+        return frames * samples_per_frame / sample_rate
+    bitrate = MP3_BITRATES[1 if version == 1 else 2][bitrate_index] * 1000
+    tail = 128 if file_size >= 128 else 0
+    return max(0, file_size - tail - audio_start - i) * 8 / bitrate
+
+
+def read_mp3(f, file_size):
+    info, tag_size = read_id3v2(f)
+    if info.duration is None:
+        info.duration = mp3_duration(f, tag_size, file_size)
+    return info.merge(read_id3v1(f, file_size))
+
+
+def parse_vorbis_comment(data):
+    fields = {}
+    vendor_len = struct.unpack_from("<I", data, 0)[0]
+    pos = 4 + vendor_len
+    count = struct.unpack_from("<I", data, pos)[0]
+    pos += 4
+    for _ in range(count):
+        if pos + 4 > len(data):
+            break
+        length = struct.unpack_from("<I", data, pos)[0]
+        pos += 4
+        key, _, value = data[pos:pos + length].decode("utf-8", "replace").partition("=")
+        pos += length
+        name = VORBIS_KEYS.get(key.upper())
+        if name and name not in fields and value:
+            fields[name] = value
+    return TrackInfo(fields.get("title"), fields.get("artist"), fields.get("album"))
+
+
+def read_flac(f, file_size):
+    _, tag_size = read_id3v2(f)
+    f.seek(tag_size)
+    if f.read(4) != b"fLaC":
+        return TrackInfo()
+    info = TrackInfo()
+    last = False
+    while not last:
+        header = f.read(4)
+        if len(header) < 4:
+            break
+        last = bool(header[0] & 0x80)
+        block_type = header[0] & 0x7F
+        length = int.from_bytes(header[1:4], "big")
+        if block_type == 0:
+            block = f.read(length)
+            packed = int.from_bytes(block[10:18], "big")
+            sample_rate = packed >> 44
+            total_samples = packed & 0xFFFFFFFFF
+            if sample_rate:
+                info.duration = total_samples / sample_rate
+        elif block_type == 4:
+            info = parse_vorbis_comment(f.read(length)).merge(info)
+        else:
+            f.seek(length, os.SEEK_CUR)
+    return info
+
+
+def ogg_packets(data, limit=2):
+    """Reassemble the first ``limit`` packets from raw Ogg pages."""
+    packets = []
+    current = b""
+    pos = 0
+    while pos + 27 <= len(data) and len(packets) < limit:
+        if data[pos:pos + 4] != b"OggS":
+            break
+        segments = data[pos + 26]
+        table = data[pos + 27:pos + 27 + segments]
+        pos += 27 + segments
+        for lacing in table:
+            current += data[pos:pos + lacing]
+            pos += lacing
+            if lacing < 255:
+                packets.append(current)
+                current = b""
+                if len(packets) == limit:
+                    break
+    return packets
+
+
+def read_ogg(f, file_size):
+    packets = ogg_packets(f.read(256 * 1024))
+    if len(packets) < 2:
+        return TrackInfo()
+    head, comments = packets
+    if head.startswith(b"\x01vorbis"):
+        sample_rate = struct.unpack_from("<I", head, 12)[0]
+        info = parse_vorbis_comment(comments[7:])
+    elif head.startswith(b"OpusHead"):
+        sample_rate = 48000
+        info = parse_vorbis_comment(comments[8:])
+    else:
+        return TrackInfo()
+    f.seek(max(0, file_size - 64 * 1024))
+    tail = f.read()
+    last_page = tail.rfind(b"OggS")
+    if last_page >= 0 and sample_rate:
+        granule = struct.unpack_from("<q", tail, last_page + 6)[0]
+        if granule > 0:
+            info.duration = granule / sample_rate
+    return info
+
+
+def read_wav(f, file_size):
+    header = f.read(12)
+    if header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+        return TrackInfo()
+    info = TrackInfo()
+    fields = {}
+    byte_rate = None
+    while True:
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            break
+        chunk_id, size = chunk[:4], struct.unpack("<I", chunk[4:])[0]
+        if chunk_id == b"fmt ":
+            fmt = f.read(size)
+            byte_rate = struct.unpack_from("<I", fmt, 8)[0]
+        elif chunk_id == b"data":
+            if byte_rate:
+                info.duration = min(size, file_size - f.tell()) / byte_rate
+            f.seek(size, os.SEEK_CUR)
+        elif chunk_id == b"LIST":
+            body = f.read(size)
+            if body[:4] == b"INFO":
+                pos = 4
+                while pos + 8 <= len(body):
+                    sub_id, sub_size = body[pos:pos + 4], struct.unpack_from("<I", body, pos + 4)[0]
+                    key = RIFF_INFO_KEYS.get(sub_id)
+                    if key:
+                        fields[key] = body[pos + 8:pos + 8 + sub_size].split(b"\0", 1)[0].decode("latin-1").strip() or None
+                    pos += 8 + sub_size + (sub_size & 1)
+        else:
+            f.seek(size, os.SEEK_CUR)
+        if size & 1:
+            f.seek(1, os.SEEK_CUR)
+    info.title, info.artist, info.album = fields.get("title"), fields.get("artist"), fields.get("album")
+    return info
+
+
+def read_generic(f, file_size):
+    return read_id3v2(f)[0]
+
+
+READERS = {".mp3": read_mp3, ".flac": read_flac, ".ogg": read_ogg, ".wav": read_wav, ".aac": read_generic}
+
+
+def read_tags(file_path):
+    """Read title/artist/album/duration from ``file_path``; unknown fields stay None."""
+    reader = READERS.get(os.path.splitext(file_path)[1].lower(), read_generic)
+    try:
+        with open(file_path, "rb") as f:
+            file_size = os.fstat(f.fileno()).st_size
+            return reader(f, file_size)
+    except (OSError, struct.error, IndexError, ValueError):
+        return TrackInfo()
@@ -0,0 +1,86 @@
+"""Waveform overviews: the min and max of every column of a track, a few hundred bytes each.
+
+An overview is ``COLUMNS`` (min, max) pairs over all channels, quantized to
+signed bytes and stored interleaved, so one track costs ``2 * COLUMNS``
+bytes in the cache. They are computed by the loudness pass, which has the
+decoded samples at hand anyway, so building them adds no decoding.
+"""
+import sqlite3
+import threading
+from array import array
+from os import path
+
+from utils.library_index import storable
+from utils.paths import data_dir
+
+COLUMNS = 400
+
+
+def overview(samples, scale=1.0, columns=COLUMNS):
+    """Interleaved (min, max) int8 bytes of a (frames, channels) array, one pair per column."""
+    import numpy as np
+
+    frames = samples.shape[0]
+    if frames < columns:
+        samples = np.concatenate([samples, np.zeros((columns - frames, samples.shape[1]), samples.dtype)])
+    # Columns of equal width; the last few frames that do not fill one are dropped.
+    width = samples.shape[0] // columns
+    block = samples[:width * columns].reshape(columns, -1)
+    pairs = np.empty((columns, 2), np.float32)
+    pairs[:, 0] = block.min(axis=1)
+    pairs[:, 1] = block.max(axis=1)
+    pairs *= 127 * scale
+    return np.clip(np.rint(pairs), -127, 127).astype(np.int8).tobytes()
+
+
+def columns_of(data):
+    """``[(min, max), ...]`` in [-1, 1] from the bytes ``overview`` returns."""
+    values = array("b", data)
+    return [(values[i] / 127, values[i + 1] / 127) for i in range(0, len(values) - 1, 2)]
+
+
+class WaveformCache:
+    """Overviews keyed by (path, size, mtime), like LoudnessCache."""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or path.join(data_dir(), 'waveforms.db')
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS waveforms (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime INTEGER NOT NULL,
+                data BLOB NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def keys(self):
+        """``{path: (size, mtime)}`` for every stored overview."""
+        with self.lock:
+            rows = self.conn.execute("SELECT path, size, mtime FROM waveforms")
+            return {row[0]: (row[1], row[2]) for row in rows}
+
+    def get(self, file_path, size, mtime):
+        if not storable(file_path):
+            return None
+        with self.lock:
+            row = self.conn.execute("SELECT data FROM waveforms WHERE path = ? AND size = ? AND mtime = ?",
+                                    (file_path, size, mtime)).fetchone()
+        return row[0] if row else None
+
+    def put_many(self, entries):
+        """Store ``(path, size, mtime, data)`` tuples in one transaction.
+
+        Like LoudnessCache, drops paths that are not valid UTF-8.
+        """
+        with self.lock:
+            self.conn.executemany("INSERT OR REPLACE INTO waveforms (path, size, mtime, data) VALUES (?, ?, ?, ?)",
+                                  [entry for entry in entries if storable(entry[0])])
+            self.conn.commit()
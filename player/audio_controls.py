@@ -1,11 +1,17 @@
 from dataclasses import dataclass, field
-from utils.file_manager import file_manager
+from typing import Callable, Optional
+from player.play_queue import PlayQueue
+from player.shuffle import ShuffleOrder
+from utils.library_service import LibraryService
 
 @dataclass
 class Audio_controls:
-    file_manager_ = file_manager()
-    queue: list = field(default_factory=lambda: file_manager().search())
+    library: LibraryService = field(default_factory=LibraryService.instance)
+    queue: PlayQueue = field(default_factory=lambda: PlayQueue(LibraryService.instance().snapshot(load=False)))
     song_pointer: int = 0
     repeat: int = 1
     music_time: float = 0
     is_paused: bool = False
+    shuffle: Optional[ShuffleOrder] = None
+    shuffle_seed: Optional[int] = None
+    shuffle_weight: Optional[Callable[[str], float]] = None
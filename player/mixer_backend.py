@@ -0,0 +1,236 @@
+import threading
+import time
+
+from metadata.tags import read_tags
+
+
+class PygameMixer:
+    """Thin wrapper over pygame.mixer.music so the player can run on a fake one.
+
+    With a PCMCache, tracks whose decoded samples are cached play from memory
+    on a mixer channel instead of being opened and decoded again.
+
+    pygame is imported, and only its mixer opened, on the first ``load``, so
+    starting the app never waits on the audio device.
+    """
+
+    def __init__(self, pcm_cache=None):
+        self.pygame = None
+        self.music = None
+        self.pcm_cache = pcm_cache
+        self.volume = 1.0
+        self.sound = None
+        self.channel = None
+        self.sound_started = None
+        self.sound_elapsed = 0.0
+
+    @property
+    def error(self):
+        # Only looked up once a call has failed, and every call that can fail opens the mixer first.
+        return self.pygame.error if self.pygame is not None else RuntimeError
+
+    def open(self):
+        if self.pygame is not None:
+            return
+        import pygame
+        pygame.mixer.init()
+        self.music = pygame.mixer.music
+        self.music.set_volume(self.volume)
+        if self.pcm_cache is not None:
+            self.pcm_cache.format_key = repr(pygame.mixer.get_init())
+        self.pygame = pygame
+
+    def load(self, path):
+        self.open()
+        self.stop()
+        pcm = self.pcm_cache.get(path) if self.pcm_cache is not None else None
+        if pcm is not None:
+            self.sound = self.pygame.mixer.Sound(buffer=pcm)
+            self.sound.set_volume(self.volume)
+        else:
+            self.sound = None
+            self.music.load(path)
+
+    def play(self):
+        if self.pygame is None:
+            return
+        if self.sound is not None:
+            self.channel = self.sound.play()
+            self.sound_started = time.monotonic()
+            self.sound_elapsed = 0.0
+        else:
+            self.music.play()
+
+    def pause(self):
+        if self.pygame is None:
+            return
+        if self.sound is not None:
+            if self.channel is not None and self.sound_started is not None:
+                self.channel.pause()
+                self.sound_elapsed += time.monotonic() - self.sound_started
+                self.sound_started = None
+        else:
+            self.music.pause()
+
+    def unpause(self):
+        if self.pygame is None:
+            return
+        if self.sound is not None:
+            if self.channel is not None and self.sound_started is None:
+                self.channel.unpause()
+                self.sound_started = time.monotonic()
+        else:
+            self.music.unpause()
+
+    def stop(self):
+        if self.channel is not None:
+            self.channel.stop()
+            self.channel = None
+        if self.music is not None:
+            self.music.stop()
+
+    def set_volume(self, volume):
+        self.volume = volume
+        if self.music is not None:
+            self.music.set_volume(volume)
+        if self.sound is not None:
+            self.sound.set_volume(volume)
+
+    def get_busy(self):
+        if self.sound is not None:
+            return self.channel is not None and self.sound_started is not None and self.channel.get_busy()
+        return self.music is not None and self.music.get_busy()
+
+    def get_pos(self):
+        """Seconds into the current track; drops back to ~0 when a queued track takes over."""
+        if self.sound is not None:
+            running = time.monotonic() - self.sound_started if self.sound_started is not None else 0.0
+            return self.sound_elapsed + running
+        if self.music is None:
+            return None
+        pos = self.music.get_pos()
+        return pos / 1000.0 if pos >= 0 else None
+
+    def supports_queue(self):
+        return self.sound is None
+
+    def queue(self, path):
+        # pygame keeps one queued track; a new call replaces it and load() drops it.
+        self.open()
+        self.music.queue(path)
+
+    def duration(self, path):
+        return read_tags(path).duration
+
+    def pcm(self, path):
+        """Decoded samples of ``path`` and the mixer format ``(rate, size, channels)`` they are in, or None."""
+        if self.pygame is None or self.pcm_cache is None:
+            return None
+        return self.pcm_cache.load(path), self.pygame.mixer.get_init()
+
+
+class FakeMixer:
+    """Clock-driven stand-in for PygameMixer; no audio device needed.
+
+    A loaded track "plays" for ``durations[path]`` seconds (``default_duration``
+    when unknown). ``log`` records ``(monotonic time, action, path)`` so a
+    harness can measure what happened at each track boundary.
+    """
+
+    error = RuntimeError
+
+    def __init__(self, durations=None, default_duration=1.0, report_duration=True):
+        self.durations = durations or {}
+        self.default_duration = default_duration
+        self.report_duration = report_duration
+        self.lock = threading.Lock()
+        self.loaded = None
+        self.queued = None
+        self.started_at = None
+        self.elapsed = 0.0
+        self.paused = False
+        self.volume = 1.0
+        # Optional ``path -> (samples, (rate, size, channels))`` so visualizations have something to show.
+        self.pcm_source = None
+        self.log = []
+
+    def length(self, path):
+        return self.durations.get(path, self.default_duration)
+
+    def load(self, path):
+        with self.lock:
+            self.loaded = path
+            self.queued = None
+            self.started_at = None
+            self.elapsed = 0.0
+            self.log.append((time.monotonic(), "load", path))
+
+    def play(self):
+        with self.lock:
+            self.started_at = time.monotonic()
+            self.elapsed = 0.0
+            self.paused = False
+            self.log.append((self.started_at, "play", self.loaded))
+
+    def pause(self):
+        with self.lock:
+            if self.started_at is not None and not self.paused:
+                self.elapsed += time.monotonic() - self.started_at
+                self.paused = True
+
+    def unpause(self):
+        with self.lock:
+            if self.paused:
+                self.started_at = time.monotonic()
+                self.paused = False
+
+    def stop(self):
+        with self.lock:
+            self.started_at = None
+            self.queued = None
+
+    def set_volume(self, volume):
+        self.volume = volume
+
+    def supports_queue(self):
+        return True
+
+    def queue(self, path):
+        with self.lock:
+            self.queued = path
+
+    def _roll_over(self):
+        # Like SDL_mixer, start the queued track the instant the current one ends.
+        while self.queued is not None and self.started_at is not None and not self.paused:
+            length = self.length(self.loaded)
+            if self.position() < length:
+                return
+            self.started_at += length - self.elapsed
+            self.elapsed = 0.0
+            self.loaded, self.queued = self.queued, None
+            self.log.append((self.started_at, "play", self.loaded))
+
+    def get_pos(self):
+        with self.lock:
+            self._roll_over()
+            return self.position()
+
+    def position(self):
+        if self.started_at is None:
+            return 0.0
+        if self.paused:
+            return self.elapsed
+        return self.elapsed + time.monotonic() - self.started_at
+
+    def get_busy(self):
+        with self.lock:
+            self._roll_over()
+            if self.started_at is None or self.paused:
+                return False
+            return self.position() < self.length(self.loaded)
+
+    def duration(self, path):
+        return self.length(path) if self.report_duration else None
+
+    def pcm(self, path):
+        return self.pcm_source(path) if self.pcm_source is not None else None
@@ -0,0 +1,232 @@
+import hashlib
+import json
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from os import path
+
+from utils.paths import data_dir
+
+
+def pygame_decoder(file_path):
+    """Decode a file to raw samples in the mixer's current format."""
+    import pygame
+    return pygame.mixer.Sound(file_path).get_raw()
+
+
+class PCMCache:
+    """LRU cache of decoded PCM with a hard in-memory budget.
+
+    Entries pushed out of memory are written to ``spill_dir`` (when given)
+    and come back as read-only memory maps, so re-entering the cache copies
+    nothing. Entries are keyed by path, size, mtime and ``format_key`` (the
+    mixer format), so a changed file or mixer setup is never served stale.
+
+    Each spill file has a ``.key`` file next to it, so the next run takes
+    the spilled entries over (oldest first in the LRU order) and deletes the
+    ones whose track changed; the spill budget holds across runs. Spill
+    files are written outside the lock.
+    """
+
+    def __init__(self, budget_bytes=256 * 1024 * 1024, spill_dir=None, spill_budget_bytes=2 * 1024 ** 3,
+                 decoder=pygame_decoder, format_key=""):
+        self.budget = budget_bytes
+        self.spill_dir = spill_dir
+        self.spill_budget = spill_budget_bytes
+        self.decoder = decoder
+        self.format_key = format_key
+        self.lock = threading.Lock()
+        self.memory = OrderedDict()
+        self.memory_bytes = 0
+        self.spilled = OrderedDict()
+        self.spilled_bytes = 0
+        self.spilling = {}
+        self.warming = set()
+        self.hits = 0
+        self.spill_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.spills = 0
+        if spill_dir is not None:
+            os.makedirs(spill_dir, exist_ok=True)
+            self._restore()
+
+    @classmethod
+    def with_default_spill(cls, **kwargs):
+        return cls(spill_dir=path.join(data_dir(), "pcm"), **kwargs)
+
+    def key(self, file_path):
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return None
+        return (file_path, st.st_size, st.st_mtime_ns, self.format_key)
+
+    def spill_path(self, key):
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return path.join(self.spill_dir, digest + ".pcm")
+
+    def get(self, file_path):
+        """Cached PCM for ``file_path`` (bytes or a read-only memoryview), or None."""
+        key = self.key(file_path)
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return self.memory[key]
+            if key in self.spilling:
+                self.hits += 1
+                return self.spilling[key]
+            if key in self.spilled:
+                view = self._map(key)
+                if view is not None:
+                    self.spill_hits += 1
+                    self.spilled.move_to_end(key)
+                    return view
+            self.misses += 1
+            return None
+
+    def load(self, file_path):
+        pcm = self.get(file_path)
+        if pcm is None:
+            pcm = self.decoder(file_path)
+            self.put(file_path, pcm)
+        return pcm
+
+    def put(self, file_path, pcm):
+        key = self.key(file_path)
+        if key is None or len(pcm) > self.budget:
+            return
+        spill = []
+        with self.lock:
+            if key in self.memory:
+                self.memory_bytes -= len(self.memory.pop(key))
+            self.memory[key] = pcm
+            self.memory_bytes += len(pcm)
+            while self.memory_bytes > self.budget:
+                old_key, old_pcm = self.memory.popitem(last=False)
+                self.memory_bytes -= len(old_pcm)
+                self.evictions += 1
+                if (self.spill_dir is not None and old_key not in self.spilled and old_key not in self.spilling
+                        and len(old_pcm) <= self.spill_budget):
+                    # Still served from here until the file is written.
+                    self.spilling[old_key] = old_pcm
+                    spill.append((old_key, old_pcm))
+        for old_key, old_pcm in spill:
+            self._spill(old_key, old_pcm)
+
+    def _spill(self, key, pcm):
+        target = self.spill_path(key)
+        try:
+            with open(target + ".tmp", "wb") as f:
+                f.write(pcm)
+            os.replace(target + ".tmp", target)
+            with open(target[:-len(".pcm")] + ".key", "w", encoding="utf-8") as f:
+                json.dump(key, f)
+            written = True
+        except OSError:
+            written = False
+        with self.lock:
+            del self.spilling[key]
+            if written:
+                self.spilled[key] = len(pcm)
+                self.spilled_bytes += len(pcm)
+                self.spills += 1
+            dropped = self._over_budget()
+        self._remove(dropped)
+
+    def _over_budget(self):
+        dropped = []
+        while self.spilled_bytes > self.spill_budget:
+            old_key, size = self.spilled.popitem(last=False)
+            self.spilled_bytes -= size
+            dropped.append(self.spill_path(old_key))
+        return dropped
+
+    def _remove(self, spill_paths):
+        for spill_path in spill_paths:
+            for name in (spill_path, spill_path[:-len(".pcm")] + ".key"):
+                try:
+                    os.remove(name)
+                except OSError:
+                    pass
+
+    def _restore(self):
+        """Index the spill files an earlier run left; delete the ones of changed tracks and anything else."""
+        names = set(os.listdir(self.spill_dir))
+        found = []
+        keep = set()
+        for name in names:
+            stem, ext = path.splitext(name)
+            if ext != ".pcm" or stem + ".key" not in names:
+                continue
+            spill_path = path.join(self.spill_dir, name)
+            try:
+                with open(path.join(self.spill_dir, stem + ".key"), encoding="utf-8") as f:
+                    key = tuple(json.load(f))
+                st = os.stat(spill_path)
+            except (OSError, ValueError, TypeError):
+                continue
+            current = self.key(key[0]) if len(key) == 4 else None
+            if current is None or current[:3] != key[:3] or self.spill_path(key) != spill_path:
+                continue
+            found.append((st.st_mtime_ns, key, st.st_size))
+            keep.update((name, stem + ".key"))
+        for name in names - keep:
+            try:
+                os.remove(path.join(self.spill_dir, name))
+            except OSError:
+                pass
+        for _, key, size in sorted(found):
+            self.spilled[key] = size
+            self.spilled_bytes += size
+        self._remove(self._over_budget())
+
+    def _map(self, key):
+        try:
+            with open(self.spill_path(key), "rb") as f:
+                return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        except (OSError, ValueError):
+            self.spilled_bytes -= self.spilled.pop(key, 0)
+            return None
+
+    def warm(self, file_paths):
+        """Decode ``file_paths`` on a background thread, skipping what is already cached."""
+        with self.lock:
+            todo = [p for p in file_paths if p not in self.warming]
+            self.warming.update(todo)
+        if not todo:
+            return None
+
+        def run():
+            for file_path in todo:
+                try:
+                    key = self.key(file_path)
+                    with self.lock:
+                        cached = key in self.memory or key in self.spilling or key in self.spilled
+                    if key is not None and not cached:
+                        self.put(file_path, self.decoder(file_path))
+                except Exception as e:
+                    print(f"Could not pre-decode {file_path}: {e}")
+                finally:
+                    with self.lock:
+                        self.warming.discard(file_path)
+
+        thread = threading.Thread(target=run, daemon=True, name="pcm-warm")
+        thread.start()
+        return thread
+
+    def stats(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "spill_hits": self.spill_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "spills": self.spills,
+                "memory_bytes": self.memory_bytes,
+                "memory_entries": len(self.memory),
+                "spilled_bytes": self.spilled_bytes,
+                "spilled_entries": len(self.spilled),
+            }
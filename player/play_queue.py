@@ -0,0 +1,316 @@
+from itertools import chain, islice
+from typing import NamedTuple
+
+
+class QueueEntry(NamedTuple):
+    entry_id: int
+    track: str
+
+
+class PlayQueue:
+    """Play queue with stable entry ids and cheap edits in the middle.
+
+    Entry ids are kept in blocks of up to ``2 * BLOCK_SIZE``; a Fenwick tree
+    over the block sizes maps a position to its block in O(log n), and an
+    edit only shifts one block. ``track in queue`` is a dict lookup. The same
+    track may be queued several times, each copy with its own entry id.
+
+    A queue built from a library snapshot reads straight from it and is only
+    turned into blocks on the first edit. ``version`` goes up on every edit.
+    """
+
+    BLOCK_SIZE = 512
+
+    def __init__(self, tracks=()):
+        self._base = tracks
+        self._blocks = None
+        self._next_id = 0
+        self.version = 0
+
+    @property
+    def base(self):
+        """The shared sequence this queue still reads from, or None once edited."""
+        return self._base
+
+    def _materialize(self):
+        if self._blocks is not None:
+            return
+        base, self._base = self._base, None
+        self._blocks = []
+        self._tracks = {}
+        self._block_of = {}
+        self._by_track = {}
+        self._extend(base)
+
+    # -- bookkeeping ----------------------------------------------------
+
+    def _index_track(self, entry_id, track):
+        # A track queued once maps straight to its id; duplicates share a dict.
+        known = self._by_track.get(track)
+        if known is None:
+            self._by_track[track] = entry_id
+        elif isinstance(known, dict):
+            known[entry_id] = None
+        else:
+            self._by_track[track] = {known: None, entry_id: None}
+
+    def _unindex_track(self, entry_id, track):
+        known = self._by_track[track]
+        if isinstance(known, dict):
+            del known[entry_id]
+            if len(known) == 1:
+                self._by_track[track] = next(iter(known))
+        else:
+            del self._by_track[track]
+
+    def _extend(self, tracks):
+        tracks = list(tracks)
+        start = self._next_id
+        self._next_id += len(tracks)
+        ids = range(start, self._next_id)
+        self._tracks.update(zip(ids, tracks))
+        by_track = self._by_track
+        if not by_track:
+            by_track.update(zip(tracks, ids))
+            if len(by_track) != len(tracks):
+                by_track.clear()
+                for entry_id, track in zip(ids, tracks):
+                    self._index_track(entry_id, track)
+        else:
+            for entry_id, track in zip(ids, tracks):
+                self._index_track(entry_id, track)
+
+        size = self.BLOCK_SIZE
+        ids = list(ids)
+        pos = 0
+        if self._blocks and len(self._blocks[-1]) < size:
+            last = self._blocks[-1]
+            pos = size - len(last)
+            last.extend(ids[:pos])
+            self._block_of.update(dict.fromkeys(ids[:pos], last))
+        for i in range(pos, len(ids), size):
+            block = ids[i:i + size]
+            self._blocks.append(block)
+            self._block_of.update(dict.fromkeys(block, block))
+        self._rebuild()
+
+    def _rebuild(self):
+        self._block_index = {id(block): i for i, block in enumerate(self._blocks)}
+        n = len(self._blocks)
+        tree = [0] * (n + 1)
+        for i, block in enumerate(self._blocks, 1):
+            tree[i] += len(block)
+            parent = i + (i & -i)
+            if parent <= n:
+                tree[parent] += tree[i]
+        self._tree = tree
+        self._top = 1 << (n.bit_length() - 1) if n else 0
+
+    def _add(self, k, delta):
+        tree = self._tree
+        i = k + 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, k):
+        total = 0
+        tree = self._tree
+        while k > 0:
+            total += tree[k]
+            k -= k & -k
+        return total
+
+    def _find(self, index):
+        """Return (block number, offset) for ``0 <= index < len``."""
+        tree = self._tree
+        n = len(tree) - 1
+        k = 0
+        rest = index
+        step = self._top
+        while step:
+            nxt = k + step
+            if nxt <= n and tree[nxt] <= rest:
+                k = nxt
+                rest -= tree[nxt]
+            step >>= 1
+        return k, rest
+
+    # -- sequence protocol ----------------------------------------------
+
+    def __len__(self):
+        if self._blocks is None:
+            return len(self._base)
+        return len(self._tracks)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __iter__(self):
+        if self._blocks is None:
+            return iter(self._base)
+        return map(self._tracks.__getitem__, chain.from_iterable(self._blocks))
+
+    def __contains__(self, track):
+        if self._blocks is None and hasattr(self._base, "position"):
+            return track in self._base
+        self._materialize()
+        return track in self._by_track
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._slice(*index.indices(len(self)))
+        if self._blocks is None:
+            return self._base[index]
+        return self.entry_at(index).track
+
+    def _slice(self, start, stop, step):
+        if self._blocks is None:
+            return list(self._base[start:stop:step])
+        if step != 1 or start >= stop:
+            return list(islice(self, start, stop, step)) if step > 0 else list(self)[start:stop:step]
+        k, offset = self._find(start)
+        ids = islice(chain(self._blocks[k][offset:], chain.from_iterable(self._blocks[k + 1:])), stop - start)
+        return [self._tracks[entry_id] for entry_id in ids]
+
+    def __repr__(self):
+        return f"PlayQueue({len(self)} entries)"
+
+    def _normalize(self, index):
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("queue index out of range")
+        return index
+
+    def entry_at(self, index):
+        self._materialize()
+        k, offset = self._find(self._normalize(index))
+        entry_id = self._blocks[k][offset]
+        return QueueEntry(entry_id, self._tracks[entry_id])
+
+    def position(self, entry_id):
+        """Current index of the entry with ``entry_id``."""
+        self._materialize()
+        block = self._block_of[entry_id]
+        return self._prefix(self._block_index[id(block)]) + block.index(entry_id)
+
+    def entries_of(self, track):
+        self._materialize()
+        known = self._by_track.get(track)
+        if known is None:
+            return []
+        return list(known) if isinstance(known, dict) else [known]
+
+    def index(self, track):
+        if self._blocks is None:
+            position = getattr(self._base, "position", None)
+            found = position(track) if position is not None else self._base.index(track)
+            if found is None:
+                raise ValueError(f"{track!r} is not in queue")
+            return found
+        entries = self.entries_of(track)
+        if not entries:
+            raise ValueError(f"{track!r} is not in queue")
+        return min(self.position(entry_id) for entry_id in entries)
+
+    # -- edits ----------------------------------------------------------
+
+    def append(self, track):
+        return self.insert(len(self), track)
+
+    def extend(self, tracks):
+        self._materialize()
+        self._extend(tracks)
+        self.version += 1
+
+    def _place(self, index, entry_id):
+        placed = len(self._tracks) - 1
+        # Same clamping as list.insert: negative indexes count from the end.
+        if index < 0:
+            index = max(0, index + placed)
+        index = min(index, placed)
+        if not self._blocks:
+            self._blocks.append([])
+            self._rebuild()
+        if index == placed:
+            k = len(self._blocks) - 1
+            offset = len(self._blocks[k])
+        else:
+            k, offset = self._find(index)
+        block = self._blocks[k]
+        block.insert(offset, entry_id)
+        self._block_of[entry_id] = block
+        if len(block) > 2 * self.BLOCK_SIZE:
+            tail = block[self.BLOCK_SIZE:]
+            del block[self.BLOCK_SIZE:]
+            self._block_of.update(dict.fromkeys(tail, tail))
+            self._blocks.insert(k + 1, tail)
+            self._rebuild()
+        else:
+            self._add(k, 1)
+
+    def insert(self, index, track):
+        """Insert ``track`` before ``index``, as ``list.insert`` would, and return the new entry id."""
+        self._materialize()
+        entry_id = self._next_id
+        self._next_id += 1
+        self._tracks[entry_id] = track
+        self._index_track(entry_id, track)
+        self._place(index, entry_id)
+        self.version += 1
+        return entry_id
+
+    def insert_after(self, index, track):
+        return self.insert(index + 1, track)
+
+    def _unlink(self, k, offset):
+        block = self._blocks[k]
+        entry_id = block.pop(offset)
+        del self._block_of[entry_id]
+        if block:
+            self._add(k, -1)
+        else:
+            del self._blocks[k]
+            self._rebuild()
+        return entry_id
+
+    def _remove_at(self, index):
+        k, offset = self._find(index)
+        entry_id = self._unlink(k, offset)
+        track = self._tracks.pop(entry_id)
+        self._unindex_track(entry_id, track)
+        self.version += 1
+        return track
+
+    def pop(self, index=-1):
+        self._materialize()
+        return self._remove_at(self._normalize(index))
+
+    def remove_entry(self, entry_id):
+        """Remove one entry; returns the index it had."""
+        index = self.position(entry_id)
+        self._remove_at(index)
+        return index
+
+    def remove(self, track):
+        """Remove the first occurrence of ``track``; returns the index it had."""
+        index = self.index(track)
+        self._materialize()
+        self._remove_at(index)
+        return index
+
+    def move(self, entry_id, index):
+        """Move an entry so that it ends up at ``index``, counted without it; the entry id is kept."""
+        old = self.position(entry_id)
+        k, offset = self._find(old)
+        self._unlink(k, offset)
+        self._place(index, entry_id)
+        self.version += 1
+        return old
+
+    def clear(self):
+        self._base = ()
+        self._blocks = None
+        self.version += 1
@@ -1,54 +1,184 @@
-import pygame
-import random
 import threading
 import time
 from player.audio_controls import Audio_controls
+from player.mixer_backend import PygameMixer
+from player.play_queue import PlayQueue
+from player.scheduler import PlaybackScheduler
+from player.shuffle import ShuffleOrder
+from utils import metrics
 
 class Music_player:
-    def __init__(self):
-        pygame.mixer.init()
-        pygame.init()
+    def __init__(self, mixer=None, pcm_cache=None, warm_ahead=2):
+        self.pcm_cache = pcm_cache
+        self.warm_ahead = warm_ahead
+        self.mixer = mixer or PygameMixer(pcm_cache)
+        # Held by every call that changes the queue, the pointer or the mixer: the UI's player lane,
+        # the daemon's commands and the scheduler's callbacks. It is held across mixer loads, so the
+        # GUI thread never takes it; it reads the queue through queue events and ``now_playing``.
+        self.transport = threading.RLock()
+        # Guards the volume and the gains only; never held across a mixer load.
+        self.lock = threading.Lock()
+        self.now_playing = None
         self.audio_controls = Audio_controls()
         self.current_volume = 0.5
-        self.is_next_or_prev = False
-        self.SONG_END = pygame.USEREVENT + 1
-        self.stop_event = threading.Event()
-        self.thread = None
-        pygame.mixer.music.set_volume(self.current_volume)
+        # Per-track linear gain from LoudnessCache.gains(); a dict lookup per track change.
+        self.gains = {}
+        self.normalize = True
+        self.last_played = {}
+        self.gapless = True
+        self.mixer_queued = None
+        self.mixer.set_volume(self.current_volume)
+        self.queue_listeners = []
+        self.scheduler = PlaybackScheduler(self.mixer, self.on_track_end)
+        # Library changes are applied on the scheduler thread, never alongside on_track_end.
+        self.audio_controls.library.subscribe(self.on_library_changed, self.scheduler.call)
+
+    def subscribe_queue(self, callback):
+        """Call ``callback(kind, first, count, tracks)`` on every queue change.
+
+        ``kind`` is "inserted" or "removed" (``count`` entries at ``first``),
+        "current" (``first`` is the new song pointer) or "reset" (``first`` is
+        the song pointer and ``count`` the new length). ``tracks`` holds the
+        inserted tracks, or for "reset" the whole new queue as an immutable
+        sequence, so a listener can mirror the queue without reading it;
+        otherwise it is None. Callbacks run on whichever thread changed the
+        queue, including the playback scheduler.
+        """
+        self.queue_listeners.append(callback)
+
+    def unsubscribe_queue(self, callback):
+        if callback in self.queue_listeners:
+            self.queue_listeners.remove(callback)
+
+    def notify_queue(self, kind, first=0, count=0, tracks=None):
+        for callback in list(self.queue_listeners):
+            callback(kind, first, count, tracks)
+
+    def queue_reset(self):
+        queue = self.audio_controls.queue
+        # Library snapshots and tuples are never edited; anything else is copied.
+        base = queue.base
+        tracks = base if base is not None and not isinstance(base, list) else tuple(queue)
+        self.notify_queue("reset", self.audio_controls.song_pointer, len(tracks), tracks)
+
+    def set_queue(self, tracks, pointer=0):
+        self.audio_controls.queue = tracks if isinstance(tracks, PlayQueue) else PlayQueue(tracks)
+        self.audio_controls.song_pointer = pointer
+        self.audio_controls.shuffle = None
+        self.queue_reset()
 
     def playnext(self, song, pointer):
         queue = self.audio_controls.queue
         if pointer < 0 or pointer >= len(queue):
             print("Pointer out of range.")
             return
-        if song in queue:
-            return
-        before_p = queue[:pointer + 1]
-        after_p = queue[pointer + 1:]
-        queue = before_p + [song] + after_p
-        self.audio_controls.queue = queue
-        print("Queue after adding song:", self.audio_controls.queue)
+        queue.insert_after(pointer, song)
+        self.notify_queue("inserted", pointer + 1, 1, (song,))
+        self.prepare_next()
+        print(f"Queued next: {song}")
+
+    def enqueue(self, song):
+        queue = self.audio_controls.queue
+        queue.append(song)
+        self.notify_queue("inserted", len(queue) - 1, 1, (song,))
+        self.prepare_next()
+        print(f"Queued: {song}")
 
     def remove_from_queue(self, song):
         queue = self.audio_controls.queue
         if song in queue:
-            queue.remove(song)
+            index = queue.remove(song)
+            if index < self.audio_controls.song_pointer:
+                self.audio_controls.song_pointer -= 1
+            self.notify_queue("removed", index, 1)
+            self.prepare_next()
             print(f"Removed '{song}' from queue.")
         else:
             print(f"'{song}' not found in queue.")
 
+    def on_library_changed(self, snapshot, previous, delta):
+        with self.transport:
+            controls = self.audio_controls
+            if controls.shuffle is not None and controls.shuffle.tracks is previous and not previous:
+                # Shuffle was picked before the library had loaded.
+                controls.shuffle = ShuffleOrder(snapshot, controls.shuffle_seed, controls.shuffle_weight)
+                if not controls.queue:
+                    first = controls.shuffle.next_track()
+                    controls.queue = PlayQueue([first] if first is not None else [])
+                    controls.song_pointer = 0
+                    self.queue_reset()
+                return
+            if controls.queue.base is not previous:
+                if delta:
+                    self.apply_library_delta(delta)
+                return
+            # The queue is the library itself; follow the new snapshot.
+            current = None
+            if controls.song_pointer < len(controls.queue):
+                current = controls.queue[controls.song_pointer]
+                if delta:
+                    current = delta.new_path(current)
+            controls.queue = PlayQueue(snapshot)
+            position = snapshot.position(current) if current is not None else None
+            controls.song_pointer = position if position is not None else 0
+            self.queue_reset()
+
+    def apply_library_delta(self, delta):
+        queue = self.audio_controls.queue
+        pointer = self.audio_controls.song_pointer
+        new_queue = []
+        for i, song in enumerate(queue):
+            moved = delta.new_path(song)
+            if moved is None:
+                if i < pointer:
+                    pointer -= 1
+                continue
+            new_queue.append(moved)
+        self.audio_controls.queue = PlayQueue(new_queue)
+        self.audio_controls.song_pointer = max(0, min(pointer, len(new_queue) - 1))
+        self.queue_reset()
+
+    def track_volume(self, song):
+        """Mixer volume for ``song``: the user's volume times its loudness gain, capped at full scale."""
+        if not self.normalize:
+            return self.current_volume
+        return min(1.0, self.current_volume * self.gains.get(song, 1.0))
+
+    def current_song(self):
+        """The track at the song pointer; other threads than the transport's read ``now_playing``."""
+        queue = self.audio_controls.queue
+        pointer = self.audio_controls.song_pointer
+        return queue[pointer] if pointer < len(queue) else None
+
+    def apply_volume(self, song):
+        with self.lock:
+            self.mixer.set_volume(self.track_volume(song))
+
+    def set_gains(self, gains):
+        with self.lock:
+            self.gains = gains
+            self.mixer.set_volume(self.track_volume(self.now_playing))
+
+    def set_volume(self, volume):
+        with self.lock:
+            self.current_volume = min(1.0, max(0.0, volume))
+            self.mixer.set_volume(self.track_volume(self.now_playing))
+
     def volume_up(self):
-        self.current_volume = min(1.0, self.current_volume + 0.1)
-        pygame.mixer.music.set_volume(self.current_volume)
+        with self.lock:
+            self.current_volume = min(1.0, self.current_volume + 0.1)
+            self.mixer.set_volume(self.track_volume(self.now_playing))
         print(f"Volume increased to: {int(self.current_volume * 100)}%")
 
     def volume_down(self):
-        self.current_volume = max(0.0, self.current_volume - 0.1)
-        pygame.mixer.music.set_volume(self.current_volume)
+        with self.lock:
+            self.current_volume = max(0.0, self.current_volume - 0.1)
+            self.mixer.set_volume(self.track_volume(self.now_playing))
         print(f"Volume decreased to: {int(self.current_volume * 100)}%")
 
     def pause(self):
-        pygame.mixer.music.pause()
+        self.mixer.pause()
+        self.scheduler.paused()
         self.audio_controls.is_paused = True
         print("Playback paused.")
 
@@ -59,30 +189,80 @@ class Music_player:
             song = queue[pointer]
             try:
                 if self.audio_controls.is_paused:
-                    pygame.mixer.music.unpause()
+                    self.mixer.unpause()
+                    self.scheduler.resumed()
                     self.audio_controls.is_paused = False
                     print("Resumed")
+                    self.prepare_next()
                 else:
-                    pygame.mixer.music.load(song)
-                    pygame.mixer.music.set_endevent(self.SONG_END)
-                    pygame.mixer.music.play()
+                    started = metrics.start()
+                    self.mixer.load(song)
+                    metrics.stop("mixer_load_seconds", started)
+                    self.mixer_queued = None
+                    self.now_playing = song
+                    self.apply_volume(song)
+                    self.mixer.play()
+                    started = time.monotonic()
+                    self.scheduler.track_started(self.mixer.duration(song), started)
+                    self.last_played[song] = time.time()
+                    self.notify_queue("current", pointer)
+                    metrics.count("tracks_started")
                     print(f"Now playing: {song}")
-
-                if self.thread and self.thread.is_alive():
-                    self.stop_event.set()
-                    self.thread.join()
-
-                self.stop_event.clear()
-                self.thread = threading.Thread(target=self.listen_to_end, daemon=True)
-                self.thread.start()
-
-            except pygame.error as e:
+                    self.prepare_next()
+            except self.mixer.error as e:
+                metrics.count("mixer_errors")
+                self.scheduler.stopped()
                 print(f"Error playing {song}: {e}")
         else:
             print("No song to play at current pointer.")
 
+    def upcoming(self):
+        queue = self.audio_controls.queue
+        pointer = self.audio_controls.song_pointer + 1
+        return queue[pointer] if pointer < len(queue) else None
+
+    def prepare_next(self):
+        """Pre-decode what comes next and, in gapless mode, queue it on the mixer."""
+        if self.audio_controls.is_paused or not self.scheduler.active:
+            return
+        self.draw_shuffled()
+        self.warm_cache()
+        upcoming = self.upcoming() if self.gapless and self.mixer.supports_queue() else None
+        if upcoming is not None and upcoming != self.mixer_queued:
+            try:
+                self.mixer.queue(upcoming)
+                self.mixer_queued = upcoming
+            except self.mixer.error as e:
+                print(f"Could not prepare {upcoming}: {e}")
+        # pygame cannot unqueue. A track queued earlier that is no longer next still starts at the
+        # boundary, so keep watching for it: on_track_end stops it there and ends or moves on instead.
+        self.scheduler.set_rollover(self.mixer_queued is not None)
+
+    def warm_cache(self):
+        """Pre-decode the current track and the next ``warm_ahead`` entries into the PCM cache."""
+        if self.pcm_cache is None:
+            return
+        queue = self.audio_controls.queue
+        pointer = self.audio_controls.song_pointer
+        self.pcm_cache.warm(queue[pointer:pointer + 1 + self.warm_ahead])
+
+    def draw_shuffled(self):
+        """In shuffle mode, append the next random track once the queue runs out."""
+        controls = self.audio_controls
+        if controls.shuffle is None or controls.song_pointer + 1 < len(controls.queue):
+            return
+        track = controls.shuffle.next_track()
+        if track is not None:
+            controls.queue.append(track)
+            self.notify_queue("inserted", len(controls.queue) - 1, 1, (track,))
+
+    def set_shuffle_weight(self, weight):
+        """Use ``weight(track) -> float`` for the next shuffle; None means uniform."""
+        self.audio_controls.shuffle_weight = weight
+
     def next_song(self):
         self.audio_controls.is_paused = False
+        self.draw_shuffled()
         self.audio_controls.song_pointer += 1
         if self.audio_controls.song_pointer < len(self.audio_controls.queue):
             self.start()
@@ -100,29 +280,58 @@ class Music_player:
 
     def toggle_repeat(self):
         self.audio_controls.repeat = (self.audio_controls.repeat % 3) + 1
+        self.audio_controls.shuffle = None
         if self.audio_controls.repeat == 1: # repeat all
-            self.audio_controls.queue = self.audio_controls.file_manager_.search()
+            # Before the library has loaded this is empty and follows it once published.
+            self.audio_controls.queue = PlayQueue(self.audio_controls.library.snapshot(load=False))
             self.audio_controls.song_pointer = 0
+            self.queue_reset()
+            self.prepare_next()
         elif self.audio_controls.repeat == 2: # repeat one
-            current_song = self.audio_controls.queue[self.audio_controls.song_pointer]
-            self.audio_controls.queue = [current_song]
+            current_song = self.current_song()
+            self.audio_controls.queue = PlayQueue([current_song] if current_song is not None else [])
             self.audio_controls.song_pointer = 0
+            self.queue_reset()
+            self.prepare_next()
         elif self.audio_controls.repeat == 3: # shuffle
-            self.audio_controls.queue = self.audio_controls.file_manager_.search()
-            random.shuffle(self.audio_controls.queue)
+            # The queue only holds what was drawn so far, so prev_song walks back through history.
+            shuffle = ShuffleOrder(self.audio_controls.library.snapshot(load=False),
+                                   self.audio_controls.shuffle_seed, self.audio_controls.shuffle_weight)
+            first = shuffle.next_track()
+            self.audio_controls.shuffle = shuffle
+            self.audio_controls.queue = PlayQueue([first] if first is not None else [])
             self.audio_controls.song_pointer = 0
+            self.queue_reset()
             self.start()
 
-            
-    def listen_to_end(self):
-        if self.is_next_or_prev:
-            self.is_next_or_prev = False
-            return
-        while not self.stop_event.is_set():
-            for event in pygame.event.get():
-                if event.type == self.SONG_END:
-                    print("Song finished!")
+    def on_track_end(self, advanced=False):
+        with self.transport:
+            if self.scheduler.active:
+                # Something started a track while this end was waiting for the lock.
+                return
+            print("Song finished!")
+            self.draw_shuffled()
+            upcoming = self.upcoming()
+            if advanced:
+                # The mixer already switched to the queued track.
+                queued, self.mixer_queued = self.mixer_queued, None
+                if upcoming is not None and upcoming == queued:
                     self.audio_controls.song_pointer += 1
-                    self.start()
+                    # The queued track came in at the previous track's gain; this is the earliest it can change.
+                    self.now_playing = upcoming
+                    self.apply_volume(upcoming)
+                    started = time.monotonic() - (self.mixer.get_pos() or 0.0)
+                    self.scheduler.track_started(self.mixer.duration(upcoming), started)
+                    self.last_played[upcoming] = time.time()
+                    self.notify_queue("current", self.audio_controls.song_pointer)
+                    metrics.count("tracks_started")
+                    print(f"Now playing: {upcoming}")
+                    self.prepare_next()
                     return
-            time.sleep(0.1)
+                self.mixer.stop()
+            if upcoming is not None:
+                self.audio_controls.song_pointer += 1
+                self.start()
+            else:
+                self.scheduler.stopped()
+                print("End of queue.")
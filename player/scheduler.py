@@ -0,0 +1,196 @@
+import threading
+import time
+from collections import deque
+
+from utils import metrics
+
+
+class TransitionStats:
+    """Seconds from the end of one track to the ``play()`` of the next."""
+
+    def __init__(self, keep=1000):
+        self.keep = keep
+        self.samples = []
+
+    def add(self, latency):
+        self.samples.append(latency)
+        if len(self.samples) > self.keep:
+            del self.samples[:len(self.samples) - self.keep]
+
+    def summary(self):
+        if not self.samples:
+            return {"count": 0}
+        ordered = sorted(self.samples)
+        return {
+            "count": len(ordered),
+            "mean_s": sum(ordered) / len(ordered),
+            "p95_s": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+            "max_s": ordered[-1],
+        }
+
+
+class PlaybackScheduler:
+    """Single long-lived thread that calls ``on_track_end(advanced)`` when a track finishes.
+
+    With a known duration the thread sleeps until just before the expected
+    end and then polls ``mixer.get_busy()`` every ``poll_interval`` to catch
+    the real end. Without one it falls back to polling every
+    ``fallback_interval``. Pause, resume and skips only update the deadline
+    under the condition variable; the thread is never torn down.
+
+    When a track has been queued on the mixer (gapless mode) the mixer moves
+    on by itself; that shows up as the playback position jumping back, and
+    ``advanced`` is True.
+
+    ``call(fn)`` runs ``fn`` on the same thread, so work handed over from
+    other threads never overlaps ``on_track_end``.
+    """
+
+    def __init__(self, mixer, on_track_end, poll_interval=0.002, lead=0.05, fallback_interval=0.1,
+                 rollover_grace=0.5):
+        self.mixer = mixer
+        self.on_track_end = on_track_end
+        self.poll_interval = poll_interval
+        self.lead = lead
+        self.fallback_interval = fallback_interval
+        self.rollover_grace = rollover_grace
+        self.condition = threading.Condition()
+        self.generation = 0
+        self.active = False
+        self.deadline = None
+        self.remaining = None
+        self.ended_at = None
+        self.rollover_pending = False
+        self.rollover_pos = None
+        self.closed = False
+        self.calls = deque()
+        self.transitions = TransitionStats()
+        self.thread = threading.Thread(target=self.run, daemon=True, name="playback-scheduler")
+        self.thread.start()
+
+    def track_started(self, duration=None, started=None):
+        """``started`` is the monotonic time ``play()`` returned, if taken earlier."""
+        with self.condition:
+            now = started if started is not None else time.monotonic()
+            if self.ended_at is not None:
+                self.transitions.add(now - self.ended_at)
+                metrics.observe("track_gap_seconds", now - self.ended_at)
+                self.ended_at = None
+            self.generation += 1
+            self.active = True
+            self.remaining = None
+            self.rollover_pending = False
+            self.deadline = now + duration if duration else None
+            self.condition.notify()
+
+    def call(self, fn):
+        with self.condition:
+            self.calls.append(fn)
+            self.condition.notify()
+
+    def _run_calls(self):
+        while self.calls:
+            fn = self.calls.popleft()
+            self.condition.release()
+            try:
+                fn()
+            except Exception as e:
+                print(f"Error in playback scheduler call: {e}")
+            finally:
+                self.condition.acquire()
+
+    def set_rollover(self, pending):
+        """Tell the scheduler whether the mixer has a track queued behind the current one."""
+        with self.condition:
+            self.rollover_pending = pending
+            self.condition.notify()
+
+    def paused(self):
+        with self.condition:
+            if self.active and self.deadline is not None:
+                self.remaining = max(0.0, self.deadline - time.monotonic())
+            self.active = False
+            self.condition.notify()
+
+    def resumed(self):
+        with self.condition:
+            self.active = True
+            if self.remaining is not None:
+                self.deadline = time.monotonic() + self.remaining
+                self.remaining = None
+            self.condition.notify()
+
+    def stopped(self):
+        with self.condition:
+            self.active = False
+            self.deadline = None
+            self.remaining = None
+            self.ended_at = None
+            self.condition.notify()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join(timeout=1.0)
+
+    def _wait_for_end(self):
+        """Block until the current track ends; returns None if something else happened first."""
+        generation = self.generation
+        last_pos = 0.0
+        self.rollover_pos = None
+        while not self.closed and self.active and self.generation == generation:
+            if self.calls:
+                self._run_calls()
+                continue
+            now = time.monotonic()
+            if self.deadline is not None and now < self.deadline - self.lead:
+                self.condition.wait(self.deadline - self.lead - now)
+                continue
+            interval = self.poll_interval if self.deadline is not None else self.fallback_interval
+            self.condition.release()
+            try:
+                busy = self.mixer.get_busy()
+                pos = self.mixer.get_pos() if self.rollover_pending else None
+            finally:
+                self.condition.acquire()
+            if self.active and self.generation == generation:
+                if pos is not None and pos < last_pos:
+                    self.rollover_pos = pos
+                    return True
+                overdue = self.deadline is not None and time.monotonic() - self.deadline > self.rollover_grace
+                if self.rollover_pending and busy and overdue:
+                    # The mixer did not report a position reset; trust the duration.
+                    self.rollover_pos = time.monotonic() - self.deadline
+                    return True
+                if not busy:
+                    return False
+            if pos is not None:
+                last_pos = pos
+            self.condition.wait(interval)
+        return None
+
+    def run(self):
+        with self.condition:
+            while not self.closed:
+                if self.calls:
+                    self._run_calls()
+                    continue
+                if not self.active:
+                    self.condition.wait()
+                    continue
+                advanced = self._wait_for_end()
+                if advanced is None:
+                    continue
+                self.active = False
+                self.ended_at = time.monotonic()
+                if advanced:
+                    # The queued track started rollover_pos seconds ago, right at the boundary.
+                    self.ended_at -= self.rollover_pos
+                self.condition.release()
+                try:
+                    self.on_track_end(advanced)
+                except Exception as e:
+                    print(f"Error advancing to the next track: {e}")
+                finally:
+                    self.condition.acquire()
@@ -0,0 +1,87 @@
+import heapq
+import random
+import time
+
+
+class LazyShuffle:
+    """Seeded random permutation of ``range(n)``, produced one index at a time.
+
+    This is Fisher-Yates run incrementally: only the swapped positions are
+    remembered, so drawing k indices costs O(k) time and memory no matter
+    how large n is. The same seed always yields the same order.
+    """
+
+    def __init__(self, n, seed=None):
+        self.n = n
+        self.seed = random.randrange(2 ** 32) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.swaps = {}
+        self.drawn = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.drawn >= self.n:
+            raise StopIteration
+        i = self.drawn
+        j = self.rng.randrange(i, self.n)
+        picked = self.swaps.get(j, j)
+        current = self.swaps.pop(i, i)
+        if j != i:
+            self.swaps[j] = current
+        self.drawn += 1
+        return picked
+
+
+class WeightedShuffle:
+    """Weighted random order without replacement (Efraimidis-Spirakis).
+
+    Every track gets the key ``u ** (1 / weight)`` and tracks come out by
+    descending key. The keys are heapified once in O(n) and each draw pops
+    in O(log n), so the library is never sorted. Tracks with a weight of 0
+    or less are left out.
+    """
+
+    def __init__(self, tracks, weight, seed=None):
+        self.seed = random.randrange(2 ** 32) if seed is None else seed
+        rng = random.Random(self.seed)
+        self.heap = []
+        for i, track in enumerate(tracks):
+            w = weight(track)
+            if w > 0:
+                self.heap.append((-(rng.random() ** (1.0 / w)), i))
+        heapq.heapify(self.heap)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self.heap:
+            raise StopIteration
+        return heapq.heappop(self.heap)[1]
+
+
+class ShuffleOrder:
+    def __init__(self, tracks, seed=None, weight=None):
+        self.tracks = tracks
+        if weight is None:
+            self.order = LazyShuffle(len(tracks), seed)
+        else:
+            self.order = WeightedShuffle(tracks, weight, seed)
+        self.seed = self.order.seed
+
+    def next_track(self):
+        index = next(self.order, None)
+        return None if index is None else self.tracks[index]
+
+
+def favorites_first(favorites, boost=20.0):
+    favorites = set(favorites)
+    return lambda track: boost if track in favorites else 1.0
+
+
+def least_recently_played(last_played, never_played=1.0e6):
+    """Weight each track by the seconds since it last started playing."""
+    now = time.time()
+    return lambda track: max(1.0, now - last_played[track]) if track in last_played else never_played
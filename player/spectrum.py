@@ -0,0 +1,193 @@
+"""Live spectrum of what is playing, computed off the GUI thread.
+
+The worker reads the decoded samples of the current track (from the PCM
+cache the mixer already fills), takes a Hann-windowed FFT of the block that
+ends at the playback position and sums the power into log-spaced bands.
+The GUI only ever receives the finished bar heights: ``on_frame()`` is
+called when a new frame is ready and ``take()`` hands it over. While a
+frame is waiting to be taken no new notification is sent, so a busy GUI
+drops frames instead of queueing them.
+
+The FFT size and frame rate come from a FrameBudget, so a slow machine gets
+smaller transforms and fewer frames rather than a stalled worker.
+"""
+import threading
+import time
+
+from utils import metrics
+from utils.frame_budget import FrameBudget
+
+BANDS = 32
+LOW_HZ = 40.0
+HIGH_HZ = 16000.0
+FLOOR_DB = -70.0
+# (FFT size, seconds between frames), best first.
+LEVELS = ((2048, 1 / 30), (1024, 1 / 30), (1024, 1 / 15), (512, 1 / 10))
+SAMPLE_DTYPES = {8: ("u1", 1 / 128, 128), -8: ("i1", 1 / 128, 0), -16: ("<i2", 1 / 32768, 0),
+                 16: ("<u2", 1 / 32768, 32768), 32: ("<f4", 1.0, 0), -32: ("<f4", 1.0, 0)}
+
+
+def pcm_samples(data, fmt):
+    """``(samples, rate, scale)`` for raw mixer PCM in ``fmt`` = (rate, size, channels), or None if unsupported."""
+    import numpy as np
+
+    rate, size, channels = fmt
+    if size not in SAMPLE_DTYPES:
+        return None
+    dtype, scale, offset = SAMPLE_DTYPES[size]
+    samples = np.frombuffer(data, dtype)
+    samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels)
+    if offset:
+        samples = samples.astype(np.float32) - offset
+    return samples, rate, scale
+
+
+def band_edges(size, rate, bands=BANDS):
+    """First rfft bin of every band, log-spaced from LOW_HZ to HIGH_HZ, at least one bin wide."""
+    high = min(HIGH_HZ, rate / 2)
+    edges = []
+    for i in range(bands + 1):
+        hz = LOW_HZ * (high / LOW_HZ) ** (i / bands)
+        edges.append(max(1, int(round(hz * size / rate))))
+    for i in range(1, len(edges)):
+        edges[i] = max(edges[i], edges[i - 1] + 1)
+    return edges
+
+
+class SpectrumWorker:
+    """Thread that turns the samples under the playback position into ``bands`` heights in [0, 1]."""
+
+    def __init__(self, player, on_frame, bands=BANDS, budget=0.003, fall=1.5):
+        self.player = player
+        self.on_frame = on_frame
+        self.bands = bands
+        self.fall = fall
+        self.budget = FrameBudget(budget, LEVELS)
+        self.condition = threading.Condition()
+        self.active = False
+        self.closed = False
+        self.pending = False
+        self.frame = ([0.0] * bands, None)
+        self.heights = None
+        self.song = None
+        self.samples = None
+        self.progress = None
+        self.rate = None
+        self.scale = 1.0
+        self.windows = {}
+        self.edges = {}
+        self.thread = threading.Thread(target=self.run, daemon=True, name="spectrum")
+        self.thread.start()
+
+    def set_active(self, active):
+        """Run while something plays; once stopped the bars fall to zero and the thread sleeps."""
+        with self.condition:
+            self.active = active
+            self.condition.notify()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join(timeout=1.0)
+
+    def take(self):
+        """The latest ``(heights, progress)``; progress is the fraction of the track played, or None."""
+        with self.condition:
+            self.pending = False
+            return self.frame
+
+    def run(self):
+        with self.condition:
+            while not self.closed and not self.active:
+                self.condition.wait()
+        # Not before the first track plays: importing NumPy holds the GIL for a while.
+        import numpy as np
+
+        self.heights = np.zeros(self.bands, np.float32)
+        while True:
+            with self.condition:
+                while not self.closed and not self.active and not self.heights.any():
+                    self.condition.wait()
+                if self.closed:
+                    return
+                active = self.active
+            size, interval = self.budget.current()
+            try:
+                song = self.player.now_playing if active else self.song
+                if song != self.song:
+                    # Decoding a track that is not cached yet is not a frame; keep it out of the budget.
+                    self.load(song)
+                started = time.perf_counter()
+                progress = self.compute(np, size, interval, active)
+            except Exception as e:
+                print(f"Spectrum: {e}")
+                self.samples = None
+                self.heights[:] = 0
+                started = time.perf_counter()
+                progress = None
+            spent = time.perf_counter() - started
+            self.budget.record(spent)
+            metrics.observe("spectrum_frame_seconds", spent)
+            frame = (self.heights.tolist(), progress)
+            with self.condition:
+                # Nothing to draw when nothing moved (silence, or no samples for this track).
+                notify = frame != self.frame and not self.pending
+                if frame != self.frame:
+                    self.frame = frame
+                    self.pending = True
+            if notify:
+                self.on_frame()
+            with self.condition:
+                if not self.closed:
+                    self.condition.wait(max(0.0, interval - (time.perf_counter() - started)))
+
+    def load(self, song):
+        self.samples = None
+        self.progress = None
+        pcm = self.player.mixer.pcm(song) if song is not None else None
+        if pcm is None:
+            # The mixer may not be open yet; ask again next frame.
+            self.song = None
+            return
+        self.song = song
+        decoded = pcm_samples(*pcm)
+        if decoded is not None:
+            self.samples, self.rate, self.scale = decoded
+
+    def compute(self, np, size, interval, active):
+        """Advance the heights by one frame; returns the progress through the track."""
+        decay = self.fall * interval
+        if not active or self.samples is None:
+            np.maximum(self.heights - decay, 0, out=self.heights)
+            return self.progress
+        frames = self.samples.shape[0]
+        position = self.player.mixer.get_pos() or 0.0
+        end = min(frames, int(position * self.rate))
+        block = self.samples[max(0, end - size):end]
+        mono = np.zeros(size, np.float32)
+        if len(block):
+            mono[size - len(block):] = block.mean(axis=1, dtype=np.float32)
+        window = self.windows.get(size)
+        if window is None:
+            # Scaled so a full-scale sine reads 0 dB whatever the size.
+            window = np.hanning(size).astype(np.float32)
+            window *= 2 / window.sum()
+            self.windows[size] = window
+        spectrum = np.fft.rfft(mono * window * self.scale)
+        power = spectrum.real ** 2 + spectrum.imag ** 2
+        key = (size, self.rate)
+        edges = self.edges.get(key)
+        if edges is None:
+            edges = self.edges[key] = band_edges(size, self.rate, self.bands)
+        bands = np.add.reduceat(power[:edges[-1]], edges[:-1])
+        with np.errstate(divide="ignore"):
+            levels = 10 * np.log10(bands)
+        target = np.clip((levels - FLOOR_DB) / -FLOOR_DB, 0, 1).astype(np.float32)
+        np.maximum(target, self.heights - decay, out=self.heights)
+        self.progress = min(1.0, position * self.rate / frames) if frames else None
+        return self.progress
+
+    def stats(self):
+        return dict(self.budget.stats(), fft_size=self.budget.current()[0],
+                    fps=round(1 / self.budget.current()[1]), bands=self.bands)
@@ -0,0 +1,142 @@
+import os
+from dataclasses import dataclass, field
+from os import path
+
+from utils.library_index import storable
+
+# .m3u has no declared encoding; surrogateescape keeps undecodable bytes usable as paths.
+ENCODINGS = {'.m3u8': 'utf-8-sig', '.m3u': 'utf-8', '.pls': 'utf-8'}
+
+
+@dataclass
+class ImportResult:
+    name: str
+    added: int = 0
+    entries: int = 0
+    unresolved: list = field(default_factory=list)
+
+
+def read_m3u(lines):
+    """Yield ``(location, title)`` for each entry; ``#EXTINF`` supplies the title."""
+    title = None
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('#'):
+            if line.startswith('#EXTINF:'):
+                title = line.partition(',')[2] or None
+            continue
+        yield line, title
+        title = None
+
+
+def read_pls(lines):
+    """Yield ``(location, None)`` for each ``FileN=`` line, in file order.
+
+    ``TitleN`` usually follows its ``FileN`` line, so titles are not paired
+    up; doing so would mean holding the whole file.
+    """
+    for line in lines:
+        key, sep, value = line.strip().partition('=')
+        if sep and key.lower().startswith('file'):
+            yield value, None
+
+
+READERS = {'.m3u': read_m3u, '.m3u8': read_m3u, '.pls': read_pls}
+
+
+def playlist_format(file_path):
+    ext = path.splitext(file_path)[1].lower()
+    if ext not in READERS:
+        raise ValueError(f"Unsupported playlist format: {file_path}")
+    return ext
+
+
+def read_playlist(file_path):
+    """Stream ``(location, title)`` entries from an M3U, M3U8 or PLS file."""
+    ext = playlist_format(file_path)
+    with open(file_path, 'r', encoding=ENCODINGS[ext], errors='surrogateescape') as f:
+        yield from READERS[ext](f)
+
+
+class PathResolver:
+    """Turns playlist locations into library paths.
+
+    Absolute paths and ``file://`` URLs are taken as they are; relative ones
+    are tried against the playlist's folder and then each of ``roots``. A
+    candidate counts when the library index knows it, or, without an index
+    (or for files it has not seen yet), when it exists on disk. A path that
+    is not valid UTF-8 never counts: the library skips those files too.
+    """
+
+    def __init__(self, base_dir, index=None, roots=()):
+        self.base_dir = base_dir
+        self.index = index
+        self.roots = tuple(roots)
+
+    def known(self, file_path):
+        if self.index is not None and self.index.stat(file_path) is not None:
+            return True
+        return path.isfile(file_path)
+
+    def candidates(self, location):
+        if '://' in location:
+            # Only URL entries need urllib; keep it out of startup.
+            from urllib.parse import unquote, urlparse
+            parsed = urlparse(location)
+            if parsed.scheme != 'file':
+                return []
+            location = unquote(parsed.path)
+        if os.sep != '\\':
+            location = location.replace('\\', os.sep)
+        if path.isabs(location):
+            return [path.normpath(location)]
+        return [path.normpath(path.join(base, location)) for base in (self.base_dir,) + self.roots]
+
+    def resolve(self, location):
+        for candidate in self.candidates(location):
+            if storable(candidate) and self.known(candidate):
+                return candidate
+        return None
+
+
+def resolve_entries(entries, resolver, unresolved):
+    """Yield resolved paths; locations that resolve to nothing are appended to ``unresolved``."""
+    for location, _ in entries:
+        resolved = resolver.resolve(location)
+        if resolved is None:
+            unresolved.append(location)
+        else:
+            yield resolved
+
+
+def write_playlist(file_path, songs, relative=False):
+    """Write ``songs`` as M3U, M3U8 or PLS, one entry at a time, replacing the file atomically."""
+    ext = playlist_format(file_path)
+    base_dir = path.dirname(path.abspath(file_path))
+
+    def location(song):
+        if relative:
+            try:
+                return path.relpath(song, base_dir)
+            except ValueError:
+                # Different drive on Windows.
+                pass
+        return song
+
+    tmp_path = file_path + '.tmp'
+    with open(tmp_path, 'w', encoding=ENCODINGS[ext].replace('-sig', ''), errors='surrogateescape') as f:
+        if ext == '.pls':
+            f.write('[playlist]\n')
+            count = 0
+            for count, song in enumerate(songs, 1):
+                title = path.splitext(path.basename(song))[0]
+                f.write(f'File{count}={location(song)}\nTitle{count}={title}\n')
+            f.write(f'NumberOfEntries={count}\nVersion=2\n')
+        else:
+            f.write('#EXTM3U\n')
+            for song in songs:
+                title = path.splitext(path.basename(song))[0]
+                f.write(f'#EXTINF:-1,{title}\n{location(song)}\n')
+    os.replace(tmp_path, file_path)
@@ -1,35 +1,90 @@
-import json
+from contextlib import contextmanager
+
+from playlist.store import PlaylistStore
 
 
 class Playlist:
-    def __init__(self):
+    """In-memory playlists backed by a PlaylistStore.
+
+    ``playlists`` mirrors the store so reads never touch disk; every mutation
+    updates both and writes only the rows it changed.
+    """
+
+    def __init__(self, store=None, legacy_path="playlists.json"):
+        self.store = store or PlaylistStore()
+        self.legacy_path = legacy_path
         self.playlists = {}
         self.load_playlist()
-        
+
     def load_playlist(self):
-        try:
-            with open("playlists.json", "r") as playlist:
-                self.playlists = json.load(playlist)
-        except FileNotFoundError:
-            self.playlists = {}
+        self.store.migrate_json(self.legacy_path)
+        self.playlists = self.store.load_all()
+
+    @contextmanager
+    def batch(self):
+        """Commit every mutation made inside the ``with`` block at once.
 
-    def save_playlists(self):
-        with open("playlists.json", "w") as playlist:
-            json.dump(self.playlists, playlist, indent=4)
+        If the block raises, the store rolls back and ``playlists`` is
+        reloaded from it, so neither keeps any of the block's changes.
+        """
+        outermost = self.store.depth == 0
+        try:
+            with self.store.batch():
+                yield self
+        except BaseException:
+            if outermost:
+                self.playlists = self.store.load_all()
+            raise
 
     def new_playlist(self, name: str, songs: list):
+        self.store.replace(name, songs)
         self.playlists[name] = songs
-        self.save_playlists()
 
     def delete_playlist(self, name: str):
         if name in self.playlists:
+            self.store.delete(name)
             del self.playlists[name]
-            self.save_playlists()
 
     def rename_playlist(self, old_name: str, new_name: str):
         if old_name in self.playlists and new_name not in self.playlists:
-            self.playlists[new_name] = self.playlists.pop(old_name)
-            self.save_playlists()
+            self.store.rename(old_name, new_name)
+            self.playlists = {new_name if name == old_name else name: songs
+                              for name, songs in self.playlists.items()}
+
+    def add_song(self, name: str, song: str):
+        self.store.add_songs(name, [song])
+        self.playlists[name].append(song)
+
+    def remove_song(self, name: str, song: str):
+        self.store.remove_song(name, song)
+        self.playlists[name].remove(song)
+
+    def add_songs(self, name: str, songs: list):
+        self.store.add_songs(name, songs)
+        self.playlists[name].extend(songs)
+
+    def remove_songs(self, name: str, songs: list):
+        """Remove the first occurrence of each song in one pass over the playlist."""
+        self.store.remove_songs(name, songs)
+        pending = {}
+        for song in songs:
+            pending[song] = pending.get(song, 0) + 1
+        kept = []
+        for song in self.playlists[name]:
+            if pending.get(song):
+                pending[song] -= 1
+            else:
+                kept.append(song)
+        self.playlists[name][:] = kept
+
+    def rename_song(self, old_path: str, new_path: str, names=None):
+        """Rename ``old_path`` everywhere; ``names`` limits the in-memory update to those playlists."""
+        self.store.rename_song(old_path, new_path)
+        for name in self.playlists if names is None else names:
+            songs = self.playlists[name]
+            for i, song in enumerate(songs):
+                if song == old_path:
+                    songs[i] = new_path
 
     def get_playlist_names(self):
         return list(self.playlists.keys())
@@ -1,44 +1,219 @@
+import threading
+from contextlib import contextmanager
+from os import path
+
+from playlist.formats import ImportResult, PathResolver, read_playlist, resolve_entries, write_playlist
 from playlist.playlists import Playlist
 
 class PlaylistManager:
-    def __init__(self):
-        self.playlist_obj = Playlist()
+    """Playlists plus hash indexes for membership queries.
+
+    ``members[name]`` counts each song in that playlist and ``containing[song]``
+    is the set of playlists holding it, so "is it in X?", "is it a favorite?"
+    and "which playlists have it?" never scan a list. Every mutation below
+    keeps both in step with the playlists and bumps ``version``.
+
+    Callers that mutate from a worker thread hold ``lock``; readers on
+    other threads take it too and copy what they keep.
+    """
+
+    chunk_size = 1000
+
+    def __init__(self, playlist_obj=None):
+        self.playlist_obj = playlist_obj or Playlist()
+        self.lock = threading.RLock()
+        self.members = {}
+        self.containing = {}
+        self.version = 0
+        self._reindex()
         # Ensure "Favorites" playlist exists
         if "Favorites" not in self.get_all_playlists():
             self.add_playlist("Favorites")
 
+    def _reindex(self):
+        self.members = {}
+        self.containing = {}
+        for name in self.get_all_playlists():
+            self._index(name, self.get_songs(name))
+
+    @contextmanager
+    def batch(self):
+        """``Playlist.batch`` that also rebuilds the indexes when the block raises and is rolled back."""
+        try:
+            with self.playlist_obj.batch():
+                yield self
+        except BaseException:
+            self._reindex()
+            self.version += 1
+            raise
+
+    def _index(self, name, songs):
+        counts = self.members.setdefault(name, {})
+        for song in songs:
+            counts[song] = counts.get(song, 0) + 1
+            self.containing.setdefault(song, set()).add(name)
+
+    def _unindex(self, name, song):
+        counts = self.members[name]
+        if counts[song] > 1:
+            counts[song] -= 1
+            return
+        del counts[song]
+        names = self.containing[song]
+        names.discard(name)
+        if not names:
+            del self.containing[song]
+
+    def _drop(self, name):
+        for song in self.members.pop(name, {}):
+            names = self.containing[song]
+            names.discard(name)
+            if not names:
+                del self.containing[song]
+
     def get_all_playlists(self):
         return self.playlist_obj.get_playlist_names()
 
     def get_songs(self, playlist_name):
         return self.playlist_obj.get_songs(playlist_name)
 
+    def contains(self, playlist_name, song):
+        return song in self.members.get(playlist_name, ())
+
+    def playlists_containing(self, song):
+        return set(self.containing.get(song, ()))
+
     def add_playlist(self, name, songs=None):
         if songs is None:
             songs = []
         self.playlist_obj.new_playlist(name, songs)
+        self._drop(name)
+        self._index(name, songs)
+        self.version += 1
 
     def delete_playlist(self, name):
-        self.playlist_obj.delete_playlist(name)
+        if name in self.members:
+            self.playlist_obj.delete_playlist(name)
+            self._drop(name)
+            self.version += 1
 
     def rename_playlist(self, old_name, new_name):
+        if old_name not in self.members or new_name in self.members:
+            return
         self.playlist_obj.rename_playlist(old_name, new_name)
+        counts = self.members.pop(old_name)
+        self.members[new_name] = counts
+        for song in counts:
+            names = self.containing[song]
+            names.discard(old_name)
+            names.add(new_name)
+        self.version += 1
 
     def add_song_to_playlist(self, playlist_name, song):
-        songs = self.get_songs(playlist_name)
-        if songs is None:
+        if playlist_name not in self.members:
             # If playlist doesn't exist, create it with the song
             self.add_playlist(playlist_name, [song])
-        else:
-            if song not in songs:
-                songs.append(song)
-                self.playlist_obj.new_playlist(playlist_name, songs)
+        elif not self.contains(playlist_name, song):
+            self.playlist_obj.add_song(playlist_name, song)
+            self._index(playlist_name, [song])
+            self.version += 1
 
     def remove_song_from_playlist(self, playlist_name, song):
-        songs = self.get_songs(playlist_name)
-        if songs is not None and song in songs:
-            songs.remove(song)
-            self.playlist_obj.new_playlist(playlist_name, songs)
+        if self.contains(playlist_name, song):
+            self.playlist_obj.remove_song(playlist_name, song)
+            self._unindex(playlist_name, song)
+            self.version += 1
+
+    def add_many(self, playlist_name, songs):
+        """Append every song not already in the playlist, in one commit; returns how many were added.
+
+        ``songs`` may be any iterable and is consumed in chunks of ``chunk_size``.
+        """
+        added = 0
+        with self.batch():
+            if playlist_name not in self.members:
+                self.add_playlist(playlist_name)
+            chunk = []
+            pending = set()
+            for song in songs:
+                if song in pending or self.contains(playlist_name, song):
+                    continue
+                chunk.append(song)
+                pending.add(song)
+                if len(chunk) >= self.chunk_size:
+                    added += self._add_chunk(playlist_name, chunk)
+                    chunk = []
+                    pending = set()
+            added += self._add_chunk(playlist_name, chunk)
+        return added
+
+    def _add_chunk(self, playlist_name, chunk):
+        if chunk:
+            self.playlist_obj.add_songs(playlist_name, chunk)
+            self._index(playlist_name, chunk)
+            self.version += 1
+        return len(chunk)
+
+    def remove_many(self, playlist_name, songs):
+        """Remove one occurrence of each listed song, in one commit; returns how many were removed."""
+        if playlist_name not in self.members:
+            return 0
+        found = [song for song in dict.fromkeys(songs) if self.contains(playlist_name, song)]
+        if found:
+            with self.batch():
+                self.playlist_obj.remove_songs(playlist_name, found)
+            for song in found:
+                self._unindex(playlist_name, song)
+            self.version += 1
+        return len(found)
+
+    def replace(self, playlist_name, songs):
+        """Make ``songs`` the playlist's whole content, creating it if needed."""
+        self.add_playlist(playlist_name, list(songs))
+
+    def import_playlist(self, file_path, name=None, index=None, roots=()):
+        """Stream an M3U/M3U8/PLS file into a playlist, skipping entries already in it.
+
+        Relative entries are resolved against the file's folder and ``roots``
+        using the library ``index``; the ones that match nothing are listed
+        in the result's ``unresolved``.
+        """
+        name = name or path.splitext(path.basename(file_path))[0]
+        result = ImportResult(name)
+        resolver = PathResolver(path.dirname(path.abspath(file_path)), index, roots)
+
+        def counted(entries):
+            for entry in entries:
+                result.entries += 1
+                yield entry
+
+        songs = resolve_entries(counted(read_playlist(file_path)), resolver, result.unresolved)
+        result.added = self.add_many(name, songs)
+        return result
+
+    def export_playlist(self, playlist_name, file_path, relative=False):
+        write_playlist(file_path, self.get_songs(playlist_name), relative)
+
+    def apply_library_delta(self, delta):
+        # Only renames are followed; entries for removed files stay in case the drive comes back.
+        if not (delta.renamed or delta.renamed_dirs):
+            return
+        moves = {}
+        for song in self.containing:
+            moved = delta.new_path(song)
+            if moved is not None and moved != song:
+                moves[song] = moved
+        if not moves:
+            return
+        with self.batch():
+            for old_path, new_path in moves.items():
+                names = self.containing.pop(old_path)
+                self.playlist_obj.rename_song(old_path, new_path, names)
+                for name in names:
+                    counts = self.members[name]
+                    counts[new_path] = counts.get(new_path, 0) + counts.pop(old_path)
+                self.containing.setdefault(new_path, set()).update(names)
+        self.version += 1
 
     # Favorites-specific methods
     def get_favorites(self):
@@ -52,4 +227,4 @@ class PlaylistManager:
         self.remove_song_from_playlist("Favorites", song)
 
     def is_favorite(self, song):
-        return song in self.get_favorites()
\ No newline at end of file
+        return self.contains("Favorites", song)
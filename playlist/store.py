@@ -0,0 +1,151 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from os import path
+
+from utils import metrics
+from utils.paths import data_dir
+
+
+class PlaylistStore:
+    """SQLite-backed playlists; every mutation touches only the rows it changes.
+
+    Each call commits on its own unless it runs inside ``batch()``, which
+    turns any number of mutations into one transaction. SQLite's WAL keeps the
+    file consistent if the process dies mid-write: a transaction is either
+    fully there on the next start or not at all.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or path.join(data_dir(), 'playlists.db')
+        self.lock = threading.RLock()
+        self.depth = 0
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS playlists (
+                id INTEGER PRIMARY KEY,
+                name TEXT UNIQUE NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS entries (
+                playlist INTEGER NOT NULL REFERENCES playlists (id) ON DELETE CASCADE,
+                seq INTEGER NOT NULL,
+                song TEXT NOT NULL,
+                PRIMARY KEY (playlist, seq)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS entries_song ON entries (song, playlist);
+        """)
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.ids = dict(self.conn.execute("SELECT name, id FROM playlists"))
+
+    def close(self):
+        self.conn.close()
+
+    @contextmanager
+    def batch(self):
+        """Group mutations into one transaction; nested batches join the outer one."""
+        with self.lock:
+            if self.depth == 0:
+                started = metrics.start()
+                self.conn.execute("BEGIN IMMEDIATE")
+            self.depth += 1
+            try:
+                yield self
+            except BaseException:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.conn.execute("ROLLBACK")
+                    self.ids = dict(self.conn.execute("SELECT name, id FROM playlists"))
+                raise
+            else:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.conn.execute("COMMIT")
+                    metrics.stop("playlist_save_seconds", started)
+
+    def load_all(self):
+        """All playlists as ``{name: [songs]}`` in creation order."""
+        with self.lock:
+            playlists = {name: [] for name, in self.conn.execute("SELECT name FROM playlists ORDER BY id")}
+            names = {playlist_id: name for name, playlist_id in self.ids.items()}
+            for playlist_id, song in self.conn.execute("SELECT playlist, song FROM entries ORDER BY playlist, seq"):
+                playlists[names[playlist_id]].append(song)
+            return playlists
+
+    def _append(self, playlist_id, songs):
+        row = self.conn.execute("SELECT MAX(seq) FROM entries WHERE playlist = ?", (playlist_id,)).fetchone()
+        start = 0 if row[0] is None else row[0] + 1
+        self.conn.executemany("INSERT INTO entries (playlist, seq, song) VALUES (?, ?, ?)",
+                              ((playlist_id, start + i, song) for i, song in enumerate(songs)))
+
+    def replace(self, name, songs):
+        """Create ``name`` or overwrite its songs."""
+        with self.batch():
+            playlist_id = self.ids.get(name)
+            if playlist_id is None:
+                playlist_id = self.conn.execute("INSERT INTO playlists (name) VALUES (?)", (name,)).lastrowid
+                self.ids[name] = playlist_id
+            else:
+                self.conn.execute("DELETE FROM entries WHERE playlist = ?", (playlist_id,))
+            self._append(playlist_id, songs)
+
+    def delete(self, name):
+        with self.batch():
+            playlist_id = self.ids.pop(name, None)
+            if playlist_id is not None:
+                self.conn.execute("DELETE FROM playlists WHERE id = ?", (playlist_id,))
+
+    def rename(self, old_name, new_name):
+        with self.batch():
+            self.conn.execute("UPDATE playlists SET name = ? WHERE id = ?", (new_name, self.ids[old_name]))
+            self.ids[new_name] = self.ids.pop(old_name)
+
+    def add_songs(self, name, songs):
+        with self.batch():
+            self._append(self.ids[name], songs)
+
+    def remove_song(self, name, song):
+        """Remove the first occurrence of ``song`` from ``name``."""
+        with self.batch():
+            playlist_id = self.ids[name]
+            self.conn.execute(
+                "DELETE FROM entries WHERE playlist = ? AND seq = "
+                "(SELECT MIN(seq) FROM entries WHERE playlist = ? AND song = ?)",
+                (playlist_id, playlist_id, song))
+
+    def remove_songs(self, name, songs):
+        """Remove the first occurrence of each of ``songs`` from ``name``."""
+        with self.batch():
+            playlist_id = self.ids[name]
+            self.conn.executemany(
+                "DELETE FROM entries WHERE playlist = ? AND seq = "
+                "(SELECT MIN(seq) FROM entries WHERE playlist = ? AND song = ?)",
+                ((playlist_id, playlist_id, song) for song in songs))
+
+    def rename_song(self, old_path, new_path):
+        """Point every entry for ``old_path``, in any playlist, at ``new_path``."""
+        with self.batch():
+            self.conn.execute("UPDATE entries SET song = ? WHERE song = ?", (new_path, old_path))
+
+    def is_empty(self):
+        return not self.ids
+
+    def migrate_json(self, json_path):
+        """One-time import of a legacy playlists.json; the file is renamed once imported."""
+        if not self.is_empty() or not path.exists(json_path):
+            return False
+        try:
+            with open(json_path, "r") as f:
+                playlists = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Could not migrate {json_path}: {e}")
+            return False
+        with self.batch():
+            for name, songs in playlists.items():
+                self.replace(name, songs)
+        os.replace(json_path, json_path + ".migrated")
+        print(f"Migrated {len(playlists)} playlists from {json_path}")
+        return True
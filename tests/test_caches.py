@@ -0,0 +1,28 @@
+"""The SQLite track caches with paths that are not valid UTF-8."""
+import os
+
+from metadata.cache import MetadataCache
+from metadata.loudness import LoudnessCache
+from metadata.tags import TrackInfo
+from metadata.waveform import WaveformCache
+
+BAD = os.fsdecode(b"/music/caf\xe9.mp3")
+
+
+def test_put_many_drops_paths_that_are_not_utf8(tmp_path):
+    loudness = LoudnessCache(str(tmp_path / "loudness.db"))
+    loudness.put_many([("/music/ok.mp3", 1, 2, 3.0, -14.0, 0.5), (BAD, 1, 2, 3.0, -14.0, 0.5)])
+    assert list(loudness.load_all()) == ["/music/ok.mp3"]
+    loudness.close()
+
+    waveforms = WaveformCache(str(tmp_path / "waveforms.db"))
+    waveforms.put_many([("/music/ok.mp3", 1, 2, b"\x01"), (BAD, 1, 2, b"\x01")])
+    assert list(waveforms.keys()) == ["/music/ok.mp3"]
+    assert waveforms.get(BAD, 1, 2) is None
+    waveforms.close()
+
+    tags = MetadataCache(str(tmp_path / "metadata.db"))
+    tags.put_many([("/music/ok.mp3", 1, 2, TrackInfo("t", "a", "b", 3.0)), (BAD, 1, 2, TrackInfo("t", "a", "b", 3.0))])
+    assert list(tags.load_all()) == ["/music/ok.mp3"]
+    assert tags.get(BAD) is None
+    tags.close()
@@ -0,0 +1,65 @@
+"""Gapless playback against FakeMixer: what is queued on the mixer must follow the play queue."""
+import contextlib
+import io
+import time
+
+from player.mixer_backend import FakeMixer
+from player.player import Music_player
+
+LENGTH = 0.3
+
+
+def playing(tracks):
+    mixer = FakeMixer(default_duration=LENGTH)
+    player = Music_player(mixer=mixer)
+    player.set_queue(tracks)
+    player.start()
+    return player, mixer
+
+
+def played(mixer):
+    return [path for _, action, path in mixer.log if action == "play"]
+
+
+def wait_until_stopped(player, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while player.scheduler.active and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_removed_next_track_does_not_play():
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        player, mixer = playing(["A", "B"])
+        assert mixer.queued == "B"
+        player.remove_from_queue("B")
+        started = time.monotonic()
+        wait_until_stopped(player)
+    player.scheduler.close()
+    assert time.monotonic() - started < 2 * LENGTH
+    assert not mixer.get_busy()
+    assert "End of queue." in out.getvalue()
+    assert player.current_song() == "A"
+
+
+def test_repeat_one_switched_on_mid_track_stops_the_queued_track():
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        player, mixer = playing(["A", "B"])
+        player.audio_controls.repeat = 1
+        player.toggle_repeat()
+        started = time.monotonic()
+        wait_until_stopped(player)
+    player.scheduler.close()
+    assert time.monotonic() - started < 2 * LENGTH
+    assert not mixer.get_busy()
+    assert "End of queue." in out.getvalue()
+
+
+def test_replaced_next_track_plays_instead():
+    with contextlib.redirect_stdout(io.StringIO()):
+        player, mixer = playing(["A", "B", "C"])
+        player.remove_from_queue("B")
+        assert mixer.queued == "C"
+        time.sleep(LENGTH * 1.5)
+    player.scheduler.close()
+    assert player.current_song() == "C"
+    assert played(mixer) == ["A", "C"]
@@ -0,0 +1,24 @@
+"""LibraryIndex over a real directory tree."""
+import contextlib
+import io
+import os
+
+from utils.library_index import LibraryIndex
+
+
+def test_names_that_are_not_utf8_are_skipped(tmp_path):
+    root = os.fsencode(tmp_path)
+    for name in (b"ok.mp3", b"caf\xe9.mp3"):
+        open(os.path.join(root, name), "wb").close()
+    os.mkdir(os.path.join(root, b"d\xe9mos"))
+    open(os.path.join(root, b"d\xe9mos", b"take.mp3"), "wb").close()
+    index = LibraryIndex(str(tmp_path / "library.db"))
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        result = index.scan(str(tmp_path))
+        again = index.scan(str(tmp_path), deep=True)
+    tracks = index.tracks(str(tmp_path))
+    index.close()
+    assert result.added == [str(tmp_path / "ok.mp3")]
+    assert tracks == [str(tmp_path / "ok.mp3")]
+    assert not again.has_changes()
+    assert "caf\\xe9.mp3" in out.getvalue()
@@ -0,0 +1,47 @@
+"""PlayQueue against a plain list: random edits must leave both holding the same tracks."""
+import random
+
+from player.play_queue import PlayQueue
+
+
+class SmallBlocks(PlayQueue):
+    # Small blocks, so a few hundred edits split and drop plenty of them.
+    BLOCK_SIZE = 4
+
+
+def test_random_edits_match_list():
+    rng = random.Random(6)
+    for _ in range(50):
+        expected = [f"t{i % 7}" for i in range(rng.randrange(0, 30))]
+        queue = SmallBlocks(tuple(expected))
+        for step in range(200):
+            n = len(expected)
+            op = rng.choice(("insert", "append", "pop", "remove", "move", "insert_after"))
+            track = f"t{rng.randrange(10)}"
+            if op == "insert":
+                index = rng.randint(-n - 3, n + 3)
+                queue.insert(index, track)
+                expected.insert(index, track)
+            elif op == "append":
+                queue.append(track)
+                expected.append(track)
+            elif op == "insert_after" and n:
+                index = rng.randrange(n)
+                queue.insert_after(index, track)
+                expected.insert(index + 1, track)
+            elif op == "pop" and n:
+                index = rng.randint(-n, n - 1)
+                assert queue.pop(index) == expected.pop(index)
+            elif op == "remove" and track in expected:
+                assert queue.remove(track) == expected.index(track)
+                expected.remove(track)
+            elif op == "move" and n:
+                old = rng.randrange(n)
+                index = rng.randint(-n - 2, n + 2)
+                entry = queue.entry_at(old)
+                assert queue.move(entry.entry_id, index) == old
+                expected.insert(index, expected.pop(old))
+            assert list(queue) == expected, (step, op)
+            assert len(queue) == len(expected)
+        for index in range(-len(expected), len(expected)):
+            assert queue[index] == expected[index]
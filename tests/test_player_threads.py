@@ -0,0 +1,43 @@
+"""What other threads can do while the transport is busy loading a track."""
+import contextlib
+import io
+import threading
+import time
+
+from player.mixer_backend import FakeMixer
+from player.player import Music_player
+
+
+class SlowMixer(FakeMixer):
+    def __init__(self, delay):
+        super().__init__(default_duration=3600)
+        self.delay = delay
+
+    def load(self, path):
+        time.sleep(self.delay)
+        super().load(path)
+
+
+def test_volume_does_not_wait_for_a_load():
+    events = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        player = Music_player(mixer=SlowMixer(0.3))
+        player.subscribe_queue(lambda *event: events.append(event))
+        player.set_queue(["A", "B"])
+
+        def start():
+            with player.transport:
+                player.start()
+
+        loading = threading.Thread(target=start)
+        loading.start()
+        time.sleep(0.05)
+        started = time.monotonic()
+        player.set_volume(0.2)
+        blocked = time.monotonic() - started
+        loading.join()
+    player.scheduler.close()
+    assert blocked < 0.1
+    assert player.now_playing == "A"
+    assert player.mixer.volume == 0.2
+    assert events[:2] == [("reset", 0, 2, ("A", "B")), ("current", 0, 0, None)]
@@ -0,0 +1,24 @@
+"""Importing M3U files into a PlaylistManager backed by a temporary store."""
+import os
+
+from playlist.playlists import Playlist
+from playlist.playlists_manager import PlaylistManager
+from playlist.store import PlaylistStore
+
+
+def manager(tmp_path):
+    store = PlaylistStore(str(tmp_path / "playlists.db"))
+    return PlaylistManager(Playlist(store, legacy_path=str(tmp_path / "playlists.json")))
+
+
+def test_entries_that_are_not_utf8_are_unresolved(tmp_path):
+    root = os.fsencode(tmp_path)
+    for name in (b"ok.mp3", b"caf\xe9.mp3"):
+        open(os.path.join(root, name), "wb").close()
+    with open(tmp_path / "mix.m3u", "wb") as f:
+        f.write(b"#EXTM3U\nok.mp3\ncaf\xe9.mp3\n")
+    playlists = manager(tmp_path)
+    result = playlists.import_playlist(str(tmp_path / "mix.m3u"))
+    assert (result.entries, result.added) == (2, 1)
+    assert result.unresolved == [os.fsdecode(b"caf\xe9.mp3")]
+    assert playlists.get_songs("mix") == [str(tmp_path / "ok.mp3")]
@@ -0,0 +1,85 @@
+import os
+from collections import OrderedDict
+
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QFontMetrics, QStaticText, QTransform
+
+
+class DisplayList:
+    """Row labels for one list, valid for one ``version`` of it.
+
+    Labels are computed the first time a row is drawn and kept, so scrolling
+    a 1M-row list only ever formats the rows that were on screen.
+    """
+
+    def __init__(self, items, version, label=os.path.basename):
+        self.items = items
+        self.version = version
+        self.label_of = label
+        self.labels = {}
+
+    def __len__(self):
+        return len(self.items)
+
+    def label(self, row):
+        label = self.labels.get(row)
+        if label is None:
+            label = self.labels[row] = self.label_of(self.items[row])
+        return label
+
+
+class DisplayModel:
+    """One DisplayList per view, rebuilt only when that view's source changes."""
+
+    def __init__(self):
+        self.lists = {}
+
+    def rows(self, view, items, version, label=os.path.basename):
+        cached = self.lists.get(view)
+        if cached is None or cached.items is not items or cached.version != version:
+            cached = self.lists[view] = DisplayList(items, version, label)
+        return cached
+
+
+class StaticTextCache:
+    """Laid-out, elided QStaticText per label for the list rows.
+
+    The layout depends on the font and the row width, and the cache is
+    keyed on the theme too, so ``reset`` drops everything when either changes.
+    """
+
+    def __init__(self, font, limit=1024):
+        self.font = font
+        self.metrics = QFontMetrics(font)
+        self.limit = limit
+        self.texts = OrderedDict()
+        self.key = None
+        self.width = 0
+        self.hits = 0
+        self.misses = 0
+
+    def reset(self, theme_name, width):
+        if (theme_name, width) != self.key:
+            self.key = (theme_name, width)
+            self.width = width
+            self.texts.clear()
+
+    def text(self, label):
+        static = self.texts.get(label)
+        if static is not None:
+            self.texts.move_to_end(label)
+            self.hits += 1
+            return static
+        self.misses += 1
+        elided = self.metrics.elidedText(label, Qt.TextElideMode.ElideRight, int(self.width))
+        static = QStaticText(elided)
+        static.setTextFormat(Qt.TextFormat.PlainText)
+        static.prepare(QTransform(), self.font)
+        self.texts[label] = static
+        if len(self.texts) > self.limit:
+            self.texts.popitem(last=False)
+        return static
+
+    def top_offset(self, line_height):
+        """Y offset that centres one line of text in a row of ``line_height``."""
+        return (line_height - self.metrics.height()) / 2
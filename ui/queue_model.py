@@ -0,0 +1,104 @@
+import os
+
+from PyQt6.QtCore import QAbstractListModel, QModelIndex, Qt, pyqtSignal
+from PyQt6.QtGui import QFont, QPainter
+from PyQt6.QtWidgets import QListView
+
+from player.play_queue import PlayQueue
+from utils import metrics
+
+
+class QueueModel(QAbstractListModel):
+    """List model over a mirror of ``Music_player``'s queue, kept in step by its queue events.
+
+    The mirror only changes through ``apply`` (fed from
+    ``Music_player.subscribe_queue``), so the view always sees a consistent
+    sequence of inserts and removes even when the backend has already moved
+    on, and the GUI thread never waits on the player lane: a reset adopts the
+    immutable sequence the event carries, and single edits go through a
+    ``PlayQueue`` of its own.
+
+    A new current row is announced through ``current_changed(previous, row)``
+    rather than ``dataChanged``: QListView answers any ``dataChanged`` by
+    laying out every row again, which on a long queue costs tens of
+    milliseconds per track change.
+    """
+
+    current_changed = pyqtSignal(int, int)
+
+    def __init__(self, player, parent=None):
+        super().__init__(parent)
+        # Built before any lane runs, so the player's queue can still be read directly.
+        queue = player.audio_controls.queue
+        self.tracks = PlayQueue(queue.base if queue.base is not None else tuple(queue))
+        self.current = player.audio_controls.song_pointer
+        self.bold = QFont()
+        self.bold.setBold(True)
+
+    @property
+    def rows(self):
+        return len(self.tracks)
+
+    def current_track(self):
+        return self.tracks[self.current] if 0 <= self.current < len(self.tracks) else None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.rows
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        row = index.row()
+        if not index.isValid() or row >= len(self.tracks):
+            return None
+        track = self.tracks[row]
+        if role == Qt.ItemDataRole.DisplayRole:
+            marker = "🎧 " if row == self.current else "   "
+            return marker + os.path.basename(track)
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return track
+        if role == Qt.ItemDataRole.FontRole and row == self.current:
+            return self.bold
+        return None
+
+    def apply(self, kind, first, count, tracks=None):
+        started = metrics.start()
+        self._apply(kind, first, count, tracks)
+        metrics.stop("queue_panel_update_seconds", started)
+
+    def _apply(self, kind, first, count, tracks):
+        if kind == "reset":
+            self.beginResetModel()
+            self.tracks = PlayQueue(tracks)
+            self.current = first
+            self.endResetModel()
+        elif kind == "inserted":
+            self.beginInsertRows(QModelIndex(), first, first + count - 1)
+            for offset, track in enumerate(tracks):
+                self.tracks.insert(first + offset, track)
+            self.endInsertRows()
+        elif kind == "removed":
+            self.beginRemoveRows(QModelIndex(), first, first + count - 1)
+            for _ in range(count):
+                self.tracks.pop(first)
+            # Same rule as Music_player.remove_from_queue.
+            if first + count <= self.current:
+                self.current -= count
+            self.endRemoveRows()
+        elif kind == "current":
+            previous, self.current = self.current, first
+            self.current_changed.emit(previous, first)
+
+
+class QueueView(QListView):
+    """QListView that says the queue is empty instead of showing a blank panel."""
+
+    placeholder = "Queue is empty"
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        model = self.model()
+        if model is None or model.rowCount() == 0:
+            painter = QPainter(self.viewport())
+            painter.setPen(self.palette().placeholderText().color())
+            painter.drawText(self.viewport().rect().adjusted(8, 8, -8, -8),
+                             Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignTop, self.placeholder)
+            painter.end()
@@ -0,0 +1,96 @@
+import time
+from collections import deque
+
+from PyQt6.QtCore import QTimer
+
+from utils import metrics
+
+
+class RenderScheduler:
+    """One frame timer for a widget that only runs while something animates.
+
+    An animation is a ``step(dt)`` callable registered under a name; it
+    advances its state by ``dt`` seconds, marks what it changed dirty via
+    ``invalidate`` and returns False once it has settled. With nothing
+    registered, or while the widget is hidden or minimized, the timer is
+    stopped and the widget costs nothing between input events.
+
+    ``frame_started``/``frame_finished`` bracket ``paintEvent`` so ``stats()``
+    can report repaint counts and frame times.
+    """
+
+    def __init__(self, widget, interval=16, keep=600):
+        self.widget = widget
+        self.timer = QTimer()
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.tick)
+        self.animations = {}
+        self.last_tick = None
+        self.ticks = 0
+        self.invalidations = 0
+        self.repaints = 0
+        self.frame_times = deque(maxlen=keep)
+        self.frame_start = None
+
+    def animate(self, name, step):
+        self.animations[name] = step
+        self.wake()
+
+    def stop(self, name):
+        self.animations.pop(name, None)
+        if not self.animations:
+            self.timer.stop()
+
+    def wake(self):
+        """Restart the timer if there is anything to animate (e.g. when the window is shown again)."""
+        if self.animations and not self.timer.isActive():
+            self.last_tick = time.monotonic()
+            self.timer.start()
+
+    def tick(self):
+        if not self.animations or not self.widget.isVisible() or self.widget.isMinimized():
+            self.timer.stop()
+            return
+        now = time.monotonic()
+        dt = now - self.last_tick
+        self.last_tick = now
+        self.ticks += 1
+        for name, step in list(self.animations.items()):
+            if not step(dt) and self.animations.get(name) is step:
+                del self.animations[name]
+        if not self.animations:
+            self.timer.stop()
+
+    def invalidate(self, rect=None):
+        """Schedule a repaint of ``rect`` (a QRectF), or of the whole widget."""
+        self.invalidations += 1
+        if rect is None:
+            self.widget.update()
+        else:
+            self.widget.update(rect.toAlignedRect())
+
+    def frame_started(self):
+        self.frame_start = time.perf_counter()
+
+    def frame_finished(self):
+        self.repaints += 1
+        frame_time = time.perf_counter() - self.frame_start
+        self.frame_times.append(frame_time)
+        metrics.observe("paint_frame_seconds", frame_time)
+
+    def stats(self):
+        ordered = sorted(self.frame_times)
+        frames = {}
+        if ordered:
+            frames = {
+                "frame_mean_ms": 1000 * sum(ordered) / len(ordered),
+                "frame_p95_ms": 1000 * ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                "frame_max_ms": 1000 * ordered[-1],
+            }
+        return {
+            "ticks": self.ticks,
+            "invalidations": self.invalidations,
+            "repaints": self.repaints,
+            "animating": sorted(self.animations),
+            **frames,
+        }
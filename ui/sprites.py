@@ -0,0 +1,57 @@
+import math
+
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QFont, QPainter, QPixmap
+
+
+class SpriteCache:
+    """Pixmaps of static UI parts, rendered once per theme, size and label.
+
+    ``sprite(key, size, paint)`` returns the cached pixmap for ``key`` or
+    renders it with ``paint(painter)`` into a transparent pixmap of ``size``
+    (a QSizeF, in logical pixels) at the widget's device pixel ratio.
+    ``invalidate`` drops everything; call it when the theme or size changes.
+    Set ``enabled`` to False to paint everything directly, as before.
+    """
+
+    def __init__(self, device_pixel_ratio=1.0):
+        self.enabled = True
+        self.device_pixel_ratio = device_pixel_ratio
+        self.sprites = {}
+        self.fonts = {}
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self, device_pixel_ratio=None):
+        if device_pixel_ratio is not None:
+            self.device_pixel_ratio = device_pixel_ratio
+        self.sprites.clear()
+
+    def discard(self, kind):
+        """Drop the sprites whose key starts with ``kind``, e.g. ones drawn from data that changed."""
+        for key in [key for key in self.sprites if key[0] == kind]:
+            del self.sprites[key]
+
+    def font(self, family, size):
+        key = (family, size)
+        font = self.fonts.get(key)
+        if font is None:
+            font = self.fonts[key] = QFont(family, size)
+        return font
+
+    def sprite(self, key, size, paint):
+        pixmap = self.sprites.get(key)
+        if pixmap is not None:
+            self.hits += 1
+            return pixmap
+        self.misses += 1
+        ratio = self.device_pixel_ratio
+        pixmap = QPixmap(math.ceil(size.width() * ratio), math.ceil(size.height() * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        paint(painter)
+        painter.end()
+        self.sprites[key] = pixmap
+        return pixmap
@@ -0,0 +1,206 @@
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+from PyQt6.QtCore import QAbstractEventDispatcher, QObject, QRunnable, QThreadPool, pyqtSignal
+
+# Higher runs first among queued tasks.
+USER = 10     # play, skip, pause: the user is waiting for these
+NORMAL = 0
+BULK = -10    # rescans, imports, metadata
+
+
+class Task(QRunnable):
+    """One call of ``fn()`` on the pool.
+
+    ``cancel()`` before it starts means it never runs; after, its result is
+    dropped. Long jobs can poll ``cancelled`` themselves.
+    """
+
+    def __init__(self, runner, fn, priority, key, lane, on_result, on_error):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.runner = runner
+        self.fn = fn
+        self.priority = priority
+        self.key = key
+        self.lane = lane
+        self.on_result = on_result
+        self.on_error = on_error
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+        if self.runner.pool.tryTake(self):
+            # Taken off the pool's queue, so run() will never report back.
+            self.runner.task_done(self, None, None)
+
+    def run(self):
+        result = error = None
+        try:
+            if not self.cancelled.is_set():
+                result = self.fn()
+        except Exception as e:
+            error = e
+            traceback.print_exc()
+        finally:
+            self.runner.task_done(self, result, error)
+
+
+class TaskRunner(QObject):
+    """QThreadPool front end for everything too slow for the GUI thread.
+
+    ``submit(fn, priority, key, lane, on_result, on_error)`` runs ``fn()`` on
+    the pool and calls ``on_result(result)`` or ``on_error(exception)`` back
+    on the GUI thread. Submitting with the ``key`` of an unfinished task
+    cancels that task first, so a repeated request only does the work once.
+
+    A lane runs at most ``limit`` of its tasks at a time, in submission order:
+    the "player" lane (limit 1) keeps play/skip/pause in the order they were
+    clicked, and BULK tasks default to the "bulk" lane, which always leaves a
+    pool thread free for USER work.
+    """
+
+    finished = pyqtSignal(object, object, object)
+
+    def __init__(self, parent=None, max_threads=None):
+        super().__init__(parent)
+        self.pool = QThreadPool()
+        threads = max_threads or max(2, QThreadPool.globalInstance().maxThreadCount())
+        self.pool.setMaxThreadCount(threads)
+        self.lock = threading.Lock()
+        self.lanes = {"player": [1, 0, deque()], "bulk": [max(1, threads - 1), 0, deque()]}
+        self.keys = {}
+        self.active = set()
+        self.finished.connect(self.deliver)
+
+    def submit(self, fn, priority=NORMAL, key=None, lane=None, on_result=None, on_error=None):
+        if lane is None and priority <= BULK:
+            lane = "bulk"
+        task = Task(self, fn, priority, key, lane, on_result, on_error)
+        previous = None
+        queued = False
+        with self.lock:
+            if key is not None:
+                previous = self.keys.get(key)
+                self.keys[key] = task
+            self.active.add(task)
+            if lane is not None:
+                slot = self.lanes.setdefault(lane, [1, 0, deque()])
+                queued = slot[1] >= slot[0]
+                if queued:
+                    slot[2].append(task)
+                else:
+                    slot[1] += 1
+        if previous is not None:
+            previous.cancel()
+        if not queued:
+            self.pool.start(task, priority)
+        return task
+
+    def task_done(self, task, result, error):
+        """Runs on the worker thread: start the lane's next task, then hand the result to the GUI."""
+        following = None
+        with self.lock:
+            if task.lane is not None:
+                slot = self.lanes[task.lane]
+                if slot[2]:
+                    following = slot[2].popleft()
+                else:
+                    slot[1] -= 1
+        if following is not None:
+            self.pool.start(following, following.priority)
+        self.finished.emit(task, result, error)
+
+    def deliver(self, task, result, error):
+        with self.lock:
+            self.active.discard(task)
+            if self.keys.get(task.key) is task:
+                del self.keys[task.key]
+        if task.cancelled.is_set():
+            return
+        if error is not None:
+            if task.on_error is not None:
+                task.on_error(error)
+        elif task.on_result is not None:
+            task.on_result(result)
+
+    def cancel(self, key):
+        with self.lock:
+            task = self.keys.get(key)
+        if task is not None:
+            task.cancel()
+
+    def shutdown(self, timeout_ms=2000):
+        with self.lock:
+            tasks = list(self.active)
+            for slot in self.lanes.values():
+                slot[2].clear()
+        for task in tasks:
+            task.cancel()
+        self.pool.waitForDone(timeout_ms)
+
+
+class StallDetector:
+    """Logs every stretch of more than ``threshold`` seconds the GUI thread spends away from its event loop.
+
+    The event dispatcher's ``awake``/``aboutToBlock`` signals bracket each
+    burst of work, so measuring costs two slot calls per wake-up and nothing
+    while idle. A watchdog thread grabs the GUI thread's stack once a burst
+    runs past the threshold, so the log says what was blocking.
+    """
+
+    def __init__(self, threshold=0.05, dispatcher=None):
+        self.threshold = threshold
+        self.gui_thread = threading.get_ident()
+        self.woke = None
+        self.generation = 0
+        self.stack = None
+        self.stalls = 0
+        self.worst = 0.0
+        self.busy = threading.Event()
+        self.closed = False
+        dispatcher = dispatcher or QAbstractEventDispatcher.instance()
+        dispatcher.awake.connect(self.on_awake)
+        dispatcher.aboutToBlock.connect(self.on_block)
+        self.thread = threading.Thread(target=self.watch, daemon=True, name="stall-detector")
+        self.thread.start()
+
+    def on_awake(self):
+        if self.woke is None:
+            self.woke = time.perf_counter()
+            self.generation += 1
+            self.stack = None
+            self.busy.set()
+
+    def on_block(self):
+        self.busy.clear()
+        if self.woke is None:
+            return
+        blocked = time.perf_counter() - self.woke
+        self.woke = None
+        if blocked > self.threshold:
+            self.stalls += 1
+            self.worst = max(self.worst, blocked)
+            print(f"GUI thread blocked for {blocked * 1000:.0f} ms")
+            if self.stack:
+                print("".join(self.stack), end="")
+
+    def watch(self):
+        while not self.closed:
+            self.busy.wait()
+            generation = self.generation
+            time.sleep(self.threshold)
+            if self.busy.is_set() and self.generation == generation and self.stack is None:
+                frame = sys._current_frames().get(self.gui_thread)
+                if frame is not None:
+                    self.stack = traceback.format_stack(frame, limit=8)
+
+    def close(self):
+        self.closed = True
+        self.busy.set()
+
+    def stats(self):
+        return {"stalls": self.stalls, "worst_ms": self.worst * 1000}
@@ -1,10 +1,24 @@
-from PyQt6.QtCore import Qt, QTimer, QRectF, QPointF
+from PyQt6.QtCore import Qt, QRectF, QPointF, QLineF, pyqtSignal
 from PyQt6.QtGui import QPainter, QColor, QFont, QPen, QBrush
-from PyQt6.QtWidgets import QWidget, QMenu, QTextEdit, QDialog, QVBoxLayout, QLineEdit, QListWidget, QPushButton, QLabel, QMessageBox, QInputDialog
+from PyQt6.QtWidgets import QWidget, QMenu, QDialog, QVBoxLayout, QLineEdit, QListWidget, QPushButton, QLabel, QMessageBox, QInputDialog
+import importlib.util
 import os
-import math
+import time
+from player.pcm_cache import PCMCache
 from player.player import Music_player
-from utils.file_manager import file_manager
+from player.spectrum import SpectrumWorker, pcm_samples
+from metadata.cache import MetadataCache
+from metadata.waveform import WaveformCache, columns_of, overview
+from utils.frame_budget import FrameBudget
+from utils.library_service import LibraryService
+from utils.search_index import SearchWorker
+from utils.paths import music_folder
+from utils.watcher import LibraryWatcher
+from ui.display_model import DisplayModel, StaticTextCache
+from ui.queue_model import QueueModel, QueueView
+from ui.render_scheduler import RenderScheduler
+from ui.sprites import SpriteCache
+from ui.tasks import BULK, NORMAL, USER, StallDetector, TaskRunner
 from playlist.playlists import Playlist
 
 class PlaylistManager:
@@ -29,16 +43,14 @@ class PlaylistManager:
         self.playlist_obj.rename_playlist(old_name, new_name)
 
     def add_song_to_playlist(self, playlist_name, song):
-        songs = self.get_songs(playlist_name)
-        if song not in songs:
-            songs.append(song)
-            self.playlist_obj.new_playlist(playlist_name, songs)
+        if playlist_name not in self.playlist_obj.playlists:
+            self.add_playlist(playlist_name, [song])
+        elif song not in self.get_songs(playlist_name):
+            self.playlist_obj.add_song(playlist_name, song)
 
     def remove_song_from_playlist(self, playlist_name, song):
-        songs = self.get_songs(playlist_name)
-        if song in songs:
-            songs.remove(song)
-            self.playlist_obj.new_playlist(playlist_name, songs)
+        if song in self.get_songs(playlist_name):
+            self.playlist_obj.remove_song(playlist_name, song)
 
     def get_favorites(self):
         return self.get_songs("Favorites")
@@ -112,46 +124,95 @@ class PlaylistDialog(QDialog):
             """
 
 class AnimatedValue:
+    """Eases towards ``target``; ``step`` is driven by the RenderScheduler."""
+
     def __init__(self, start=0.0):
         self._value = start
         self.target = start
-        self.timer = QTimer()
-        self.timer.setInterval(16)
-        self.timer.timeout.connect(self.update)
 
     def start_animation(self, target):
         self.target = target
-        self.timer.start()
 
-    def update(self):
+    def step(self, dt):
+        """Advance by ``dt`` seconds; returns False once the target is reached."""
         diff = self.target - self._value
         if abs(diff) < 0.1:
             self._value = self.target
-            self.timer.stop()
-        else:
-            self._value += diff * 0.15
+            return False
+        # 15% of the remaining distance per 16 ms frame, whatever the real frame rate.
+        self._value += diff * (1 - 0.85 ** (dt / 0.016))
+        return True
 
     def value(self):
         return self._value
 
 class MusicPlayerUI(QWidget):
-    def __init__(self, playlist_manager):
+    tracks_found = pyqtSignal(list)
+    library_changed = pyqtSignal(object)
+    snapshot_published = pyqtSignal(object, object)
+    library_ready = pyqtSignal()
+    queue_changed = pyqtSignal(str, int, int, object)
+    search_done = pyqtSignal(int, str, list)
+    spectrum_ready = pyqtSignal()
+
+    def __init__(self, playlist_manager, backend=None):
         super().__init__()
+        # Before anything that can send a changeEvent, which wakes it.
+        self.render = RenderScheduler(self)
         self.playlist_manager = playlist_manager
         self.setWindowTitle("Music Player UI")
         self.resize(800, 700)
-        self.file_manager_ = file_manager()
-        self.backend = Music_player()
-        self.songs_path = self.file_manager_.search()
-        self.songs = [p.split("\\")[-1] for p in self.songs_path]  # Filenames for display
+        # Anything that can touch the disk or the mixer runs on the pool; see player_action/playlist_action.
+        self.tasks = TaskRunner(self)
+        self.stall_detector = StallDetector()
+        self.library = LibraryService.instance()
+        self.backend = backend or Music_player(pcm_cache=PCMCache.with_default_spill())
+        self.songs_path = []
+        self.watcher = None
+        self.loudness = None
+        self.extractor = None
+        self.tracks_found.connect(self.add_tracks)
+        self.snapshot_published.connect(self.on_snapshot)
+        self.library_listener = lambda snapshot, previous, delta: self.snapshot_published.emit(snapshot, delta)
+        self.library.subscribe(self.library_listener)
+        self.library_changed.connect(self.library.apply_delta)
+        self.library_ready.connect(self.start_watcher)
+        # Last session's list shows at once; the disk is checked behind it.
+        self.library.load_in_background(self.tracks_found.emit, on_done=self.library_ready.emit)
         self.scroll_offset = 0
         self.scroll_animated = AnimatedValue(0)
 
-        self.queue_display = QTextEdit(self)
-        self.queue_display.setReadOnly(True)
+        # Queries run on the search thread; only the answer to the latest one is shown.
+        self.search = SearchWorker()
+        self.search.update(lambda index: index.use_tags(MetadataCache()))
+        self.search.follow(self.library)
+        self.search_results = []
+        self.search_wanted = None
+        self.search_generation = 0
+        self.search_done.connect(self.on_search_done)
+        self.search_box = QLineEdit(self)
+        self.search_box.setPlaceholderText("Search title, artist or file name")
+        self.search_box.setClearButtonEnabled(True)
+        self.search_box.textChanged.connect(self.on_search_text)
+        self.search_box.returnPressed.connect(self.setFocus)
+        self.display_model = DisplayModel()
+        self.list_font = QFont("Arial", 14)
+        self.row_texts = StaticTextCache(self.list_font)
+
+        # Only the visible rows are ever asked for; the backend pushes every queue change.
+        self.queue_model = QueueModel(self.backend, self)
+        self.queue_display = QueueView(self)
+        self.queue_display.setModel(self.queue_model)
+        self.queue_display.setUniformItemSizes(True)
+        self.queue_model.current_changed.connect(self.repaint_queue_rows)
+        self.queue_model.current_changed.connect(self.load_waveform)
         self.queue_display.setGeometry(600, 80, 180, 550)
         self.queue_display.hide()
         self.queue_visible = False
+        self.queue_changed.connect(self.on_queue_changed)
+        # Kept: every access to a bound signal builds a new one, so this is what unsubscribe needs.
+        self.queue_listener = self.queue_changed.emit
+        self.backend.subscribe_queue(self.queue_listener)
 
         self.themes = {
             "apple": {
@@ -171,15 +232,30 @@ class MusicPlayerUI(QWidget):
         }
         self.theme_name = "apple"
         self.theme = self.themes[self.theme_name]
+        self.brushes = {key: QBrush(color) for key, color in self.theme.items()}
+        self.sprites = SpriteCache(self.devicePixelRatioF())
+        self.search_box.setStyleSheet(self.get_dialog_stylesheet())
+
+        # Bar heights come from the spectrum thread; the GUI only draws them.
+        self.spectrum_ready.connect(self.on_spectrum)
+        self.spectrum = None
+        if importlib.util.find_spec("numpy") is not None:
+            self.spectrum = SpectrumWorker(self.backend, self.spectrum_ready.emit)
+        self.bars = []
+        self.progress = None
+        self.waveform = None
+        self.waveform_song = None
+        self.waveforms = None
+        self.visual_budget = FrameBudget(0.004, self.VISUAL_LEVELS)
+        self.volume_font = QFont("Arial", 10)
 
         # Initialize lists with full paths
-        self.favorites = self.playlist_manager.get_favorites() or []
-        self.playlists = self.playlist_manager.get_all_playlists()
+        self.playlists_version = None
         self.current_playlist_songs = []  # Full paths of songs in the selected playlist
         self.current_view = "songs"
         self.selected_index = 0
-        self.is_playing = False
-        self.rotation_angle = 0.0
+        self.refresh_lists()
+        self._is_playing = False
 
         self.top_buttons = {
             "list": QRectF(260, 20, 80, 40),
@@ -200,119 +276,401 @@ class MusicPlayerUI(QWidget):
             "add_playlist": QRectF(420, 640, 40, 40),
         }
 
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_rotation)
-        self.timer.start(16)
-
         self.setMouseTracking(True)
         self.hovered_button = None
 
-    def refresh_lists(self):
-        """Refresh playlists, favorites, and current playlist songs."""
-        self.playlists = self.playlist_manager.get_all_playlists()
-        self.favorites = self.playlist_manager.get_favorites() or []
-        if self.current_view == "playlist_songs" and hasattr(self, 'selected_playlist'):
-            self.current_playlist_songs = self.playlist_manager.get_songs(self.selected_playlist) or []
-
-    def update_rotation(self):
-        """Update rotation animation and queue display."""
-        if self.is_playing:
-            self.rotation_angle = (self.rotation_angle + 0.8) % 360
-        self.scroll_animated.start_animation(self.scroll_offset)
-        self.update_queue_display()
+    def add_tracks(self, batch):
+        """Append a batch of tracks while the first library scan is still running."""
+        if self.library.loaded.is_set():
+            return
+        self.songs_path.extend(batch)
+        self.update()
+
+    def on_snapshot(self, snapshot, delta):
+        """Switch to the shared library snapshot and apply any watcher delta to playlists."""
+        self.songs_path = snapshot
+        if delta:
+            self.playlist_action(lambda: self.playlist_manager.apply_library_delta(delta))
+            if self.watcher is not None:
+                tracks = delta.new_tracks(snapshot)
+                self.start_tag_extraction(tracks)
+                self.start_loudness_analysis(tracks)
+        self.update()
+
+    def start_watcher(self):
+        """Watch the music folder once the published list is known to match it."""
+        print(f"Library loaded: {len(self.library.snapshot(load=False))} tracks")
+        if self.watcher is None:
+            self.watcher = LibraryWatcher(music_folder(), self.library_changed.emit,
+                                          index=self.library.file_manager_.index)
+            self.watcher.start()
+        self.start_tag_extraction(list(self.library.snapshot(load=False)), key="metadata")
+        self.start_loudness_analysis()
+
+    def start_tag_extraction(self, tracks, key=None):
+        """Read the tags the cache does not have yet on a process pool, and index them for search as they land."""
+        from metadata.extractor import MetadataExtractor
+
+        if not tracks:
+            return
+        if self.extractor is None:
+            self.extractor = MetadataExtractor()
+
+        def indexed(entries):
+            infos = {file_path: info for file_path, _, _, info in entries}
+            self.search.update(lambda index: index.set_tags(infos))
+
+        self.tasks.submit(lambda: self.extractor.extract(tracks, on_batch=indexed), BULK, key=key)
+
+    def start_loudness_analysis(self, tracks=None):
+        """Measure tracks not analyzed yet on a process pool, so each plays at the same loudness.
+
+        Without ``tracks`` the whole library is checked. Passes run one at a time on their own lane.
+        """
+        from metadata.loudness import LoudnessAnalyzer, normalize_library
+
+        if self.loudness is None:
+            self.loudness = LoudnessAnalyzer()
+        key = None
+        if tracks is None:
+            tracks, key = list(self.library.snapshot(load=False)), "loudness"
+        if tracks:
+            self.tasks.submit(lambda: normalize_library(self.backend, tracks, self.loudness), BULK,
+                              key=key, lane="loudness")
+
+    def closeEvent(self, event):
+        # The library and the backend outlive the window; nothing may emit into it once it is gone.
+        self.library.unsubscribe(self.library_listener)
+        self.backend.unsubscribe_queue(self.queue_listener)
+        if self.loudness is not None:
+            self.loudness.cancel()
+        if self.extractor is not None:
+            self.extractor.cancel()
+        if self.spectrum is not None:
+            self.spectrum.close()
+        self.tasks.shutdown()
+        self.stall_detector.close()
+        self.search.close()
+        self.library.cancel()
+        self.library.save_snapshot()
+        if self.watcher is not None:
+            self.watcher.stop()
+        super().closeEvent(event)
+
+    def player_action(self, fn, on_done=None):
+        """Run a backend call on the player lane: in click order, ahead of bulk work, off the GUI thread."""
+        def locked():
+            with self.backend.transport:
+                return fn()
+        self.tasks.submit(locked, USER, lane="player", on_result=on_done)
+
+    def play_from(self, queue, index, restart=True):
+        def play():
+            self.backend.set_queue(queue, index)
+            self.backend.start()
+            if restart:
+                self.backend.audio_controls.is_paused = False
+        self.player_action(play)
+        self.is_playing = True
+
+    def follow_pointer(self, _=None):
+        self.selected_index = self.queue_model.current
+        self.update()
+
+    def playlist_action(self, fn):
+        """Playlist writes run in order on their own lane; the lists refresh as each one lands."""
+        def locked():
+            with self.playlist_manager.lock:
+                return fn()
+        self.tasks.submit(locked, lane="playlists", on_result=self.playlists_written)
+
+    def playlists_written(self, _):
+        self.refresh_lists()
+        self.selected_index = min(self.selected_index, max(0, len(self.get_current_list()) - 1))
         self.update()
 
+    def refresh_lists(self):
+        """Refresh playlists, favorites, and current playlist songs.
+
+        The playlists lane edits the manager's lists in place, so the GUI keeps copies.
+        """
+        manager = self.playlist_manager
+        with manager.lock:
+            if self.playlists_version != manager.version:
+                self.playlists = manager.get_all_playlists()
+                self.favorites = list(manager.get_favorites() or [])
+                self.playlists_version = manager.version
+            if self.current_view == "playlist_songs" and hasattr(self, 'selected_playlist'):
+                self.current_playlist_songs = list(manager.get_songs(self.selected_playlist) or [])
+
+    @property
+    def is_playing(self):
+        return self._is_playing
+
+    @is_playing.setter
+    def is_playing(self, playing):
+        self._is_playing = playing
+        if self.spectrum is not None:
+            self.spectrum.set_active(playing)
+        self.mark_dirty("visualizer", "play")
+
+    def on_spectrum(self):
+        self.bars, self.progress = self.spectrum.take()
+        self.mark_dirty("visualizer")
+
+    def load_waveform(self, *_):
+        """Fetch the overview of the track now playing off the GUI thread; draws once it arrives."""
+        song = self.queue_model.current_track()
+        if song == self.waveform_song:
+            return
+        self.waveform_song = song
+        self.waveform = None
+        self.mark_dirty("visualizer")
+        if song is not None:
+            self.tasks.submit(lambda: self.read_waveform(song), NORMAL, key="waveform",
+                              on_result=lambda data: self.show_waveform(song, data))
+
+    def read_waveform(self, song):
+        """The cached overview of ``song``, built from its decoded samples if the loudness pass has not got to it."""
+        if self.waveforms is None:
+            self.waveforms = WaveformCache()
+        try:
+            st = os.stat(song)
+        except OSError:
+            return None
+        data = self.waveforms.get(song, st.st_size, st.st_mtime_ns)
+        if data is None and self.spectrum is not None:
+            pcm = self.backend.mixer.pcm(song)
+            decoded = pcm_samples(*pcm) if pcm is not None else None
+            if decoded is not None:
+                samples, _, scale = decoded
+                data = overview(samples, scale)
+                self.waveforms.put_many([(song, st.st_size, st.st_mtime_ns, data)])
+        return columns_of(data) if data is not None else None
+
+    def show_waveform(self, song, columns):
+        if song != self.waveform_song:
+            return
+        self.waveform = columns
+        self.sprites.discard("waveform")
+        self.mark_dirty("visualizer")
+
+    def scroll_to(self, offset):
+        self.scroll_offset = offset
+        self.scroll_animated.start_animation(offset)
+        self.render.animate("scroll", self.step_scroll)
+
+    def step_scroll(self, dt):
+        moving = self.scroll_animated.step(dt)
+        self.mark_dirty("list")
+        return moving
+
+    def region_rect(self, name):
+        """Widget area covered by a named part of the window."""
+        if name in self.top_buttons:
+            return self.top_buttons[name]
+        if name in self.bottom_buttons:
+            return self.bottom_buttons[name]
+        return {
+            "visualizer": QRectF(30, 100, self.width() - 240, 190),
+            "volume": QRectF(20, 70, self.width() - 40, 20),
+            "list": QRectF(30, 340, self.width() - 240, 310),
+        }[name]
+
+    def mark_dirty(self, *names):
+        for name in names:
+            self.render.invalidate(self.region_rect(name))
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.render.wake()
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        self.render.wake()
+
     def paintEvent(self, event):
+        self.render.frame_started()
+        region = event.region()
         painter = QPainter(self)
         painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        painter.fillRect(self.rect(), self.theme["bg"])
+        painter.fillRect(event.rect(), self.theme["bg"])
+
+        def dirty(name):
+            return region.intersects(self.region_rect(name).toAlignedRect())
 
         for name, rect in self.top_buttons.items():
-            label = "Queue 🎶" if name == "toggle_queue" else name.capitalize()
-            self.draw_button(painter, rect, label, hovered=(self.hovered_button == name))
+            if dirty(name):
+                label = "Queue 🎶" if name == "toggle_queue" else name.capitalize()
+                self.draw_button(painter, rect, label, hovered=(self.hovered_button == name))
 
-        center = QPointF(self.width() / 2, 190)
-        radius = 90
-        painter.save()
-        painter.translate(center)
-        painter.rotate(self.rotation_angle if self.is_playing else 0)
-        self.draw_cd(painter, radius)
-        painter.restore()
+        if dirty("visualizer"):
+            started = time.perf_counter()
+            self.draw_visualizer(painter, self.region_rect("visualizer"))
+            self.visual_budget.record(time.perf_counter() - started)
 
-        self.draw_volume_indicator(painter)
-        self.draw_list(painter, 30, 340, self.width() - 240, 310)
+        if dirty("volume"):
+            self.draw_volume_indicator(painter)
+        if dirty("list"):
+            self.draw_list(painter, 30, 340, self.width() - 240, 310)
 
         for name, rect in self.bottom_buttons.items():
-            icon = {
-                "prev": "⏮",
-                "play": "⏸" if self.is_playing else "▶️",
-                "next": "⏭",
-                "repeat": {1: "🔁", 2: "🔂", 3: "🔀"}.get(self.backend.audio_controls.repeat, "🔁"),
-                "add_fav": "❤️",
-                "add_playlist": "➕",
-                "volume_down": "🔉",
-                "volume_up": "🔊"
-            }[name]
-            self.draw_button(painter, rect, icon, hovered=(self.hovered_button == name))
+            if dirty(name):
+                self.draw_button(painter, rect, self.button_icon(name), hovered=(self.hovered_button == name))
+        painter.end()
+        self.render.frame_finished()
+
+    BUTTON_ICONS = {
+        "prev": "⏮",
+        "next": "⏭",
+        "add_fav": "❤️",
+        "add_playlist": "➕",
+        "volume_down": "🔉",
+        "volume_up": "🔊",
+    }
+    REPEAT_ICONS = {1: "🔁", 2: "🔂", 3: "🔀"}
+
+    def button_icon(self, name):
+        if name == "play":
+            return "⏸" if self.is_playing else "▶️"
+        if name == "repeat":
+            return self.REPEAT_ICONS.get(self.backend.audio_controls.repeat, "🔁")
+        return self.BUTTON_ICONS[name]
 
     def draw_button(self, painter, rect, text, hovered=False):
-        painter.setBrush(QBrush(self.theme["highlight"] if hovered else self.theme["button_bg"]))
+        if not self.sprites.enabled:
+            self.paint_button(painter, rect, text, hovered)
+            return
+        size = rect.size()
+        local = QRectF(QPointF(0, 0), size)
+        sprite = self.sprites.sprite(("button", text, hovered, size.width(), size.height()), size,
+                                     lambda p: self.paint_button(p, local, text, hovered))
+        painter.drawPixmap(rect.topLeft(), sprite)
+
+    def paint_button(self, painter, rect, text, hovered=False):
+        painter.setBrush(self.brushes["highlight"] if hovered else self.brushes["button_bg"])
         painter.setPen(Qt.PenStyle.NoPen)
         painter.drawRoundedRect(rect, 8, 8)
         painter.setPen(self.theme["button_fg"])
-        font = QFont("Helvetica Neue", 14 if len(text) == 1 else 16)
-        painter.setFont(font)
+        painter.setFont(self.sprites.font("Helvetica Neue", 14 if len(text) == 1 else 16))
         painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, text)
 
     def draw_volume_indicator(self, painter):
         rect = QRectF(20, 70, self.width() - 40, 20)
         painter.setPen(Qt.PenStyle.NoPen)
-        painter.setBrush(QBrush(self.theme["button_bg"]))
+        painter.setBrush(self.brushes["button_bg"])
         painter.drawRoundedRect(rect, 5, 5)
         filled = rect.width() * self.backend.current_volume
-        painter.setBrush(QBrush(self.theme["highlight"]))
+        painter.setBrush(self.brushes["highlight"])
         painter.drawRoundedRect(QRectF(rect.left(), rect.top(), filled, rect.height()), 5, 5)
         painter.setPen(self.theme["fg"])
-        painter.setFont(QFont("Arial", 10))
+        painter.setFont(self.volume_font)
         painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, f"Volume: {int(self.backend.current_volume * 100)}%")
 
-    def draw_cd(self, painter, radius):
-        painter.setBrush(QBrush(QColor(200, 200, 200)))
+    # Cheaper ways to draw the visualizer, picked by visual_budget when frames run long.
+    VISUAL_LEVELS = ("full", "flat", "coarse")
+
+    def draw_visualizer(self, painter, rect):
+        """Spectrum bars over the waveform of the current track, with what has been played highlighted."""
+        level = self.visual_budget.current()
+        bars = self.bars
+        if level == "coarse":
+            bars = [max(bars[i:i + 2]) for i in range(0, len(bars), 2)]
+        spectrum = QRectF(rect.left(), rect.top(), rect.width(), rect.height() - 56)
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing, level == "full")
         painter.setPen(Qt.PenStyle.NoPen)
-        painter.drawEllipse(QPointF(0, 0), radius, radius)
-        painter.setPen(QPen(QColor(150, 150, 150), 2))
-        for angle in range(0, 360, 20):
-            rad = math.radians(angle)
-            painter.drawLine(QPointF(0, 0), QPointF(math.cos(rad) * radius, math.sin(rad) * radius))
-        painter.setBrush(QBrush(QColor(100, 100, 100)))
-        painter.drawEllipse(QPointF(0, 0), 20, 20)
+        painter.setBrush(self.brushes["button_bg"])
+        painter.drawRect(QRectF(spectrum.left(), spectrum.bottom() - 2, spectrum.width(), 2))
+        if bars:
+            gap = 3
+            width = (spectrum.width() - gap * (len(bars) - 1)) / len(bars)
+            painter.setBrush(self.brushes["highlight"])
+            for i, height in enumerate(bars):
+                h = max(2.0, height * spectrum.height())
+                bar = QRectF(spectrum.left() + i * (width + gap), spectrum.bottom() - h, width, h)
+                if level == "full":
+                    painter.drawRoundedRect(bar, 2, 2)
+                else:
+                    painter.drawRect(bar)
+        painter.restore()
+
+        wave = QRectF(rect.left(), rect.bottom() - 46, rect.width(), 46)
+        if self.waveform is None:
+            return
+        self.draw_waveform(painter, wave, False)
+        if self.progress is not None:
+            played = wave.width() * self.progress
+            painter.save()
+            painter.setClipRect(QRectF(wave.left(), wave.top(), played, wave.height()))
+            self.draw_waveform(painter, wave, True)
+            painter.restore()
+            painter.setPen(self.theme["fg"])
+            painter.drawLine(QPointF(wave.left() + played, wave.top()), QPointF(wave.left() + played, wave.bottom()))
+
+    def draw_waveform(self, painter, rect, played):
+        if not self.sprites.enabled:
+            self.paint_waveform(painter, rect, played)
+            return
+        size = rect.size()
+        local = QRectF(QPointF(0, 0), size)
+        sprite = self.sprites.sprite(("waveform", played, size.width(), size.height()), size,
+                                     lambda p: self.paint_waveform(p, local, played))
+        painter.drawPixmap(rect.topLeft(), sprite)
+
+    def paint_waveform(self, painter, rect, played):
+        color = QColor(self.theme["highlight"] if played else self.theme["fg"])
+        if not played:
+            color.setAlpha(90)
+        painter.setPen(QPen(color, 1))
+        columns = self.waveform
+        step = rect.width() / len(columns)
+        middle = rect.center().y()
+        half = rect.height() / 2
+        painter.drawLines([QLineF(rect.left() + (i + 0.5) * step, middle - high * half,
+                                  rect.left() + (i + 0.5) * step, middle - low * half)
+                           for i, (low, high) in enumerate(columns)])
 
     def draw_list(self, painter, x, y, width, height):
         painter.save()
         painter.setClipRect(x, y, width, height)
-        items = self.get_current_list()
-        if not items:
+        rows = self.display_rows()
+        if not len(rows):
             painter.setPen(self.theme["fg"])
             painter.drawText(QRectF(x, y, width, height), Qt.AlignmentFlag.AlignCenter, "No items available")
             painter.restore()
             return
         lh = 30
-        painter.setFont(QFont("Arial", 14))
+        texts = self.row_texts
+        texts.reset(self.theme_name, width)
+        painter.setFont(self.list_font)
+        top = texts.top_offset(lh)
         start = int(self.scroll_animated.value())
-        end = min(start + height // lh, len(items))
+        end = min(start + height // lh, len(rows))
         for i in range(start, end):
-            r = QRectF(x, y + (i - start) * lh, width, lh)
+            row_y = y + (i - start) * lh
             if i == self.selected_index:
-                painter.fillRect(r, self.theme["highlight"])
+                painter.fillRect(QRectF(x, row_y, width, lh), self.theme["highlight"])
                 painter.setPen(self.theme["bg"])
             else:
                 painter.setPen(self.theme["fg"])
-            if self.current_view == "playlists":
-                painter.drawText(r, Qt.AlignmentFlag.AlignVCenter, items[i])
-            else:
-                painter.drawText(r, Qt.AlignmentFlag.AlignVCenter, os.path.basename(items[i]))
+            painter.drawStaticText(QPointF(x, row_y + top), texts.text(rows.label(i)))
         painter.restore()
 
+    def display_rows(self):
+        """Cached labels for the current view; rebuilt only when its list changes."""
+        items = self.get_current_list()
+        if self.current_view == "playlists":
+            return self.display_model.rows("playlists", items, self.playlist_manager.version, str)
+        if self.current_view == "songs":
+            # Library snapshots and play queues carry a version; a list still being scanned only grows.
+            version = getattr(items, "version", len(items))
+        elif self.current_view == "search":
+            version = self.search_generation
+        else:
+            version = self.playlist_manager.version
+        return self.display_model.rows(self.current_view, items, version)
+
     def show_context_menu(self, global_pos):
         menu = QMenu()
         current_list = self.get_current_list()
@@ -344,15 +702,11 @@ class MusicPlayerUI(QWidget):
         if current_list:
             if self.current_view == "songs":
                 queue = self.songs_path
-            elif self.current_view in ("favorites", "playlist_songs"):
+            elif self.current_view in ("favorites", "playlist_songs", "search"):
                 queue = current_list  # Already full paths
             else:
                 return
-            self.backend.audio_controls.queue = queue
-            self.backend.audio_controls.song_pointer = self.selected_index
-            self.backend.start()
-            self.backend.audio_controls.is_paused = False
-            self.is_playing = True
+            self.play_from(queue, self.selected_index)
             self.update()
 
     def play_next(self):
@@ -362,7 +716,7 @@ class MusicPlayerUI(QWidget):
                 song_path = self.songs_path[self.selected_index]
             else:
                 song_path = current_list[self.selected_index]
-            self.backend.playnext(song_path, self.selected_index)
+            self.player_action(lambda: self.backend.playnext(song_path, self.backend.audio_controls.song_pointer))
             self.update()
 
     def add_to_favorites(self):
@@ -372,18 +726,14 @@ class MusicPlayerUI(QWidget):
                 song_path = self.songs_path[self.selected_index]
             else:
                 song_path = current_list[self.selected_index]
-            self.playlist_manager.add_to_favorites(song_path)
+            self.playlist_action(lambda: self.playlist_manager.add_to_favorites(song_path))
             print(f"Added to favorites: {os.path.basename(song_path)}")
-            self.refresh_lists()
-            self.update()
 
     def remove_from_favorites(self):
         if self.current_view == "favorites" and self.favorites:
             song = self.favorites[self.selected_index]
-            self.playlist_manager.remove_song_from_playlist("Favorites", song)
+            self.playlist_action(lambda: self.playlist_manager.remove_song_from_playlist("Favorites", song))
             print(f"Removed from favorites: {os.path.basename(song)}")
-            self.refresh_lists()
-            self.update()
 
     def add_to_playlist(self):
         current_list = self.get_current_list()
@@ -395,39 +745,59 @@ class MusicPlayerUI(QWidget):
             dialog = PlaylistDialog(self, self.playlists, self.theme_name)
             if dialog.exec():
                 selected_name = dialog.selected_playlist
-                if selected_name not in self.playlists:
-                    self.playlist_manager.add_playlist(selected_name, [song_path])
-                else:
-                    self.playlist_manager.add_song_to_playlist(selected_name, song_path)
-                print(f"Added to playlist {selected_name}: {os.path.basename(song_path)}")
-                self.refresh_lists()
-                self.update()
+                self.add_to_named_playlist(selected_name, song_path)
 
     def remove_from_playlist(self):
         if self.current_view == "playlist_songs" and self.current_playlist_songs:
             song = self.current_playlist_songs[self.selected_index]
-            self.playlist_manager.remove_song_from_playlist(self.selected_playlist, song)
-            print(f"Removed from playlist {self.selected_playlist}: {os.path.basename(song)}")
-            self.refresh_lists()
-            self.update()
+            name = self.selected_playlist
+            self.playlist_action(lambda: self.playlist_manager.remove_song_from_playlist(name, song))
+            print(f"Removed from playlist {name}: {os.path.basename(song)}")
 
     def remove_from_queue(self):
-        if self.backend.audio_controls.queue:
+        if self.queue_model.rows:
             current_list = self.get_current_list()
             if self.current_view == "songs":
                 song_path = self.songs_path[self.selected_index]
             else:
                 song_path = current_list[self.selected_index]
-            self.backend.remove_from_queue(song_path)
-            self.update_queue_display()
+            self.player_action(lambda: self.backend.remove_from_queue(song_path))
+
+    def add_to_named_playlist(self, name, song_path):
+        if name not in self.playlists:
+            self.playlist_action(lambda: self.playlist_manager.add_playlist(name, [song_path]))
+        else:
+            self.playlist_action(lambda: self.playlist_manager.add_song_to_playlist(name, song_path))
+        print(f"Added to playlist {name}: {os.path.basename(song_path)}")
+
+    def on_search_text(self, text):
+        if text.strip():
+            self.search_wanted = self.search.submit(text, self.search_done.emit)
+            return
+        self.search.cancel()
+        self.search_wanted = None
+        if self.current_view == "search":
+            self.current_view, self.selected_index = "songs", 0
+            self.scroll_to(0)
+            self.update()
+
+    def on_search_done(self, generation, query, results):
+        if generation != self.search_wanted:
+            return
+        self.search_results = results
+        self.search_generation = generation
+        self.current_view, self.selected_index = "search", 0
+        self.scroll_to(0)
+        self.mark_dirty("list")
 
     def show_playlist_songs(self):
         if self.current_view == "playlists" and self.playlists:
             self.selected_playlist = self.playlists[self.selected_index]
-            self.current_playlist_songs = self.playlist_manager.get_songs(self.selected_playlist) or []
+            with self.playlist_manager.lock:
+                self.current_playlist_songs = list(self.playlist_manager.get_songs(self.selected_playlist) or [])
             self.current_view = "playlist_songs"
             self.selected_index = 0
-            self.scroll_offset = 0
+            self.scroll_to(0)
             self.update()
 
     def delete_playlist(self):
@@ -436,10 +806,8 @@ class MusicPlayerUI(QWidget):
             reply = QMessageBox.question(self, "Delete Playlist", f"Are you sure you want to delete '{playlist_name}'?",
                                         QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
             if reply == QMessageBox.StandardButton.Yes:
-                self.playlist_manager.delete_playlist(playlist_name)
+                self.playlist_action(lambda: self.playlist_manager.delete_playlist(playlist_name))
                 print(f"Deleted playlist: {playlist_name}")
-                self.refresh_lists()
-                self.update()
 
     def rename_playlist(self):
         if self.current_view == "playlists" and self.playlists and self.playlists[self.selected_index] != "Favorites":
@@ -452,10 +820,8 @@ class MusicPlayerUI(QWidget):
             if dialog.exec() and dialog.textValue().strip():
                 new_name = dialog.textValue().strip()
                 if new_name not in self.playlists:
-                    self.playlist_manager.rename_playlist(playlist_name, new_name)
+                    self.playlist_action(lambda: self.playlist_manager.rename_playlist(playlist_name, new_name))
                     print(f"Renamed playlist from {playlist_name} to {new_name}")
-                    self.refresh_lists()
-                    self.update()
                 else:
                     QMessageBox.warning(self, "Invalid Name", "Playlist name already exists.")
 
@@ -479,16 +845,21 @@ class MusicPlayerUI(QWidget):
         delta = event.angleDelta().y()
         amt = -1 if delta > 0 else 1
         maxs = max(0, len(self.get_current_list()) - (310 // 30))
-        self.scroll_offset = max(0, min(self.scroll_offset + amt, maxs))
-        self.update()
+        self.scroll_to(max(0, min(self.scroll_offset + amt, maxs)))
 
     def get_current_list(self):
-        return {
-            "songs": self.songs_path,
-            "playlists": self.playlists,
-            "favorites": self.favorites,
-            "playlist_songs": self.current_playlist_songs
-        }.get(self.current_view, [])
+        view = self.current_view
+        if view == "songs":
+            return self.songs_path
+        if view == "playlists":
+            return self.playlists
+        if view == "favorites":
+            return self.favorites
+        if view == "playlist_songs":
+            return self.current_playlist_songs
+        if view == "search":
+            return self.search_results
+        return []
 
     def mousePressEvent(self, event):
         pos = event.position()
@@ -509,13 +880,9 @@ class MusicPlayerUI(QWidget):
                     self.selected_index = idx
                     if self.current_view == "playlists":
                         self.show_playlist_songs()
-                    elif self.current_view in ("songs", "favorites", "playlist_songs"):
+                    elif self.current_view in ("songs", "favorites", "playlist_songs", "search"):
                         queue = self.get_current_list() if self.current_view != "songs" else self.songs_path
-                        self.backend.audio_controls.queue = queue
-                        self.backend.audio_controls.song_pointer = self.selected_index
-                        self.backend.start()
-                        self.backend.audio_controls.is_paused = False
-                        self.is_playing = True
+                        self.play_from(queue, self.selected_index)
                     self.update()
         elif event.button() == Qt.MouseButton.RightButton:
             lr = QRectF(30, 340, self.width() - 240, 310)
@@ -525,18 +892,26 @@ class MusicPlayerUI(QWidget):
                 if 0 <= idx < len(lst):
                     self.selected_index = idx
                     self.show_context_menu(event.globalPosition().toPoint())
-        self.update_queue_display()
+
+    def on_queue_changed(self, kind, first, count, tracks):
+        """Runs on the GUI thread for every queue event the backend emitted."""
+        self.queue_model.apply(kind, first, count, tracks)
+        if kind in ("reset", "current") and self.queue_visible:
+            self.scroll_queue_to_current()
+
+    def repaint_queue_rows(self, *rows):
+        for row in rows:
+            if 0 <= row < self.queue_model.rows:
+                self.queue_display.update(self.queue_model.index(row))
+
+    def scroll_queue_to_current(self):
+        if 0 <= self.queue_model.current < self.queue_model.rows:
+            self.queue_display.scrollTo(self.queue_model.index(self.queue_model.current))
 
     def update_queue_display(self):
         if self.queue_visible:
             self.queue_display.show()
-            current_index = self.backend.audio_controls.song_pointer
-            queue = self.backend.audio_controls.queue or []
-            formatted = "Queue is empty" if not queue else ""
-            for i, song in enumerate(queue):
-                marker = "🎧 " if i == current_index else "   "
-                formatted += f"{marker}{os.path.basename(song)}\n--------------------\n"
-            self.queue_display.setText(formatted)
+            self.scroll_queue_to_current()
         else:
             self.queue_display.hide()
 
@@ -548,8 +923,8 @@ class MusicPlayerUI(QWidget):
                 hovered = name
                 break
         if hovered != self.hovered_button:
-            self.hovered_button = hovered
-            self.update()
+            previous, self.hovered_button = self.hovered_button, hovered
+            self.mark_dirty(*(name for name in (previous, hovered) if name is not None))
 
     def handle_top_button(self, name):
         if name == "playlists":
@@ -574,34 +949,28 @@ class MusicPlayerUI(QWidget):
         if name == "play":
             if not self.is_playing and current_list:
                 queue = current_list if self.current_view != "songs" else self.songs_path
-                self.backend.audio_controls.queue = queue
-                self.backend.audio_controls.song_pointer = self.selected_index
-                self.backend.start()
-                self.is_playing = True
+                # Not restarted: after a pause, start() resumes.
+                self.play_from(queue, self.selected_index, restart=False)
             else:
-                self.backend.pause()
+                self.player_action(self.backend.pause)
                 self.is_playing = False
-        elif name == "prev" and self.backend.audio_controls.queue:
-            self.backend.prev_song()
-            self.selected_index = self.backend.audio_controls.song_pointer
+        elif name == "prev" and self.queue_model.rows:
+            self.player_action(self.backend.prev_song, self.follow_pointer)
             self.is_playing = True
-        elif name == "next" and self.backend.audio_controls.queue:
-            self.backend.next_song()
-            self.selected_index = self.backend.audio_controls.song_pointer
+        elif name == "next" and self.queue_model.rows:
+            self.player_action(self.backend.next_song, self.follow_pointer)
             self.is_playing = True
         elif name == "repeat":
-            self.backend.toggle_repeat()
-            self.songs_path = self.backend.audio_controls.queue
-            self.selected_index = self.backend.audio_controls.song_pointer
+            # Repeat-all and shuffle take a library snapshot, which scans if it is not loaded yet.
+            self.player_action(self.backend.toggle_repeat, self.repeat_toggled)
         elif name == "add_fav":
             if current_list:
                 if self.current_view == "songs":
                     song_path = self.songs_path[self.selected_index]
                 else:
                     song_path = current_list[self.selected_index]
-                self.playlist_manager.add_to_favorites(song_path)
+                self.playlist_action(lambda: self.playlist_manager.add_to_favorites(song_path))
                 print(f"Added to favorites: {os.path.basename(song_path)}")
-                self.refresh_lists()
         elif name == "add_playlist":
             if current_list:
                 if self.current_view == "songs":
@@ -610,40 +979,57 @@ class MusicPlayerUI(QWidget):
                     song_path = current_list[self.selected_index]
                 dialog = PlaylistDialog(self, self.playlists, self.theme_name)
                 if dialog.exec():
-                    selected_name = dialog.selected_playlist
-                    if selected_name not in self.playlists:
-                        self.playlist_manager.add_playlist(selected_name, [song_path])
-                    else:
-                        self.playlist_manager.add_song_to_playlist(selected_name, song_path)
-                    print(f"Added to playlist {selected_name}: {os.path.basename(song_path)}")
-                    self.refresh_lists()
+                    self.add_to_named_playlist(dialog.selected_playlist, song_path)
         elif name == "volume_up":
-            self.backend.volume_up()
+            self.player_action(self.backend.volume_up, lambda _: self.mark_dirty("volume"))
+            return
         elif name == "volume_down":
-            self.backend.volume_down()
+            self.player_action(self.backend.volume_down, lambda _: self.mark_dirty("volume"))
+            return
+        self.update()
+
+    def repeat_toggled(self, _):
+        if self.backend.audio_controls.shuffle is None:
+            # The model's mirror already holds the queue toggle_repeat published; the GUI edits it
+            # as further events land, so keep the immutable sequence it was reset to.
+            tracks = self.queue_model.tracks
+            self.songs_path = tracks.base if tracks.base is not None else tuple(tracks)
+            self.selected_index = self.queue_model.current
+        else:
+            self.is_playing = True
         self.update()
 
     def toggle_theme(self):
         self.theme_name = "apple_dark" if self.theme_name == "apple" else "apple"
         self.theme = self.themes[self.theme_name]
+        self.brushes = {key: QBrush(color) for key, color in self.theme.items()}
+        self.sprites.invalidate()
+        self.search_box.setStyleSheet(self.get_dialog_stylesheet())
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.search_box.setGeometry(30, 300, self.width() - 240, 30)
+        self.sprites.invalidate(self.devicePixelRatioF())
 
     def keyPressEvent(self, event):
+        if event.key() == Qt.Key.Key_Escape and self.search_box.text():
+            self.search_box.clear()
+            return
         max_idx = len(self.get_current_list()) - 1
         if max_idx < 0:
             return
         if event.key() == Qt.Key.Key_Up and self.selected_index > 0:
             self.selected_index -= 1
             if self.selected_index < self.scroll_offset:
-                self.scroll_offset = self.selected_index
+                self.scroll_to(self.selected_index)
         elif event.key() == Qt.Key.Key_Down and self.selected_index < max_idx:
             self.selected_index += 1
             visible_count = 310 // 30
             if self.selected_index >= self.scroll_offset + visible_count:
-                self.scroll_offset = self.selected_index - visible_count + 1
+                self.scroll_to(self.selected_index - visible_count + 1)
         elif event.key() in (Qt.Key.Key_Return, Qt.Key.Key_Enter):
             if self.current_view == "playlists":
                 self.show_playlist_songs()
-            elif self.current_view in ("songs", "favorites", "playlist_songs"):
+            elif self.current_view in ("songs", "favorites", "playlist_songs", "search"):
                 self.play_song()
-        self.update_queue_display()
-        self.update()
\ No newline at end of file
+        self.mark_dirty("list")
\ No newline at end of file
@@ -1,19 +1,25 @@
-from os import path
-import os
+import time
+
+from utils import metrics
+from utils.library_index import LibraryIndex
+from utils.paths import music_folder
 
 
 class file_manager:
+    def __init__(self, index=None):
+        self.index = index
+        self.last_scan = None
+
     def search(self):
-        music_folder = path.join(os.environ['USERPROFILE'], 'Music')
-        
-        music_files = []
-        for root, dirs, files in os.walk(music_folder):
-            for file in files:
-                if file.lower().endswith(('.mp3', '.wav', '.flac', '.aac', '.ogg')):
-                    full_path = path.join(root, file)
-                    music_files.append(full_path)
-        
-        return music_files
+        if self.index is None:
+            self.index = LibraryIndex()
+        folder = music_folder()
+        started = metrics.start()
+        self.last_scan = self.index.scan(folder)
+        tracks = self.index.tracks(folder)
+        if started is not None:
+            metrics.scan_finished("library", time.perf_counter() - started, len(tracks))
+        return tracks
 
     def delete(self):
-        pass
\ No newline at end of file
+        pass
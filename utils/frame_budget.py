@@ -0,0 +1,63 @@
+class FrameBudget:
+    """Picks the quality level that keeps the work done per frame under ``budget`` seconds.
+
+    ``levels`` run from the best to the cheapest setting; ``current()`` is the
+    one in use. ``record`` takes how long a frame took: when the smoothed frame
+    time goes over the budget the level steps down to a cheaper one, and after
+    ``patience`` frames in a row under ``relax`` of the budget it steps back up.
+    Past the cheapest level frames are just counted as overruns.
+    """
+
+    def __init__(self, budget, levels, relax=0.5, patience=60, smoothing=0.2):
+        self.budget = budget
+        self.levels = levels
+        self.relax = relax
+        self.patience = patience
+        self.smoothing = smoothing
+        self.level = 0
+        self.average = None
+        self.calm = 0
+        self.frames = 0
+        self.overruns = 0
+        self.downgrades = 0
+
+    def current(self):
+        return self.levels[self.level]
+
+    def record(self, seconds):
+        """Account for one frame; True when the level changed."""
+        self.frames += 1
+        if seconds > self.budget:
+            self.overruns += 1
+        if self.average is None:
+            self.average = seconds
+        else:
+            self.average += self.smoothing * (seconds - self.average)
+        if self.average > self.budget:
+            self.calm = 0
+            if self.level < len(self.levels) - 1:
+                self.level += 1
+                self.downgrades += 1
+                # Judge the new level on its own frames.
+                self.average = None
+                return True
+            return False
+        if self.average < self.budget * self.relax and self.level > 0:
+            self.calm += 1
+            if self.calm >= self.patience:
+                self.level -= 1
+                self.calm = 0
+                self.average = None
+                return True
+        else:
+            self.calm = 0
+        return False
+
+    def stats(self):
+        return {
+            "level": self.level,
+            "frames": self.frames,
+            "overruns": self.overruns,
+            "downgrades": self.downgrades,
+            "average_ms": 1000 * self.average if self.average is not None else None,
+        }
@@ -0,0 +1,197 @@
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from os import path
+
+from utils.paths import data_dir
+
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.flac', '.aac', '.ogg')
+
+
+def is_audio_file(name):
+    return name.lower().endswith(AUDIO_EXTENSIONS)
+
+
+def storable(file_path):
+    """False for a name that is not valid UTF-8 (surrogate-escaped by os); SQLite cannot store it as text."""
+    try:
+        file_path.encode('utf-8')
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+@dataclass
+class ScanResult:
+    added: list = field(default_factory=list)
+    removed: list = field(default_factory=list)
+    modified: list = field(default_factory=list)
+    dirs_scanned: int = 0
+    dirs_skipped: int = 0
+
+    def has_changes(self):
+        return bool(self.added or self.removed or self.modified)
+
+
+class LibraryIndex:
+    """On-disk index of the music tree.
+
+    Directories whose mtime did not change since the last scan are not listed
+    again; their files are taken from the index. A file edited in place does
+    not touch its directory's mtime, so pass ``deep=True`` to also stat the
+    files of unchanged directories.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or path.join(data_dir(), 'library.db')
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS dirs (
+                path TEXT PRIMARY KEY,
+                parent TEXT,
+                mtime INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                dir TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS files_dir ON files (dir);
+        """)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def _range(self, root):
+        # Every path below root sorts between "root/" and "root0" ("0" follows "/").
+        root = path.normpath(root)
+        return root + os.sep, root + chr(ord(os.sep) + 1)
+
+    def _known_dirs(self, root):
+        low, high = self._range(root)
+        rows = self.conn.execute(
+            "SELECT path, parent, mtime FROM dirs WHERE path = ? OR (path > ? AND path < ?)",
+            (path.normpath(root), low, high))
+        mtimes = {}
+        children = {}
+        for dir_path, parent, mtime in rows:
+            mtimes[dir_path] = mtime
+            children.setdefault(parent, []).append(dir_path)
+        return mtimes, children
+
+    def _files_in(self, dir_path):
+        rows = self.conn.execute("SELECT path, size, mtime FROM files WHERE dir = ?", (dir_path,))
+        return {file_path: (size, mtime) for file_path, size, mtime in rows}
+
+    def _list_dir(self, dir_path):
+        subdirs = []
+        files = {}
+        try:
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    try:
+                        if not storable(entry.path):
+                            if entry.is_dir(follow_symlinks=False) or is_audio_file(entry.name):
+                                print(f"Skipping {os.fsencode(entry.path)!r}: the name is not valid UTF-8.")
+                        elif entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif is_audio_file(entry.name):
+                            st = entry.stat()
+                            files[entry.path] = (st.st_size, st.st_mtime_ns)
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return subdirs, files
+
+    def _diff(self, result, old, new):
+        for file_path, info in new.items():
+            previous = old.get(file_path)
+            if previous is None:
+                result.added.append(file_path)
+            elif previous != info:
+                result.modified.append(file_path)
+        for file_path in old:
+            if file_path not in new:
+                result.removed.append(file_path)
+
+    def _stat_files(self, old):
+        current = {}
+        for file_path in old:
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                continue
+            current[file_path] = (st.st_size, st.st_mtime_ns)
+        return current
+
+    def scan(self, root, deep=False):
+        root = path.normpath(root)
+        result = ScanResult()
+        if not storable(root):
+            print(f"Skipping {os.fsencode(root)!r}: the name is not valid UTF-8.")
+            return result
+        with self.lock:
+            known_mtimes, known_children = self._known_dirs(root)
+            seen = set()
+            stack = [(root, None)]
+            cur = self.conn.cursor()
+            while stack:
+                dir_path, parent = stack.pop()
+                try:
+                    mtime = os.stat(dir_path).st_mtime_ns
+                except OSError:
+                    continue
+                seen.add(dir_path)
+
+                if known_mtimes.get(dir_path) == mtime:
+                    result.dirs_skipped += 1
+                    stack.extend((child, dir_path) for child in known_children.get(dir_path, ()))
+                    if not deep:
+                        continue
+                    old = self._files_in(dir_path)
+                    new = self._stat_files(old)
+                else:
+                    result.dirs_scanned += 1
+                    subdirs, new = self._list_dir(dir_path)
+                    stack.extend((child, dir_path) for child in subdirs)
+                    old = self._files_in(dir_path)
+                    cur.execute("INSERT OR REPLACE INTO dirs (path, parent, mtime) VALUES (?, ?, ?)",
+                                (dir_path, parent, mtime))
+
+                if old == new:
+                    continue
+                self._diff(result, old, new)
+                gone = [(p,) for p in old if p not in new]
+                cur.executemany("DELETE FROM files WHERE path = ?", gone)
+                cur.executemany(
+                    "INSERT OR REPLACE INTO files (path, dir, size, mtime) VALUES (?, ?, ?, ?)",
+                    [(p, dir_path, size, mtime) for p, (size, mtime) in new.items() if old.get(p) != (size, mtime)])
+
+            for dir_path in known_mtimes:
+                if dir_path not in seen:
+                    result.removed.extend(self._files_in(dir_path))
+                    cur.execute("DELETE FROM files WHERE dir = ?", (dir_path,))
+                    cur.execute("DELETE FROM dirs WHERE path = ?", (dir_path,))
+            self.conn.commit()
+        return result
+
+    def tracks(self, root):
+        if not storable(root):
+            return []
+        low, high = self._range(root)
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT path FROM files WHERE path > ? AND path < ? ORDER BY path", (low, high))
+            return [row[0] for row in rows]
+
+    def stat(self, file_path):
+        with self.lock:
+            row = self.conn.execute("SELECT size, mtime FROM files WHERE path = ?", (file_path,)).fetchone()
+        return row
@@ -0,0 +1,203 @@
+import os
+import threading
+from os import path
+
+from utils.file_manager import file_manager
+from utils.paths import data_dir, music_folder
+from utils.scanner import Scanner
+from utils.watcher import LibraryDelta
+
+SNAPSHOT_HEADER = "v1 "
+
+
+def read_snapshot(file_path, root):
+    """Tracks saved by ``write_snapshot`` for ``root``, or None if there is no usable file."""
+    try:
+        with open(file_path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    records = data.decode("utf-8", "surrogateescape").split("\0")
+    if records[0] != SNAPSHOT_HEADER + root:
+        return None
+    return records[1:]
+
+
+def write_snapshot(file_path, root, tracks):
+    # NUL-separated: the one character a path cannot contain.
+    data = "\0".join([SNAPSHOT_HEADER + root, *tracks]).encode("utf-8", "surrogateescape")
+    tmp_path = file_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, file_path)
+
+
+class LibrarySnapshot:
+    """Immutable, versioned view of the library shared by every consumer."""
+
+    __slots__ = ("version", "tracks", "_positions")
+
+    def __init__(self, version, tracks):
+        self.version = version
+        self.tracks = tuple(tracks)
+        self._positions = None
+
+    def __len__(self):
+        return len(self.tracks)
+
+    def __iter__(self):
+        return iter(self.tracks)
+
+    def __getitem__(self, index):
+        return self.tracks[index]
+
+    def __contains__(self, track):
+        return self.position(track) is not None
+
+    def position(self, track):
+        if self._positions is None:
+            self._positions = {song: i for i, song in enumerate(self.tracks)}
+        return self._positions.get(track)
+
+
+class LibraryService:
+    """Owns the track list; the scan is paid once per process.
+
+    The list is saved to ``snapshot_path`` so the next start can show it
+    before touching the music folder; ``load_in_background`` then checks it
+    against the disk and publishes only what changed.
+
+    Consumers read ``snapshot()`` and keep the returned object instead of
+    copying it. Subscribers are called as ``callback(snapshot, previous, delta)``;
+    ``delta`` is None when the whole list was replaced. A subscriber that owns
+    a thread passes ``deliver(fn)`` to have the call run there; otherwise it
+    runs on whichever thread published the change.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, file_manager_=None, snapshot_path=None):
+        self.file_manager_ = file_manager_ or file_manager()
+        self.snapshot_path = snapshot_path or path.join(data_dir(), "library.snapshot")
+        self.saved_version = None
+        self.lock = threading.RLock()
+        self.current = LibrarySnapshot(0, ())
+        self.loaded = threading.Event()
+        self.scanner = None
+        self.scan_thread = None
+        self.listeners = []
+
+    @classmethod
+    def instance(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def snapshot(self, load=True):
+        if load and not self.loaded.is_set():
+            self.load()
+        return self.current
+
+    def subscribe(self, callback, deliver=None):
+        self.listeners.append((callback, deliver))
+
+    def unsubscribe(self, callback):
+        self.listeners = [entry for entry in self.listeners if entry[0] != callback]
+
+    def publish(self, tracks, delta=None):
+        with self.lock:
+            previous = self.current
+            self.current = LibrarySnapshot(previous.version + 1, tracks)
+            self.loaded.set()
+        current = self.current
+        for callback, deliver in list(self.listeners):
+            if deliver is None:
+                callback(current, previous, delta)
+            else:
+                deliver(lambda callback=callback: callback(current, previous, delta))
+        return current
+
+    def load(self):
+        with self.lock:
+            if not self.loaded.is_set():
+                self.publish(self.file_manager_.search())
+        return self.current
+
+    def load_in_background(self, on_batch=None, workers=4, on_done=None):
+        """Publish the last session's list and revalidate it, or, on a first run, stream a scan.
+
+        Scan batches go to ``on_batch``; ``on_done()`` is called once the
+        published list matches the disk.
+        """
+        if self.loaded.is_set():
+            return None
+        root = music_folder()
+        if path.exists(self.snapshot_path):
+            thread = threading.Thread(target=self.revalidate, args=(root, on_done), daemon=True,
+                                      name="library-revalidate")
+            thread.start()
+            return thread
+        self.scanner = Scanner(workers=workers)
+        found = []
+
+        def collect(batch):
+            if self.scanner.cancelled.is_set():
+                return
+            found.extend(batch)
+            if on_batch is not None:
+                on_batch(batch)
+
+        def finish():
+            if not self.scanner.cancelled.is_set():
+                self.publish(found)
+                self.save_snapshot()
+                if on_done is not None:
+                    on_done()
+
+        self.scan_thread = self.scanner.scan_in_background(root, collect, finish)
+        return self.scan_thread
+
+    def revalidate(self, root, on_done=None):
+        cached = read_snapshot(self.snapshot_path, root)
+        if cached is not None:
+            self.saved_version = self.publish(cached).version
+        fresh = self.file_manager_.search()
+        with self.lock:
+            if cached is None:
+                self.publish(fresh)
+            else:
+                current = self.current.tracks
+                known = set(current)
+                on_disk = set(fresh)
+                delta = LibraryDelta(added=[track for track in fresh if track not in known],
+                                     removed=[track for track in current if track not in on_disk])
+                if delta:
+                    self.publish(delta.apply_to(current), delta)
+        self.save_snapshot()
+        if on_done is not None:
+            on_done()
+
+    def save_snapshot(self):
+        """Write the current list for the next start, unless it has not changed since the last write."""
+        current = self.current
+        if not self.loaded.is_set() or current.version == self.saved_version:
+            return
+        try:
+            write_snapshot(self.snapshot_path, music_folder(), current.tracks)
+        except OSError as e:
+            print(f"Could not save the library snapshot: {e}")
+            return
+        self.saved_version = current.version
+
+    def cancel(self, timeout=1.0):
+        """Stop a first-run scan and wait for its thread, so no batch is delivered afterwards."""
+        if self.scanner is not None:
+            self.scanner.cancel()
+        if self.scan_thread is not None and self.scan_thread is not threading.current_thread():
+            self.scan_thread.join(timeout)
+
+    def apply_delta(self, delta):
+        with self.lock:
+            return self.publish(delta.apply_to(self.current.tracks), delta)
@@ -0,0 +1,269 @@
+"""Counters, gauges and timers for the hot paths, plus a sampling profiler.
+
+Everything is off by default. Instrumented code goes through
+
+    started = metrics.start()
+    ...
+    metrics.stop("mixer_load_seconds", started)
+
+which, while disabled, is a flag check and two calls that do nothing:
+``start()`` returns None without reading the clock and ``stop`` returns
+straight away. ``enable()`` starts recording and a thread that rewrites
+a JSON or Prometheus text file every ``interval`` seconds; the file is
+replaced atomically, so a scraper never sees half of it.
+
+``profile_for(seconds)`` samples every thread's stack for a time window and
+writes collapsed stacks ("a;b;c count" lines, the input flamegraph.pl and
+speedscope take) to a file. It costs nothing until it is started.
+"""
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from os import path
+
+from utils.paths import data_dir
+
+PREFIX = "music_player_"
+
+enabled = False
+
+
+class Timer:
+    """Count, sum and max of every observation, quantiles over the last ``keep``."""
+
+    __slots__ = ("count", "total", "max", "recent")
+
+    def __init__(self, keep=1024):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=keep)
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        self.recent.append(value)
+
+    def summary(self):
+        ordered = sorted(self.recent)
+        summary = {"count": self.count, "sum": self.total, "max": self.max}
+        for q in (0.5, 0.95, 0.99):
+            summary[f"p{int(q * 100)}"] = ordered[min(len(ordered) - 1, int(len(ordered) * q))] if ordered else 0.0
+        return summary
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.timers = {}
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        with self.lock:
+            self.gauges[name] = value
+
+    def observe(self, name, value):
+        with self.lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                timer = self.timers[name] = Timer()
+            timer.add(value)
+
+    def clear(self):
+        with self.lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.timers.clear()
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "time": time.time(),
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+                "timers": {name: timer.summary() for name, timer in self.timers.items()},
+            }
+
+
+registry = Registry()
+
+
+def start():
+    return time.perf_counter() if enabled else None
+
+
+def stop(name, started):
+    if started is not None:
+        registry.observe(name, time.perf_counter() - started)
+
+
+def count(name, n=1):
+    if enabled:
+        registry.count(name, n)
+
+
+def gauge(name, value):
+    if enabled:
+        registry.gauge(name, value)
+
+
+def observe(name, value):
+    if enabled:
+        registry.observe(name, value)
+
+
+def scan_finished(kind, seconds, files):
+    """A completed library scan: its duration, the files it found and the rate."""
+    if enabled:
+        registry.observe(f"{kind}_scan_seconds", seconds)
+        registry.count(f"{kind}_scan_files", files)
+        registry.gauge(f"{kind}_scan_files_per_second", files / seconds if seconds > 0 else 0.0)
+
+
+def to_json(snapshot):
+    return json.dumps(snapshot, indent=2)
+
+
+def to_prometheus(snapshot):
+    lines = []
+    for name, value in sorted(snapshot["counters"].items()):
+        lines += [f"# TYPE {PREFIX}{name}_total counter", f"{PREFIX}{name}_total {value}"]
+    for name, value in sorted(snapshot["gauges"].items()):
+        lines += [f"# TYPE {PREFIX}{name} gauge", f"{PREFIX}{name} {value}"]
+    for name, summary in sorted(snapshot["timers"].items()):
+        lines.append(f"# TYPE {PREFIX}{name} summary")
+        for quantile, key in (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99")):
+            lines.append(f'{PREFIX}{name}{{quantile="{quantile}"}} {summary[key]}')
+        lines += [f"{PREFIX}{name}_sum {summary['sum']}", f"{PREFIX}{name}_count {summary['count']}"]
+    return "\n".join(lines) + "\n"
+
+
+FORMATS = {"json": (to_json, "metrics.json"), "prom": (to_prometheus, "metrics.prom")}
+
+
+def write_atomically(file_path, text):
+    tmp_path = file_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, file_path)
+
+
+class Exporter:
+    """Thread that dumps the registry to ``file_path`` every ``interval`` seconds, and once more on close."""
+
+    def __init__(self, file_path, fmt="json", interval=10.0):
+        self.file_path = file_path
+        self.render = FORMATS[fmt][0]
+        self.interval = interval
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True, name="metrics-export")
+        self.thread.start()
+
+    def dump(self):
+        try:
+            write_atomically(self.file_path, self.render(registry.snapshot()))
+        except OSError as e:
+            print(f"Could not write metrics to {self.file_path}: {e}")
+
+    def run(self):
+        while not self.stopping.wait(self.interval):
+            self.dump()
+        self.dump()
+
+    def close(self):
+        self.stopping.set()
+        self.thread.join(timeout=2.0)
+
+
+exporter = None
+
+
+def enable(fmt="json", file_path=None, interval=10.0):
+    """Start recording and exporting; returns the file the dumps go to."""
+    global enabled, exporter
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown metrics format {fmt!r} (use {' or '.join(FORMATS)})")
+    disable()
+    file_path = file_path or path.join(data_dir(), FORMATS[fmt][1])
+    enabled = True
+    exporter = Exporter(file_path, fmt, interval)
+    return file_path
+
+
+def disable():
+    global enabled, exporter
+    enabled = False
+    if exporter is not None:
+        exporter.close()
+        exporter = None
+
+
+# The last dump on the way out covers whatever happened since the previous one.
+atexit.register(disable)
+
+
+class Profiler:
+    """Samples the stack of every other thread each ``interval`` seconds for ``seconds`` seconds."""
+
+    def __init__(self, seconds, file_path, interval=0.005):
+        self.seconds = seconds
+        self.file_path = file_path
+        self.interval = interval
+        self.stacks = {}
+        self.samples = 0
+        self.thread = threading.Thread(target=self.run, daemon=True, name="sampling-profiler")
+
+    def sample(self):
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)))
+            key = ";".join(reversed(stack))
+            self.stacks[key] = self.stacks.get(key, 0) + 1
+        self.samples += 1
+
+    def run(self):
+        deadline = time.monotonic() + self.seconds
+        while time.monotonic() < deadline:
+            self.sample()
+            time.sleep(self.interval)
+        lines = [f"{stack} {n}" for stack, n in sorted(self.stacks.items(), key=lambda item: -item[1])]
+        try:
+            write_atomically(self.file_path, "\n".join(lines) + "\n")
+            print(f"Profile of {self.samples} samples written to {self.file_path}")
+        except OSError as e:
+            print(f"Could not write profile to {self.file_path}: {e}")
+
+
+profiler = None
+profiler_lock = threading.Lock()
+
+
+def profile_for(seconds, file_path=None, interval=0.005):
+    """Start a sampling window unless one is running; returns its output file, or None."""
+    global profiler
+    with profiler_lock:
+        if profiler is not None and profiler.thread.is_alive():
+            return None
+        file_path = file_path or path.join(data_dir(), time.strftime("profile-%Y%m%d-%H%M%S.folded"))
+        profiler = Profiler(seconds, file_path, interval)
+        profiler.thread.start()
+        return file_path
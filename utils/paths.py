@@ -0,0 +1,19 @@
+import os
+from os import path
+
+
+def data_dir():
+    base = os.environ.get('LOCALAPPDATA') or path.join(path.expanduser('~'), '.cache')
+    folder = path.join(base, 'python_music_player')
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def music_folder():
+    home = os.environ.get('USERPROFILE') or path.expanduser('~')
+    return path.join(home, 'Music')
+
+
+def socket_path():
+    base = os.environ.get('XDG_RUNTIME_DIR') or data_dir()
+    return path.join(base, 'python_music_player.sock')
@@ -0,0 +1,91 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from utils import metrics
+from utils.library_index import is_audio_file, storable
+
+
+def list_dir(dir_path):
+    subdirs = []
+    files = []
+    try:
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                try:
+                    if not storable(entry.path):
+                        # Same rule as LibraryIndex, so both scans see the same library.
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif is_audio_file(entry.name):
+                        files.append(entry.path)
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return subdirs, files
+
+
+class Scanner:
+    """Walks a tree with a bounded thread pool and yields tracks in batches.
+
+    A batch is handed out as soon as it holds ``batch_size`` tracks or
+    ``flush_interval`` seconds have passed since the previous one, so the
+    first results show up long before the walk is finished.
+    """
+
+    def __init__(self, workers=4, batch_size=1000, flush_interval=0.05):
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def scan(self, root):
+        self.cancelled.clear()
+        pending_dirs = deque([root])
+        in_flight = set()
+        batch = []
+        found = 0
+        started = last_flush = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="scanner") as pool:
+            try:
+                while pending_dirs or in_flight:
+                    if self.cancelled.is_set():
+                        return
+                    while pending_dirs and len(in_flight) < self.workers * 2:
+                        in_flight.add(pool.submit(list_dir, pending_dirs.popleft()))
+                    done, in_flight = wait(in_flight, timeout=self.flush_interval, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        subdirs, files = future.result()
+                        pending_dirs.extend(subdirs)
+                        batch.extend(files)
+                        found += len(files)
+                    now = time.perf_counter()
+                    if batch and (len(batch) >= self.batch_size or now - last_flush >= self.flush_interval):
+                        yield batch
+                        batch = []
+                        last_flush = now
+                if batch and not self.cancelled.is_set():
+                    yield batch
+                if metrics.enabled and not self.cancelled.is_set():
+                    metrics.scan_finished("first", time.perf_counter() - started, found)
+            finally:
+                for future in in_flight:
+                    future.cancel()
+
+    def scan_in_background(self, root, on_batch, on_done=None):
+        def run():
+            for batch in self.scan(root):
+                on_batch(batch)
+            if on_done is not None:
+                on_done()
+
+        thread = threading.Thread(target=run, daemon=True, name="library-scan")
+        thread.start()
+        return thread
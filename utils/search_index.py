@@ -0,0 +1,366 @@
+import re
+import threading
+from collections import deque
+from itertools import islice
+from os import path
+
+WORD = re.compile(r"[^\W_]+")
+
+
+def words_of(text):
+    return WORD.findall(text.casefold())
+
+
+def trigrams(word):
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+def bounded_distance(a, b, limit):
+    """Levenshtein distance between ``a`` and ``b``, or ``limit + 1`` once it is known to exceed ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class Cancelled(Exception):
+    pass
+
+
+class SearchIndex:
+    """In-memory word index over track file names and, when known, their tags.
+
+    Every distinct word sits in a prefix trie and in a trigram index, and
+    maps to the tracks containing it. A query term matches, in this order:
+    - words it prefixes, found through the trie;
+    - words that contain it, from the trigram index, once it has 3 or more
+      characters;
+    - only if neither exists, words within a small edit distance.
+    The term matching the fewest tracks leads and its tracks stream out in
+    that order, so a query stops as soon as it has ``limit`` tracks. The
+    other terms filter that stream through cached doc id sets, in C; a term
+    matching many words is checked against each track's text instead, with
+    one substring search.
+
+    Removed tracks leave tombstones in the word lists until there are more
+    of them than live tracks; then the index rebuilds itself.
+    """
+
+    def __init__(self, tags=None):
+        self.tags = tags or {}
+        self.clear()
+
+    def clear(self):
+        self.docs = []
+        # Each track's words as " word word ...", so a term is checked with one substring search.
+        self.doc_text = []
+        self.ids = {}
+        self.postings = {}
+        self.trie = {}
+        self.word_trigrams = {}
+        # Doc id sets of frequent words, built on first use; see doc_set.
+        self.sets = {}
+        self.dead = 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def use_tags(self, cache):
+        """Index title/artist/album from a MetadataCache from now on."""
+        self.tags = {track: info for track, (_, info) in cache.load_all().items()}
+
+    def set_tags(self, infos):
+        """Take ``{track: TrackInfo}`` freshly read, re-indexing the tracks already in the index."""
+        for track, info in infos.items():
+            self.tags[track] = info
+            if track in self.ids:
+                self.remove(track)
+                self.add(track)
+
+    def words_for(self, track):
+        text = path.splitext(path.basename(track))[0]
+        info = self.tags.get(track)
+        if info is not None:
+            text = " ".join(part for part in (text, info.title, info.artist, info.album) if part)
+        return tuple(dict.fromkeys(words_of(text)))
+
+    # -- updates --------------------------------------------------------
+
+    def _insert(self, track, words):
+        doc = len(self.docs)
+        self.docs.append(track)
+        self.doc_text.append(" " + " ".join(words))
+        self.ids[track] = doc
+        for word in words:
+            posting = self.postings.get(word)
+            if posting is None:
+                self.postings[word] = [doc]
+                node = self.trie
+                for ch in word:
+                    node = node.setdefault(ch, {})
+                # Characters are never "", so that key marks the end of a word.
+                node[""] = word
+                for trigram in trigrams(word):
+                    self.word_trigrams.setdefault(trigram, set()).add(word)
+            else:
+                posting.append(doc)
+                cached = self.sets.get(word)
+                if cached is not None:
+                    cached.add(doc)
+
+    def add(self, track):
+        if track not in self.ids:
+            self._insert(track, self.words_for(track))
+
+    def remove(self, track):
+        doc = self.ids.pop(track, None)
+        if doc is None:
+            return
+        self.docs[doc] = None
+        self.dead += 1
+        if self.dead > len(self.ids):
+            self.compact()
+
+    def compact(self):
+        live = [(track, tuple(text.split())) for track, text in zip(self.docs, self.doc_text) if track is not None]
+        self.clear()
+        for track, words in live:
+            self._insert(track, words)
+
+    def rebuild(self, tracks):
+        self.clear()
+        for track in tracks:
+            self.add(track)
+
+    def apply(self, tracks, delta=None):
+        """Follow a library change: file-level deltas are applied, anything else rebuilds from ``tracks``."""
+        if delta is None or delta.removed_dirs or delta.renamed_dirs:
+            self.rebuild(tracks)
+            return
+        for track in delta.removed:
+            self.remove(track)
+        for old, new in delta.renamed.items():
+            self.remove(old)
+            self.add(new)
+        for track in delta.added:
+            self.add(track)
+
+    # -- queries --------------------------------------------------------
+
+    def prefix_words(self, term):
+        node = self.trie
+        for ch in term:
+            node = node.get(ch)
+            if node is None:
+                return
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            word = node.get("")
+            if word is not None:
+                yield word
+            stack.extend(child for key, child in reversed(node.items()) if key)
+
+    def substring_words(self, term):
+        """Words containing ``term`` anywhere but at the start (needs 3+ characters)."""
+        if len(term) < 3:
+            return []
+        postings = sorted((self.word_trigrams.get(t, ()) for t in trigrams(term)), key=len)
+        if not postings or not postings[0]:
+            return []
+        found = set(postings[0])
+        for words in postings[1:]:
+            found &= words
+            if not found:
+                return []
+        return sorted(word for word in found if term in word and not word.startswith(term))
+
+    def fuzzy_words(self, term):
+        """Words (or word beginnings) within 1 edit of ``term``, 2 for terms over 5 characters."""
+        if len(term) < 4:
+            return []
+        limit = 1 if len(term) <= 5 else 2
+        term_trigrams = trigrams(term)
+        shared = {}
+        for trigram in term_trigrams:
+            for word in self.word_trigrams.get(trigram, ()):
+                shared[word] = shared.get(word, 0) + 1
+        # One edit changes at most three trigrams.
+        needed = max(1, len(term_trigrams) - 3 * limit)
+        matches = []
+        for word, count in shared.items():
+            if count < needed:
+                continue
+            distance = min(bounded_distance(term, word, limit), bounded_distance(term, word[:len(term)], limit))
+            if distance <= limit:
+                matches.append((distance, word))
+        return [word for _, word in sorted(matches)]
+
+    def candidate_words(self, term):
+        found = False
+        for word in self.prefix_words(term):
+            found = True
+            yield word
+        for word in self.substring_words(term):
+            found = True
+            yield word
+        if not found:
+            yield from self.fuzzy_words(term)
+
+    def plan(self, term, max_words=64):
+        """``(tracks matched, words)`` for ``term``; a term matching over ``max_words`` words gets ``(inf, None)``."""
+        words = list(islice(self.candidate_words(term), max_words + 1))
+        if len(words) > max_words:
+            return float("inf"), None
+        return sum(len(self.postings[word]) for word in words), words
+
+    def doc_set(self, word, keep=256):
+        """Doc ids containing ``word``; sets of words in ``keep`` or more tracks stay cached."""
+        cached = self.sets.get(word)
+        if cached is not None:
+            return cached
+        posting = self.postings[word]
+        docs = set(posting)
+        if len(posting) >= keep:
+            self.sets[word] = docs
+        return docs
+
+    def check(self, term):
+        """Predicate on a doc id: a word starts with ``term`` or, for 3+ characters, contains it."""
+        doc_text = self.doc_text
+        needle = term if len(term) >= 3 else " " + term
+        return lambda doc: needle in doc_text[doc]
+
+    def search(self, query, limit=200, cancelled=None):
+        """Tracks matching every word of ``query``; ``cancelled()`` returning True aborts with Cancelled."""
+        terms = list(dict.fromkeys(words_of(query)))
+        if not terms:
+            return []
+        if len(terms) == 1:
+            plans = [(terms[0], None, None)]
+        else:
+            # Fewest tracks first; among terms too common to count, the longest.
+            plans = sorted(((term, *self.plan(term)) for term in terms), key=lambda plan: (plan[1], -len(plan[0])))
+        lead, _, lead_words = plans[0]
+        sets = []
+        checks = []
+        for term, _, words in plans[1:]:
+            if words is not None and len(words) == 1:
+                sets.append(self.doc_set(words[0]))
+            elif words is None or term in words[0]:
+                # Prefix or substring matches over several words: cheaper to check than to union.
+                checks.append(self.check(term))
+            else:
+                sets.append(set().union(*map(self.doc_set, words)))
+        results = []
+        seen = set()
+        docs = self.docs
+        for word in lead_words if lead_words is not None else self.candidate_words(lead):
+            if cancelled is not None and cancelled():
+                raise Cancelled()
+            candidates = self.postings[word]
+            for docs_with in sets:
+                candidates = filter(docs_with.__contains__, candidates)
+            for doc in candidates:
+                if doc in seen or docs[doc] is None:
+                    continue
+                seen.add(doc)
+                # A plain loop: a generator per candidate would cost more than the checks.
+                for check in checks:
+                    if not check(doc):
+                        break
+                else:
+                    results.append(docs[doc])
+                    if len(results) >= limit:
+                        return results
+        return results
+
+
+class SearchWorker:
+    """Owns a SearchIndex on one thread so the GUI never waits on it.
+
+    ``update(fn)`` queues ``fn(index)``; updates run in order, before any
+    query. ``submit(query, on_result)`` replaces whatever query is still
+    waiting, and a query already running is cancelled as soon as a newer one
+    arrives. ``on_result(generation, query, results)`` runs on the worker
+    thread; compare ``generation`` with the last ``submit`` to drop stale results.
+    """
+
+    def __init__(self, index=None, limit=200):
+        self.index = index or SearchIndex()
+        self.limit = limit
+        self.condition = threading.Condition()
+        self.updates = deque()
+        self.pending = None
+        self.generation = 0
+        self.closed = False
+        self.thread = threading.Thread(target=self.run, daemon=True, name="search")
+        self.thread.start()
+
+    def update(self, fn):
+        with self.condition:
+            self.updates.append(fn)
+            self.condition.notify()
+
+    def follow(self, library):
+        """Keep the index in step with a LibraryService."""
+        library.subscribe(lambda snapshot, previous, delta: self.update(lambda index: index.apply(snapshot, delta)))
+        # Subscribed first, so a load finishing in between is seen at least once.
+        if library.loaded.is_set():
+            snapshot = library.snapshot()
+            self.update(lambda index: index.rebuild(snapshot))
+
+    def submit(self, query, on_result):
+        with self.condition:
+            self.generation += 1
+            self.pending = (self.generation, query, on_result)
+            self.condition.notify()
+            return self.generation
+
+    def cancel(self):
+        """Drop the waiting query and stop the running one."""
+        with self.condition:
+            self.generation += 1
+            self.pending = None
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not (self.closed or self.updates or self.pending):
+                    self.condition.wait()
+                if self.closed:
+                    return
+                if self.updates:
+                    job, task = "update", self.updates.popleft()
+                else:
+                    job, task = "query", self.pending
+                    self.pending = None
+            if job == "update":
+                try:
+                    task(self.index)
+                except Exception as e:
+                    print(f"Search index update failed: {e}")
+                continue
+            generation, query, on_result = task
+            try:
+                results = self.index.search(query, self.limit,
+                                            lambda: self.generation != generation or bool(self.updates))
+            except Cancelled:
+                with self.condition:
+                    # Cancelled by an index update: run the query again once it is applied.
+                    if self.generation == generation and self.pending is None:
+                        self.pending = task
+                continue
+            on_result(generation, query, results)
@@ -0,0 +1,358 @@
+import os
+import select
+import struct
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+from utils.library_index import LibraryIndex, is_audio_file
+from utils.scanner import list_dir
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct("iIII")
+
+
+@dataclass
+class LibraryDelta:
+    added: list = field(default_factory=list)
+    removed: list = field(default_factory=list)
+    renamed: dict = field(default_factory=dict)
+    removed_dirs: list = field(default_factory=list)
+    renamed_dirs: dict = field(default_factory=dict)
+
+    def __post_init__(self):
+        self._removed = set(self.removed)
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.renamed or self.removed_dirs or self.renamed_dirs)
+
+    def new_path(self, song):
+        """Where ``song`` lives after this delta, or None if it was removed."""
+        if song in self.renamed:
+            return self.renamed[song]
+        for old_dir, new_dir in self.renamed_dirs.items():
+            if song.startswith(old_dir + os.sep):
+                return new_dir + song[len(old_dir):]
+        if song in self._removed:
+            return None
+        for dir_path in self.removed_dirs:
+            if song.startswith(dir_path + os.sep):
+                return None
+        return song
+
+    def new_tracks(self, songs):
+        """Paths in ``songs``, the list after this delta, that caches keyed by path have not seen."""
+        moved_to = tuple(new_dir + os.sep for new_dir in self.renamed_dirs.values())
+        # Directory renames do not list the files that moved.
+        moved = [song for song in songs if song.startswith(moved_to)] if moved_to else []
+        return self.added + list(self.renamed.values()) + moved
+
+    def apply_to(self, songs):
+        """Return a new list with renames mapped, removals dropped and additions appended."""
+        result = []
+        present = set()
+        for song in songs:
+            moved = self.new_path(song)
+            if moved is not None:
+                result.append(moved)
+                present.add(moved)
+        result.extend(song for song in self.added if song not in present)
+        return result
+
+
+class DeltaCoalescer:
+    """Folds raw add/remove/rename events into one LibraryDelta."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.added = {}
+        self.removed = {}
+        self.renamed = {}
+        self.removed_dirs = {}
+        self.renamed_dirs = {}
+
+    def __len__(self):
+        return (len(self.added) + len(self.removed) + len(self.renamed)
+                + len(self.removed_dirs) + len(self.renamed_dirs))
+
+    def add(self, song):
+        self.removed.pop(song, None)
+        self.added[song] = None
+
+    def remove(self, song):
+        if song in self.added:
+            del self.added[song]
+            return
+        for old, new in list(self.renamed.items()):
+            if new == song:
+                del self.renamed[old]
+                song = old
+                break
+        self.removed[song] = None
+
+    def rename(self, old, new):
+        if old in self.added:
+            del self.added[old]
+            self.added[new] = None
+            return
+        for origin, target in self.renamed.items():
+            if target == old:
+                self.renamed[origin] = new
+                return
+        self.renamed[old] = new
+
+    def remove_dir(self, dir_path):
+        prefix = dir_path + os.sep
+        for song in [s for s in self.added if s.startswith(prefix)]:
+            del self.added[song]
+        self.removed_dirs[dir_path] = None
+
+    def rename_dir(self, old, new):
+        prefix = old + os.sep
+        for song in [s for s in self.added if s.startswith(prefix)]:
+            del self.added[song]
+            self.added[new + song[len(old):]] = None
+        self.renamed_dirs[old] = new
+
+    def flush(self):
+        delta = LibraryDelta(list(self.added), list(self.removed), dict(self.renamed),
+                             list(self.removed_dirs), dict(self.renamed_dirs))
+        self.reset()
+        return delta
+
+
+@lru_cache(maxsize=None)
+def find_libc():
+    # Imported here rather than at startup: ctypes.util pulls in subprocess and find_library runs ldconfig.
+    import ctypes.util
+    return ctypes.util.find_library("c")
+
+
+class InotifyBackend:
+    def __init__(self, root, watcher):
+        self.root = root
+        self.watcher = watcher
+        import ctypes
+        self.libc = ctypes.CDLL(find_libc(), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}
+        self.pending_moves = {}
+
+    @staticmethod
+    def available():
+        return hasattr(os, "O_CLOEXEC") and os.uname().sysname == "Linux" and find_libc() is not None
+
+    def add_tree(self, root, report=False):
+        stack = [root]
+        while stack:
+            dir_path = stack.pop()
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(dir_path), WATCH_MASK)
+            if wd >= 0:
+                self.watches[wd] = dir_path
+            subdirs, files = list_dir(dir_path)
+            stack.extend(subdirs)
+            if report:
+                for song in files:
+                    self.watcher.event("add", song)
+
+    def rename_watches(self, old, new):
+        prefix = old + os.sep
+        for wd, dir_path in self.watches.items():
+            if dir_path == old:
+                self.watches[wd] = new
+            elif dir_path.startswith(prefix):
+                self.watches[wd] = new + dir_path[len(old):]
+
+    def expire_moves(self):
+        # A MOVED_FROM whose MOVED_TO never arrived left the watched tree.
+        now = time.monotonic()
+        for cookie, (old, is_dir, at) in list(self.pending_moves.items()):
+            if now - at > 0.1:
+                del self.pending_moves[cookie]
+                self.watcher.event("remove_dir" if is_dir else "remove", old)
+
+    def handle(self, wd, mask, cookie, name):
+        if mask & IN_Q_OVERFLOW:
+            # Directories created while events were dropped have no watch yet.
+            self.add_tree(self.root)
+            self.watcher.event("overflow", None)
+            return
+        if mask & IN_IGNORED:
+            self.watches.pop(wd, None)
+            return
+        parent = self.watches.get(wd)
+        if parent is None or not name:
+            return
+        full = os.path.join(parent, name)
+        is_dir = bool(mask & IN_ISDIR)
+        if not is_dir and not is_audio_file(name):
+            return
+        if mask & IN_MOVED_FROM:
+            self.pending_moves[cookie] = (full, is_dir, time.monotonic())
+        elif mask & IN_MOVED_TO:
+            move = self.pending_moves.pop(cookie, None)
+            if move is not None:
+                if is_dir:
+                    self.rename_watches(move[0], full)
+                    self.watcher.event("rename_dir", move[0], full)
+                else:
+                    self.watcher.event("rename", move[0], full)
+            elif is_dir:
+                self.add_tree(full, report=True)
+            else:
+                self.watcher.event("add", full)
+        elif mask & IN_CREATE and is_dir:
+            self.add_tree(full, report=True)
+        elif mask & IN_CLOSE_WRITE:
+            self.watcher.event("add", full)
+        elif mask & IN_DELETE:
+            self.watcher.event("remove_dir" if is_dir else "remove", full)
+
+    def run(self, stop_event):
+        self.add_tree(self.root)
+        try:
+            while not stop_event.is_set():
+                ready, _, _ = select.select([self.fd], [], [], 0.1)
+                if not ready:
+                    self.expire_moves()
+                    continue
+                data = os.read(self.fd, 64 * 1024)
+                offset = 0
+                while offset < len(data):
+                    wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                    offset += EVENT_HEADER.size
+                    name = data[offset:offset + length].rstrip(b"\0")
+                    offset += length
+                    self.handle(wd, mask, cookie, os.fsdecode(name))
+                self.expire_moves()
+        finally:
+            os.close(self.fd)
+
+
+class PollingBackend:
+    """Stat-based fallback; only directories whose mtime changed are listed."""
+
+    def __init__(self, root, watcher, index=None, interval=5.0):
+        self.root = root
+        self.watcher = watcher
+        self.index = index or LibraryIndex()
+        self.interval = interval
+
+    def run(self, stop_event):
+        self.index.scan(self.root)
+        while not stop_event.wait(self.interval):
+            result = self.index.scan(self.root)
+            for song in result.removed:
+                self.watcher.event("remove", song)
+            for song in result.added:
+                self.watcher.event("add", song)
+
+
+class LibraryWatcher:
+    """Watches the music folder and reports debounced LibraryDelta batches.
+
+    Events are folded together until nothing new has arrived for ``debounce``
+    seconds (or ``max_wait`` has passed), so copying a whole album ends up as
+    a single ``on_delta`` call.
+    """
+
+    def __init__(self, root, on_delta, debounce=0.5, max_wait=5.0, index=None, poll_interval=5.0):
+        self.root = os.path.normpath(root)
+        self.on_delta = on_delta
+        self.debounce = debounce
+        self.max_wait = max_wait
+        self.coalescer = DeltaCoalescer()
+        self.condition = threading.Condition()
+        self.stop_event = threading.Event()
+        self.first_event = None
+        self.last_event = None
+        self.overflowed = False
+        self.index = index or LibraryIndex()
+        if InotifyBackend.available():
+            try:
+                self.backend = InotifyBackend(self.root, self)
+            except OSError:
+                self.backend = PollingBackend(self.root, self, self.index, poll_interval)
+        else:
+            self.backend = PollingBackend(self.root, self, self.index, poll_interval)
+        self.threads = []
+
+    def event(self, kind, song, target=None):
+        with self.condition:
+            if kind == "add":
+                self.coalescer.add(song)
+            elif kind == "remove":
+                self.coalescer.remove(song)
+            elif kind == "rename":
+                self.coalescer.rename(song, target)
+            elif kind == "remove_dir":
+                self.coalescer.remove_dir(song)
+            elif kind == "rename_dir":
+                self.coalescer.rename_dir(song, target)
+            elif kind == "overflow":
+                self.overflowed = True
+            now = time.monotonic()
+            if self.first_event is None:
+                self.first_event = now
+            self.last_event = now
+            self.condition.notify()
+
+    def flush_loop(self):
+        while not self.stop_event.is_set():
+            with self.condition:
+                if self.first_event is None:
+                    self.condition.wait(0.5)
+                    continue
+                now = time.monotonic()
+                quiet_until = self.last_event + self.debounce
+                deadline = min(quiet_until, self.first_event + self.max_wait)
+                if now < deadline:
+                    self.condition.wait(deadline - now)
+                    continue
+                delta = self.coalescer.flush()
+                overflowed = self.overflowed
+                self.first_event = self.last_event = None
+                self.overflowed = False
+            if overflowed:
+                delta = self.rescan(delta)
+            if delta:
+                self.on_delta(delta)
+
+    def rescan(self, delta):
+        """After the kernel dropped events, fold what an index scan finds into ``delta``."""
+        print(f"Watcher queue overflowed; rescanning {self.root}.")
+        result = self.index.scan(self.root)
+        added = set(delta.added)
+        removed = set(delta.removed)
+        return LibraryDelta(delta.added + [song for song in result.added if song not in added],
+                            delta.removed + [song for song in result.removed if song not in removed],
+                            delta.renamed, delta.removed_dirs, delta.renamed_dirs)
+
+    def start(self):
+        self.stop_event.clear()
+        for target, args in ((self.backend.run, (self.stop_event,)), (self.flush_loop, ())):
+            thread = threading.Thread(target=target, args=args, daemon=True, name="library-watch")
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        self.stop_event.set()
+        with self.condition:
+            self.condition.notify()
+        for thread in self.threads:
+            thread.join(timeout=1.0)
+        self.threads = []